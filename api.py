@@ -1,14 +1,96 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 from private_config import BASE_URL
+from cache_manager import cache_manager
+from resilience import AIMDLimiter, CircuitBreaker
 
-def fetch_participants():
-    """Fetches participant data from the API."""
-    url = f"{BASE_URL}/participants/"
-    response = requests.get(url)
-    if response.ok:
-        return response.json()
-    else:
+# Optional fast JSON decoder; falls back to the stdlib decoder when not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Compression: requests advertises gzip/deflate on every request, and br as well
+# when the brotli package is installed, and decompresses transparently.
+def decode_json(response):
+    """
+    Decodes a JSON response body, with orjson when available. Records stay dicts: the
+    consumers (sites tagging, event_ingest, parse_participants, the local-state event list)
+    take record lists, and transposing to columns in Python is slower than pd.DataFrame(records).
+    """
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return json.loads(response.content)
+
+# ----------------------------
+# RESILIENT GETS
+# ----------------------------
+# One limiter + breaker per backend, shared by all sessions of the server process since
+# each API Gateway throttles per client; one failing backend doesn't trip the others
+_guards = {}
+_guards_lock = threading.Lock()
+
+def guards(base_url=BASE_URL):
+    """(AIMDLimiter, CircuitBreaker) of one backend."""
+    with _guards_lock:
+        if base_url not in _guards:
+            _guards[base_url] = (AIMDLimiter(initial=4, maximum=16),
+                                 CircuitBreaker(failure_threshold=5, reset_timeout=30.0))
+        return _guards[base_url]
+
+# Last successful body per URL, served while the backend is throttling or down
+last_good = cache_manager.namespace('api_last_good', ttl=24 * 3600)
+
+REQUEST_TIMEOUT = 30
+
+# Gives up on the backend for this call (throttled, server error, network error, open circuit)
+UNAVAILABLE = object()
+
+def get_json(url, base_url=BASE_URL):
+    """
+    GET `url` through the concurrency limiter and circuit breaker of its backend `base_url`.
+    Returns the decoded body, None for other non-OK responses (e.g. 404), or, when the
+    backend is throttling or down or the body isn't valid JSON, the last good body for
+    this URL (UNAVAILABLE if none).
+    """
+    limiter, breaker = guards(base_url)
+    if not breaker.allow_request():
+        return last_good.get(url, UNAVAILABLE)
+
+    with limiter:
+        try:
+            response = requests.get(url, timeout=REQUEST_TIMEOUT)
+        except requests.RequestException:
+            response = None
+
+    if response is None or response.status_code == 429 or response.status_code >= 500:
+        limiter.on_overload()
+        breaker.record_failure()
+        return last_good.get(url, UNAVAILABLE)
+
+    if not response.ok:
+        limiter.on_success()
+        breaker.record_success()
         return None
+    try:
+        data = decode_json(response)
+    except ValueError:
+        # Truncated or non-JSON body (e.g. a gateway error page): a failed request
+        # (orjson.JSONDecodeError and json.JSONDecodeError are ValueErrors)
+        breaker.record_failure()
+        return last_good.get(url, UNAVAILABLE)
+    limiter.on_success()
+    breaker.record_success()
+    last_good.put(url, data)
+    return data
+
+def fetch_participants(base_url=BASE_URL):
+    """Fetches participant data from the API."""
+    data = get_json(f"{base_url}/participants/", base_url)
+    return None if data is UNAVAILABLE else data
 
 def update_participant_to_db(patientId, updates):
     """Updates participant data on the API."""
@@ -17,52 +99,65 @@ def update_participant_to_db(patientId, updates):
     response = requests.patch(url, json=updates, headers=headers)
     return response
 
-def get_questions(patient_id):
-    url = f"{BASE_URL}/questions?patientId={patient_id}"
-    response = requests.get(url)
-    if response.status_code == 200:
-        return response.json()
-    else:
-  #      st.error("Failed to retrieve questions.")
+def get_questions(patient_id, base_url=BASE_URL):
+    """
+    Answers of one participant. [] if the API has none for them (non-200 response),
+    None if the backend is unavailable and there is no earlier answer list to fall back to.
+    """
+    data = get_json(f"{base_url}/questions?patientId={patient_id}", base_url)
+    if data is UNAVAILABLE:
         return None
+    return data if data is not None else []
+
+def fetch_questions_by_patient(patient_ids, base_url=BASE_URL):
+    """
+    get_questions for many participants in parallel; the limiter keeps the number of
+    requests in flight at what the backend accepts.
+    """
+    patient_ids = list(patient_ids)
+    limiter, _ = guards(base_url)
+    with ThreadPoolExecutor(max_workers=limiter.maximum) as executor:
+        answers = executor.map(lambda patient_id: get_questions(patient_id, base_url), patient_ids)
+        return dict(zip(patient_ids, answers))
     
-def fetch_events_data():
-    url = f"{BASE_URL}/events/"
-    try:
-        response = requests.get(url)
-        if response.ok:
-            return response.json()
-        else:
-            return None
-    except Exception:
-        return None
+def fetch_events_data(base_url=BASE_URL):
+    data = get_json(f"{base_url}/events/", base_url)
+    return None if data is UNAVAILABLE else data
 
-def fetch_questionnaire_data():
-    url = f"{BASE_URL}/questionnaire/"
-    try:
-        response = requests.get(url)
-        if response.ok:
-            return response.json()
-        else:
-            return None
-    except Exception:
-        return None
+def fetch_questionnaire_data(base_url=BASE_URL):
+    data = get_json(f"{base_url}/questionnaire/", base_url)
+    return None if data is UNAVAILABLE else data
     
-def add_participant_to_db(nickName, phone, empaticaId, firebaseId,trialStartingDateTimeStr):
-    url = f"{BASE_URL}/participants/"
-    payload = {
+def new_participant_payload(nickName, phone, empaticaId, firebaseId, trialStartingDateTimeStr):
+    return {
         "nickName": nickName,
         "phone": phone,
         "empaticaId": empaticaId,
         "firebaseId": firebaseId,
         "trialStartingDate": trialStartingDateTimeStr
     }
+
+def add_participant_to_db(nickName, phone, empaticaId, firebaseId,trialStartingDateTimeStr):
+    url = f"{BASE_URL}/participants/"
+    payload = new_participant_payload(nickName, phone, empaticaId, firebaseId, trialStartingDateTimeStr)
     headers = {
         'Content-Type': 'application/json'
     }
     response = requests.post(url, json=payload, headers=headers)
     return response
 
+def event_payload(patientId, deviceId, timestamp, location, eventType, activity, severity, origin):
+    return {
+        "patientId": patientId,
+        "deviceId": deviceId,
+        "timestamp": timestamp,
+        "Location": location,
+        "eventType": eventType,
+        "activity": activity,
+        "severity": severity,
+        "origin": origin
+    }
+
 def post_event_to_db(patientId, deviceId, timestamp, location, eventType, activity, severity, origin):
     """
     Posts a new event to the API.
@@ -80,19 +175,34 @@ def post_event_to_db(patientId, deviceId, timestamp, location, eventType, activi
         response: The response from the API.
     """
     url = f"{BASE_URL}/events/"
-    payload = {
-        "patientId": patientId,
-        "deviceId": deviceId,
-        "timestamp": timestamp,
-        "Location": location,
-        "eventType": eventType,
-        "activity": activity,
-        "severity": severity,
-        "origin": origin
-    }
+    payload = event_payload(patientId, deviceId, timestamp, location, eventType, activity, severity, origin)
     headers = {
         'Content-Type': 'application/json'
     }
     response = requests.post(url, json=payload, headers=headers)
     return response
+# ----------------------------
+# OUTBOX WRITES
+# ----------------------------
+# Write kind (see outbox.py) -> (HTTP method, path)
+WRITE_REQUESTS = {
+    'event': ('POST', '/events/'),
+    'participant_add': ('POST', '/participants/'),
+    'participant_update': ('PATCH', '/participants/'),
+}
+
+# One keep-alive connection pool for the outbox flusher
+_write_session = requests.Session()
+
+def send_write(kind, payload, idempotency_key, base_url=BASE_URL):
+    """Sends one queued write (outbox flusher callback) and returns the status code."""
+    method, path = WRITE_REQUESTS[kind]
+    headers = {
+        'Content-Type': 'application/json',
+        'Idempotency-Key': idempotency_key,
+    }
+    response = _write_session.request(method, f"{base_url}{path}", json=payload, headers=headers,
+                                      timeout=REQUEST_TIMEOUT)
+    return response.status_code
+
 # Add other API functions here similarly
@@ -1,11 +1,21 @@
+import os
+import sys
+import time
+
 import streamlit as st
 import yaml
 from yaml.loader import SafeLoader
 
 from streamlit_authenticator import Authenticate
 
-# Your custom module that shows the main dashboard
-from dashboard import show_dashboard
+# Run with BOOGGII_STARTUP_TIMING=1 to log how long each stage of a script run takes
+STARTUP_TIMING = os.environ.get("BOOGGII_STARTUP_TIMING") == "1"
+run_started = time.perf_counter()
+
+def log_startup_time(stage):
+    if STARTUP_TIMING:
+        elapsed_ms = (time.perf_counter() - run_started) * 1000
+        print(f"[startup] {stage}: {elapsed_ms:.1f} ms", file=sys.stderr)
 
 # 1) Set the page to wide
 st.set_page_config(
@@ -25,6 +35,7 @@ authenticator = Authenticate(
     config['cookie']['expiry_days'],
     config['preauthorized']
 )
+log_startup_time("authenticator ready")
 
 # 3) We place the login form in a narrower column,
 #    but the overall page is still wide.
@@ -50,9 +61,16 @@ if st.session_state['authentication_status'] != True:
             # If authentication_status == True, store it in session_state
             st.session_state['authentication_status'] = True
             st.session_state['name'] = name
-            st.experimental_rerun()  # Reload the page so we skip this block next time
+            st.session_state['username'] = username
+            st.rerun()  # Reload the page so we skip this block next time
+    log_startup_time("login form shown")
 
 # 4) If user is logged in, show the dashboard
 if st.session_state.get('authentication_status', False) == True:
     st.success(f'Welcome {st.session_state["name"]}!')
+    # Imported only after login: the dashboard pulls in pandas and the data modules,
+    # which the login page does not need
+    from dashboard import show_dashboard
+    log_startup_time("dashboard imported")
     show_dashboard()
+    log_startup_time("dashboard rendered")
@@ -0,0 +1,70 @@
+"""
+Compares the stdlib and orjson decode paths used by api.decode_json on synthetic
+/events/ payloads, including building the DataFrame the dashboard works on.
+
+    python benchmarks/bench_json_decode.py [num_records ...]   (default: 10000 100000 1000000)
+"""
+import gzip
+import json
+import random
+import sys
+import time
+
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+EVENT_TYPES = ["dissociation", "sadness", "anger", "anxiety", "other"]
+ACTIVITIES = ["rest", "eating", "exercise", "other"]
+
+
+def make_events(num_records, num_patients=200, seed=0):
+    rng = random.Random(seed)
+    base = pd.Timestamp("2025-01-01").value // 10**9
+    events = []
+    for _ in range(num_records):
+        ts = pd.Timestamp(base + rng.randrange(0, 90 * 86400), unit="s")
+        events.append({
+            "patientId": f"patient-{rng.randrange(num_patients):04d}",
+            "deviceId": f"device-{rng.randrange(num_patients):04d}",
+            "timestamp": ts.strftime("%Y-%m-%d %H:%M:%S.%f"),
+            "location": {"lat": 32.0 + rng.random(), "long": 34.8 + rng.random()},
+            "eventType": rng.choice(EVENT_TYPES),
+            "activity": rng.choice(ACTIVITIES),
+            "severity": rng.randrange(5),
+            "origin": rng.choice(["app", "assistant"]),
+        })
+    return events
+
+
+def timed(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(num_records):
+    body = json.dumps(make_events(num_records)).encode()
+    compressed = gzip.compress(body, compresslevel=6)
+
+    print(f"\n{num_records:,} events: {len(body) / 1e6:.1f} MB raw, {len(compressed) / 1e6:.1f} MB gzip")
+    print(f"  gzip decompress        {timed(lambda: gzip.decompress(compressed)) * 1000:8.1f} ms")
+    print(f"  json.loads             {timed(lambda: json.loads(body)) * 1000:8.1f} ms")
+    print(f"  json.loads + DataFrame {timed(lambda: pd.DataFrame(json.loads(body))) * 1000:8.1f} ms")
+    if orjson is None:
+        print("  orjson not installed, skipping")
+        return
+    print(f"  orjson.loads           {timed(lambda: orjson.loads(body)) * 1000:8.1f} ms")
+    print(f"  orjson + DataFrame     {timed(lambda: pd.DataFrame(orjson.loads(body))) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    for size in sizes:
+        run(size)
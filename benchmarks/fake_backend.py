@@ -0,0 +1,171 @@
+"""
+In-memory stand-in for the trial API, for load tests and local runs without the real backend.
+
+Serves /participants/, /events/, /questionnaire/ and /questions?patientId= with a synthetic
+cohort, accepts event and participant writes, and counts requests per endpoint so a load
+test can report how many backend calls each dashboard interaction causes.
+
+    python benchmarks/fake_backend.py [--port 8900] [--participants 200] [--events 50000]
+    BOOGGII_SITES=fake=http://127.0.0.1:8900 streamlit run app.py
+"""
+import argparse
+import collections
+import datetime
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+EVENT_TYPES = ["dissociation", "sadness", "anger", "anxiety", "other"]
+ACTIVITIES = ["rest", "eating", "exercise", "other"]
+SLOT_HOURS = [10, 14, 18]
+
+
+class FakeBackend:
+    """Synthetic cohort plus request counters; `latency` seconds are added to every response."""
+
+    def __init__(self, num_participants=200, num_events=50000, trial_days=20, latency=0.0, seed=0):
+        rng = random.Random(seed)
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        self.latency = latency
+        self.trial_days = trial_days
+        self.now = now
+        self.participants = [{
+            'patientId': f'patient-{i:04d}',
+            'nickName': f'participant-{i:04d}',
+            'phone': f'+97250{i:07d}',
+            'empaticaId': f'empatica-{i:04d}',
+            'firebaseId': f'token-{i:04d}',
+            'createdAt': (now - datetime.timedelta(days=trial_days + 5)).isoformat() + 'Z',
+            'trialStartingDate': (now - datetime.timedelta(days=rng.randrange(1, trial_days))).strftime('%Y-%m-%d %H:%M:%S'),
+            'empatica_last_update': (now - datetime.timedelta(hours=rng.random() * 30)).strftime('%Y-%m-%d %H:%M:%S'),
+            'empaticaStatus': rng.choice(['connected', 'disconnected']),
+            'isActive': rng.random() > 0.1,
+            'empaticaWearingStatus': rng.randrange(50, 100),
+        } for i in range(num_participants)]
+        self.events = [{
+            'patientId': f'patient-{rng.randrange(num_participants):04d}',
+            'deviceId': 'device',
+            'timestamp': (now - datetime.timedelta(hours=rng.random() * 24 * trial_days)).strftime('%Y-%m-%d %H:%M:%S.%f'),
+            'location': {'lat': 31.5 + rng.random(), 'long': 34.5 + rng.random()},
+            'eventType': rng.choice(EVENT_TYPES),
+            'activity': rng.choice(ACTIVITIES),
+            'severity': rng.randrange(5),
+            'origin': rng.choice(['app', 'assistant']),
+        } for _ in range(num_events)]
+        self.questionnaire = [
+            {'num': num, 'type': 'scale', 'question': f'question {num}',
+             'days': list(range(1, 8)), 'hours': SLOT_HOURS}
+            for num in range(1, 6)
+        ]
+        self._answers = {}
+        self._lock = threading.Lock()
+        self.requests = collections.Counter()
+
+    def answers(self, patient_id):
+        """Answers to every slot of the trial so far, ~70% of them valid."""
+        with self._lock:
+            if patient_id not in self._answers:
+                rng = random.Random(patient_id)
+                answers = []
+                for day in range(self.trial_days):
+                    for hour in SLOT_HOURS:
+                        slot = (self.now - datetime.timedelta(days=day)).replace(hour=hour, minute=0, second=0)
+                        if slot > self.now:
+                            continue
+                        for question in self.questionnaire:
+                            answered = slot + datetime.timedelta(minutes=rng.randrange(5, 90))
+                            answers.append({
+                                'patientId': patient_id,
+                                'questionNum': question['num'],
+                                'answer': str(rng.randrange(5)) if rng.random() < 0.7 else None,
+                                'timestamp': answered.strftime('%Y-%m-%d %H:%M:%S'),
+                            })
+                self._answers[patient_id] = answers
+            return self._answers[patient_id]
+
+    def count(self, endpoint):
+        with self._lock:
+            self.requests[endpoint] += 1
+
+    def request_counts(self):
+        with self._lock:
+            return dict(self.requests)
+
+    def serve(self, port=0):
+        """Starts the HTTP server in a daemon thread; returns (server, base URL)."""
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _reply(self, status, body):
+                data = json.dumps(body).encode()
+                if backend.latency:
+                    time.sleep(backend.latency)
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                backend.count(f'GET {url.path}')
+                if url.path == '/participants/':
+                    self._reply(200, backend.participants)
+                elif url.path == '/events/':
+                    self._reply(200, backend.events)
+                elif url.path == '/questionnaire/':
+                    self._reply(200, backend.questionnaire)
+                elif url.path == '/questions':
+                    self._reply(200, backend.answers(parse_qs(url.query).get('patientId', [''])[0]))
+                else:
+                    self._reply(404, {'error': 'not found'})
+
+            def _write(self):
+                url = urlparse(self.path)
+                backend.count(f'{self.command} {url.path}')
+                length = int(self.headers.get('Content-Length') or 0)
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                if self.command == 'POST' and url.path == '/events/':
+                    payload.setdefault('location', payload.pop('Location', None))
+                    with backend._lock:
+                        backend.events.append(payload)
+                self._reply(201 if self.command == 'POST' else 200, payload)
+
+            do_POST = _write
+            do_PATCH = _write
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--participants', type=int, default=200)
+    parser.add_argument('--events', type=int, default=50000)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="added to every response")
+    args = parser.parse_args(argv)
+
+    backend = FakeBackend(args.participants, args.events, latency=args.latency_ms / 1000)
+    server, base_url = backend.serve(args.port)
+    print(f"fake backend on {base_url} ({args.participants} participants, {args.events} events)")
+    try:
+        while True:
+            time.sleep(60)
+            print(backend.request_counts())
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Multi-session load test of app.py against the in-process fake backend (fake_backend.py).
+
+Each simulated coordinator is a separate Streamlit session (streamlit.testing AppTest, which
+runs app.py with the real ScriptRunner and session state, sharing the process-wide caches
+like sessions of one server). Sessions start staggered over --ramp seconds and repeat the
+typical interactions: log in, refresh, participant drill-down, post an event. Reports
+per-interaction latency percentiles, process CPU and RSS, and backend request amplification.
+
+    python benchmarks/loadtest.py --sessions 1 2 4 8 --iterations 3
+    python benchmarks/loadtest.py --sessions 4 --username Booggii --password ...   # through the login form
+
+Without --password, sessions start already authenticated (session_state, as after login).
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_backend import FakeBackend  # noqa: E402
+
+INTERACTIONS = ['login', 'refresh', 'drill_down', 'post_event']
+
+
+# ----------------------------
+# PROCESS RESOURCES
+# ----------------------------
+class ResourceSampler:
+    """Samples this process's RSS in a thread; CPU time comes from getrusage."""
+
+    def __init__(self, interval=0.25):
+        self.interval = interval
+        self.rss_samples = []
+        self._stop = threading.Event()
+
+    @staticmethod
+    def rss_bytes():
+        try:
+            with open('/proc/self/statm') as statm:
+                return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except OSError:
+            # ru_maxrss is KB on Linux, bytes on macOS
+            scale = 1 if sys.platform == 'darwin' else 1024
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+    @staticmethod
+    def cpu_seconds():
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return usage.ru_utime + usage.ru_stime
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self.cpu_started = self.cpu_seconds()
+
+        def run():
+            while not self._stop.is_set():
+                self.rss_samples.append(self.rss_bytes())
+                self._stop.wait(self.interval)
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.wall = time.perf_counter() - self.started
+        self.cpu = self.cpu_seconds() - self.cpu_started
+
+
+# ----------------------------
+# SIMULATED SESSION
+# ----------------------------
+def _by_label(widgets, label):
+    return next(widget for widget in widgets if widget.label == label)
+
+
+class Session:
+    """One coordinator: an AppTest of app.py and the interactions it performs."""
+
+    def __init__(self, timeout, username=None, password=None, seed=0):
+        from streamlit.testing.v1 import AppTest
+
+        self.app = AppTest.from_file(os.path.join(REPO_ROOT, 'app.py'), default_timeout=timeout)
+        self.username = username
+        self.password = password
+        self.rng = random.Random(seed)
+
+    def _check(self):
+        if self.app.exception:
+            raise RuntimeError(self.app.exception[0].message)
+
+    def login(self):
+        """First page load; through the login form when a password was given."""
+        if self.password is None:
+            self.app.session_state['authentication_status'] = True
+            self.app.session_state['name'] = 'loadtest'
+            self.app.run()
+        else:
+            self.app.run()
+            _by_label(self.app.text_input, 'Username').input(self.username)
+            _by_label(self.app.text_input, 'Password').input(self.password)
+            _by_label(self.app.button, 'Login').click()
+            self.app.run()
+        self._check()
+
+    def refresh(self):
+        self.app.button(key='refresh_button1').click()
+        self.app.run()
+        self._check()
+
+    def drill_down(self):
+        """Selects a random participant and clicks "Get Participant's Data"."""
+        select_user = _by_label(self.app.selectbox, 'Select User')
+        select_user.select(self.rng.choice(select_user.options))
+        _by_label(self.app.button, "Get Participant's Data").click()
+        self.app.run()
+        self._check()
+
+    def post_event(self):
+        """Submits the Add Event form for a random participant."""
+        select_participant = _by_label(self.app.selectbox, 'Select Participant')
+        select_participant.select(self.rng.choice(select_participant.options))
+        submit = next(button for button in self.app.button
+                      if button.label == 'Submit' and button.proto.form_id == 'add_event_form')
+        submit.click()
+        self.app.run()
+        self._check()
+
+
+def run_session(index, args, timings, errors, start_delay):
+    time.sleep(start_delay)
+    session = Session(args.timeout, args.username, args.password, seed=index)
+    steps = [('login', session.login)]
+    for _ in range(args.iterations):
+        steps += [('refresh', session.refresh), ('drill_down', session.drill_down),
+                  ('post_event', session.post_event)]
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            errors.append((name, f"{type(e).__name__}: {e}"))
+            if name == 'login':
+                return
+            continue
+        timings[name].append(time.perf_counter() - started)
+        time.sleep(args.think_time)
+
+
+# ----------------------------
+# REPORT
+# ----------------------------
+def report(num_sessions, timings, errors, resources, backend_requests):
+    print(f"\n=== {num_sessions} concurrent session(s): {resources.wall:.1f} s wall ===")
+    print(f"{'interaction':<12} {'n':>5} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    total = 0
+    for name in INTERACTIONS:
+        values = np.array(timings[name]) * 1000
+        total += len(values)
+        if len(values) == 0:
+            print(f"{name:<12} {0:>5}")
+            continue
+        p50, p90, p99 = np.percentile(values, [50, 90, 99])
+        print(f"{name:<12} {len(values):>5} {p50:>9.0f} {p90:>9.0f} {p99:>9.0f} {values.max():>9.0f}")
+
+    cores = os.cpu_count() or 1
+    rss = np.array(resources.rss_samples) / 1024 / 1024
+    print(f"CPU: {resources.cpu:.1f} s ({100 * resources.cpu / resources.wall:.0f}% of one core, {cores} cores)")
+    if len(rss):
+        print(f"RSS: start {rss[0]:.0f} MB, peak {rss.max():.0f} MB, end {rss[-1]:.0f} MB")
+
+    backend_total = sum(backend_requests.values())
+    print(f"Backend: {backend_total} requests, {backend_total / max(total, 1):.1f} per interaction, "
+          f"{backend_total / max(num_sessions, 1):.1f} per session")
+    for endpoint, count in sorted(backend_requests.items(), key=lambda item: -item[1]):
+        print(f"  {endpoint:<24} {count:>7}")
+    if errors:
+        print(f"{len(errors)} error(s), e.g. {errors[0][0]}: {errors[0][1]}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 2, 4, 8], help="concurrent sessions per run")
+    parser.add_argument('--iterations', type=int, default=3, help="refresh/drill-down/post rounds per session")
+    parser.add_argument('--ramp', type=float, default=2.0, help="seconds over which sessions start")
+    parser.add_argument('--think-time', type=float, default=0.0, help="pause between interactions (s)")
+    parser.add_argument('--participants', type=int, default=200)
+    parser.add_argument('--events', type=int, default=50000)
+    parser.add_argument('--latency-ms', type=float, default=20.0, help="fake backend latency per request")
+    parser.add_argument('--timeout', type=float, default=300.0, help="max seconds per script run")
+    parser.add_argument('--username', default='Booggii')
+    parser.add_argument('--password', default=None, help="log in through the form (default: pre-authenticated)")
+    args = parser.parse_args(argv)
+
+    backend = FakeBackend(args.participants, args.events, latency=args.latency_ms / 1000)
+    server, base_url = backend.serve()
+    # Must be set before the app's modules are imported by the first session. Everything the
+    # app writes goes to a temporary directory, so the synthetic cohort never replaces the
+    # real snapshot (it would be shown as stale real data on the next cold start)
+    scratch_dir = tempfile.mkdtemp(prefix='booggii-loadtest-')
+    os.environ['BOOGGII_SITES'] = f'loadtest={base_url}'
+    os.environ['BOOGGII_OUTBOX_PATH'] = os.path.join(scratch_dir, 'outbox.sqlite3')
+    os.environ['BOOGGII_SNAPSHOT_DIR'] = os.path.join(scratch_dir, 'snapshot_cache')
+    os.environ['BOOGGII_PROFILE_DIR'] = os.path.join(scratch_dir, 'profiles')
+    os.chdir(REPO_ROOT)
+    print(f"fake backend on {base_url}: {args.participants} participants, {args.events} events, "
+          f"{args.latency_ms:.0f} ms latency")
+
+    for num_sessions in args.sessions:
+        timings = {name: [] for name in INTERACTIONS}
+        errors = []
+        requests_before = backend.request_counts()
+        with ResourceSampler() as resources:
+            threads = [
+                threading.Thread(target=run_session,
+                                 args=(i, args, timings, errors, args.ramp * i / max(num_sessions, 1)))
+                for i in range(num_sessions)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        requests_after = backend.request_counts()
+        backend_requests = {endpoint: count - requests_before.get(endpoint, 0)
+                            for endpoint, count in requests_after.items()
+                            if count - requests_before.get(endpoint, 0)}
+        report(num_sessions, timings, errors, resources, backend_requests)
+
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
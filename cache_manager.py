@@ -0,0 +1,165 @@
+"""
+One memory-bounded cache for the long-running server process.
+
+Every cache (API responses, answer frames, derived tables) is a namespace of the shared
+CacheManager, so they compete for a single global budget: entries are sized when stored
+(DataFrame.memory_usage(deep=True), array nbytes, an estimate for JSON-like data), expire
+after their namespace's TTL, and the least recently used entries are evicted once the
+total goes over budget.
+"""
+import collections
+import itertools
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+CACHE_BUDGET_MB = int(os.environ.get('BOOGGII_CACHE_BUDGET_MB', '256'))
+
+# Items measured per list/dict when estimating JSON-like data; the rest are extrapolated
+_SIZE_SAMPLE = 100
+
+
+def estimate_size(value):
+    """Approximate memory footprint of `value` in bytes."""
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(value, np.ndarray) or type(value).__module__.startswith('pyarrow'):
+        # numpy arrays, Arrow tables and arrays
+        return int(value.nbytes)
+    if isinstance(value, (list, tuple, set)):
+        items = list(itertools.islice(value, _SIZE_SAMPLE))
+        if not items:
+            return sys.getsizeof(value)
+        sampled = sum(estimate_size(item) for item in items)
+        return sys.getsizeof(value) + sampled * len(value) // len(items)
+    if isinstance(value, dict):
+        if not value:
+            return sys.getsizeof(value)
+        items = list(itertools.islice(value.items(), _SIZE_SAMPLE))
+        sampled = sum(estimate_size(k) + estimate_size(v) for k, v in items)
+        return sys.getsizeof(value) + sampled * len(value) // len(items)
+    if hasattr(value, '__dict__') and not isinstance(value, type):
+        # Plain objects (e.g. StatusHistory): the sum of their attributes
+        return sys.getsizeof(value) + sum(estimate_size(attr) for attr in vars(value).values())
+    return sys.getsizeof(value)
+
+
+class _Entry:
+    __slots__ = ('value', 'size', 'expires_at')
+
+    def __init__(self, value, size, expires_at):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+
+
+class CacheManager:
+    """
+    LRU/TTL cache with a global memory budget, shared by named namespaces.
+    Thread-safe; use namespace() to get a cache view.
+    """
+
+    def __init__(self, budget_bytes=CACHE_BUDGET_MB * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self.total_bytes = 0
+        self._entries = collections.OrderedDict()  # (namespace, key) -> _Entry, oldest first
+        self._ttls = {}
+        self._stats = collections.defaultdict(lambda: {'hits': 0, 'misses': 0, 'evictions': 0})
+        self._lock = threading.RLock()
+
+    def namespace(self, name, ttl=None):
+        """A cache view over this manager's budget; entries expire after `ttl` seconds if set."""
+        with self._lock:
+            self._ttls[name] = ttl
+            self._stats[name]
+        return CacheNamespace(self, name)
+
+    def get(self, name, key, default=None):
+        with self._lock:
+            entry = self._entries.get((name, key))
+            if entry is not None and entry.expires_at is not None and entry.expires_at <= time.monotonic():
+                self._remove((name, key))
+                entry = None
+            if entry is None:
+                self._stats[name]['misses'] += 1
+                return default
+            self._entries.move_to_end((name, key))
+            self._stats[name]['hits'] += 1
+            return entry.value
+
+    def put(self, name, key, value):
+        size = estimate_size(value)
+        ttl = self._ttls.get(name)
+        with self._lock:
+            self._remove((name, key))
+            if size > self.budget_bytes:
+                # Would evict everything else and still not fit
+                self._stats[name]['evictions'] += 1
+                return
+            expires_at = time.monotonic() + ttl if ttl else None
+            self._entries[(name, key)] = _Entry(value, size, expires_at)
+            self.total_bytes += size
+            self._evict()
+
+    def pop(self, name, key):
+        with self._lock:
+            self._remove((name, key))
+
+    def clear(self, name=None):
+        """Drops all entries of one namespace, or of every namespace."""
+        with self._lock:
+            for entry_key in [k for k in self._entries if name is None or k[0] == name]:
+                self._remove(entry_key)
+
+    def _remove(self, entry_key):
+        entry = self._entries.pop(entry_key, None)
+        if entry is not None:
+            self.total_bytes -= entry.size
+
+    def _evict(self):
+        now = time.monotonic()
+        for entry_key in [k for k, e in self._entries.items() if e.expires_at is not None and e.expires_at <= now]:
+            self._remove(entry_key)
+        while self.total_bytes > self.budget_bytes and self._entries:
+            entry_key, entry = self._entries.popitem(last=False)
+            self.total_bytes -= entry.size
+            self._stats[entry_key[0]]['evictions'] += 1
+
+    def stats(self):
+        """Per-namespace entries, bytes, hits, misses and evictions as a DataFrame."""
+        with self._lock:
+            rows = {name: dict(stats, entries=0, bytes=0) for name, stats in self._stats.items()}
+            for (name, _), entry in self._entries.items():
+                rows[name]['entries'] += 1
+                rows[name]['bytes'] += entry.size
+        columns = ['entries', 'bytes', 'hits', 'misses', 'evictions']
+        return pd.DataFrame.from_dict(rows, orient='index', columns=columns).rename_axis('cache')
+
+
+class CacheNamespace:
+    """dict-like view of one namespace of a CacheManager."""
+
+    def __init__(self, manager, name):
+        self.manager = manager
+        self.name = name
+
+    def get(self, key, default=None):
+        return self.manager.get(self.name, key, default)
+
+    def put(self, key, value):
+        self.manager.put(self.name, key, value)
+
+    def pop(self, key):
+        self.manager.pop(self.name, key)
+
+    def clear(self):
+        self.manager.clear(self.name)
+
+
+# The process-wide manager used by api.py, data_processing and the dashboard
+cache_manager = CacheManager()
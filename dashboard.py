@@ -1,13 +1,13 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import requests
+import pyarrow as pa
+import pydeck as pdk
 from private_config import *
-import firebase_admin
-from firebase_admin import credentials
-from firebase_admin import messaging
 import re
 import datetime
+import os
+import threading
+import time
 from forms import (
     update_participant_form,
     add_participant_form,
@@ -17,25 +17,37 @@ from forms import (
 
 from data_processing import (
     transform_questionnaire_data,
-    calculate_percentage_of_nan_questions_last_x_hrs,
-    calculate_percentage_of_nan_questions,
-    calculate_displayed_questions,
+    build_answer_matrix,
     calculate_num_events,
-    calculate_time_since_last_connection,
-    compute_valid_answers_count    
+    STATUS_COLUMNS
 )
 
-import datetime
-import pytz
+from status_history import StatusHistory
+from parallel_status import compute_status
+from event_map import GEOHASH_PRECISIONS, event_locations, aggregate_cells
+from event_ingest import ingest_events, in_trial
+from empatica_stats import EMPATICA_STATS_COLUMNS, EmpaticaCollector, start_collector
+from trends import (
+    GRANULARITIES,
+    event_frequency_trend,
+    answer_compliance_trend
+)
 
-from api import (
-    fetch_participants, 
-    fetch_questionnaire_data, 
+from snapshot_cache import arrow_safe, load_snapshot, save_snapshot
+from cache_manager import cache_manager
+from participants import parse_participants, has_participants, apply_participant_updates
+from event_receiver import EventStore, start_receiver
+from outbox import Outbox, start_flusher, wait_drained
+from notifications import send_firebase_notification
+from profiling import ProfilerBusy, RerunProfiler, hot_functions, is_admin, save_profile
+
+from sites import (
+    fetch_cohort,
+    fetch_participants,
     fetch_events_data,
-    update_participant_to_db,
-    get_questions, 
-    add_participant_to_db, 
-    post_event_to_db
+    fetch_questionnaire_by_site,
+    fetch_questions_by_patient,
+    send_site_write,
 )
 
 # ----------------------------
@@ -45,41 +57,20 @@ status_placeholder = None
 participants_placeholder = None
 
 # Set a global timezone for the entire app
-israel_tz = pytz.timezone('Asia/Jerusalem')
-UTC_tz = pytz.timezone('Etc/GMT')
-
-# Initialize the Firebase Admin SDK
-if not firebase_admin._apps:
-    cred = credentials.Certificate(FIREBASE_CRED_PATH)
-    firebase_admin.initialize_app(cred)
-
-def send_firebase_notification(token, title, body, data=None):
-    message = messaging.Message(
-        notification=messaging.Notification(title=title, body=body),
-        data=data,
-        token=token,
-    )
-    response = messaging.send(message)
-    return response
+from time_utils import (
+    israel_tz,
+    ANSWER_NAIVE_TZ,
+    EMPATICA_NAIVE_TZ,
+    to_local,
+    to_timestamp
+)
 
 # ----------------------------
 # FETCH + PROCESS PARTICIPANTS
 # ----------------------------
 def fetch_participants_data():
-    participant_data = fetch_participants()
-    if participant_data:
-        for entry in participant_data:
-            # Rename fields to unify naming
-            entry['created_at'] = entry.pop('createdAt', entry.get('created_at', ''))
-            entry['updated_at'] = entry.pop('updatedAt', entry.get('updated_at', ''))
-            entry['trial_starting_date'] = entry.get('trialStartingDate', '')  # Adding trialStartingDate
-            entry['empatica_status'] = entry.pop('empaticaStatus', entry.get('empatica_status', ''))
-            entry['num_of_events_current_date'] = entry.pop('numOfEventsCurrentDate', entry.get('num_of_events_current_date', ''))
-            entry['is_active'] = entry.pop('isActive', entry.get('is_active', ''))
-            entry['Empatica Wearing Status'] = entry.pop('empaticaWearingStatus', entry.get('Empatica Wearing Status',''))
-        return participant_data
-    else:
-        return None
+    """Participants as a typed table indexed by patientId (see participants.parse_participants)."""
+    return parse_participants(fetch_participants())
     
 '''ET  התווסף שדה חדש בשם : empaticaWearingStatus
 הערכים שלו הם : NONE, True,False 
@@ -96,7 +87,7 @@ def highlight_old_updates(row):
     empatica_last_update = pd.to_datetime(row['empatica_last_update'], errors='coerce')
     # Force to tz-aware if not already
     if empatica_last_update is not None and empatica_last_update.tz is None:
-        empatica_last_update = empatica_last_update.tz_localize(UTC_tz)
+        empatica_last_update = empatica_last_update.tz_localize(EMPATICA_NAIVE_TZ)
     if pd.notnull(empatica_last_update):
         time_diff = current_time - empatica_last_update
         if time_diff.total_seconds() > threshold_hours * 3600:
@@ -174,46 +165,105 @@ def format_timestamp_without_subseconds_IST(timestamp_str):
     else:
         return "N/A"
 
-def show_participants_data():
-    global participants_placeholder
-    participant_data = fetch_participants()
-    event_data = fetch_events_data()
+# ----------------------------
+# ARROW DISPLAY TABLES
+# ----------------------------
+# Display tables are handed to st.dataframe as typed Arrow tables and formatted by
+# column_config, so timestamps ship as timestamp[tz] instead of strings
+display_tables_cache = cache_manager.namespace('display_tables')
 
-    if participant_data:
-        participant_df = pd.DataFrame(participant_data)
-
-        # Format columns
-        participant_df['created_at'] = participant_df['created_at'].apply(format_timestamp_without_subseconds_IST)
-        participant_df['trial_starting_date'] = participant_df['trial_starting_date'].apply(format_timestamp_without_subseconds_IST)
-        participant_df['Events total'] = calculate_num_events(event_data, participant_df, days=None)
-        column_order = [
-            'nickName',
-            'phone',
-            'patientId',
-            'empaticaStatus',
-            'created_at',
-            'trial_starting_date',
-            'empaticaId',
-            'firebaseId',
-            'Events total',
-            'isActive'
-        ]
-        participant_df = participant_df[column_order]
-
-        participants_placeholder.dataframe(participant_df, use_container_width=True, hide_index=True)
-    else:
-        st.error("Failed to fetch participants data.")
+# moment.js format used by st.column_config.DatetimeColumn; values are already in Israel time
+DISPLAY_DATETIME_FORMAT = "YYYY-MM-DD HH:mm:ss"
 
+PARTICIPANTS_COLUMN_CONFIG = {
+    'created_at': st.column_config.DatetimeColumn('created_at', format=DISPLAY_DATETIME_FORMAT),
+    'trial_starting_date': st.column_config.DatetimeColumn('trial_starting_date', format=DISPLAY_DATETIME_FORMAT),
+    'Events total': st.column_config.NumberColumn('Events total', format="%d"),
+}
 
-def format_time_since_update(hours):
-    if pd.isna(hours):
-        return "N/A"
-    if hours < 24:
-        return f"{hours:.1f} Hrs"
+EVENTS_COLUMN_CONFIG = {
+    'timestamp': st.column_config.DatetimeColumn('timestamp', format=DISPLAY_DATETIME_FORMAT),
+    'severity': st.column_config.NumberColumn('severity', format="%d"),
+}
+
+QUESTIONS_COLUMN_CONFIG = {
+    'Timestamp': st.column_config.DatetimeColumn('Timestamp', format=DISPLAY_DATETIME_FORMAT),
+}
+
+def to_display_table(df, categorical=()):
+    """
+    Typed Arrow table for st.dataframe: the given low-cardinality columns become
+    dictionary arrays; object columns Arrow cannot type become strings.
+    """
+    df = arrow_safe(df)
+    for column in categorical:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+def cached_display_table(name, version, build):
+    """
+    The Arrow table `name` for data `version`, built once per version and reused across
+    reruns; `build()` returns the table or None. No caching when `version` is None.
+    """
+    if version is None:
+        return build()
+    table = display_tables_cache.get((name, version))
+    if table is None:
+        table = build()
+        if table is not None:
+            display_tables_cache.put((name, version), table)
+    return table
+
+def state_version(state):
+    """Changes with every full download and every local patch of the state."""
+    return (state['synced_at'], state['revision'])
+
+def build_participants_table(participant_data, event_data):
+    """
+    Participants Data table (dates in Israel time + total events), or None if there is no data.
+    """
+    if not has_participants(participant_data):
+        return None
+    participant_df = participant_data.copy()
+
+    participant_df['created_at'] = participant_df['created_at'].dt.tz_convert(israel_tz)
+    participant_df['trial_starting_date'] = participant_df['trial_starting_date'].dt.tz_convert(israel_tz)
+    participant_df['Events total'] = calculate_num_events(event_data, participant_df, days=None)
+    column_order = [
+        'nickName',
+        'phone',
+        'patientId',
+        'empatica_status',
+        'created_at',
+        'trial_starting_date',
+        'empaticaId',
+        'firebaseId',
+        'Events total',
+        'is_active'
+    ]
+    participant_df = participant_df[column_order]
+    return participant_df.rename(columns={'empatica_status': 'empaticaStatus', 'is_active': 'isActive'})
+
+def participants_display_table(participant_data, event_data, version=None):
+    def build():
+        participants_table = build_participants_table(participant_data, event_data)
+        if participants_table is None:
+            return None
+        return to_display_table(participants_table, categorical=['empaticaStatus'])
+    return cached_display_table('participants', version, build)
+
+
+def show_participants_data(participants_table=None):
+    global participants_placeholder
+    if participants_table is None:
+        participants_table = build_participants_table(fetch_participants_data(), fetch_events_data())
+
+    if participants_table is not None:
+        participants_placeholder.dataframe(participants_table, column_config=PARTICIPANTS_COLUMN_CONFIG,
+                                           use_container_width=True, hide_index=True)
     else:
-        days = int(hours // 24)
-        remaining_hours = hours % 24
-        return f"{days} days, {remaining_hours:.1f} Hrs"
+        st.error("Failed to fetch participants data.")
 
 
 def displayed_questions_numbers(timetable_df, start_date, end_date):
@@ -266,126 +316,45 @@ def displayed_questions_numbers(timetable_df, start_date, end_date):
 # ----------------------------
 def fetch_participants_status(participant_data, event_data):
     """
-    Builds a DataFrame of participants' status, including:
+    Builds a DataFrame of active participants' status, including:
       - Time since last Empatica update
       - Empatica Wearing Status
       - % unanswered last 36 hours
       - % unanswered total
-      - Valid answers since trial start
-      - Displayed questions since trial start (NEW COLUMN)
       - Events last 7 days & total
     """
-    if participant_data and event_data:
-        participant_df = pd.DataFrame(participant_data)
- #       participant_df = participant_df[participant_df["is_active"] == "True"]
-
-        # Convert empatica_last_update to tz-aware
-        participant_df['empatica_last_update'] = pd.to_datetime(participant_df['empatica_last_update'], errors='coerce')
-        #participant_df['empatica_last_update'] = participant_df['empatica_last_update'].apply(
-        #    lambda x: x.tz_localize(israel_tz) if pd.notnull(x) and x.tzinfo is None else x
-        #)        
-        participant_df['empatica_last_update'] = participant_df['empatica_last_update'].apply(
-            lambda x: x.tz_localize(UTC_tz) if pd.notnull(x) and x.tzinfo is None else x
-        )
-
-        # Add columns
-        participant_df['NaN ans last 36 hours (%)'] = 0.0
-        participant_df['NaN ans total (%)'] = 0.0
-        participant_df['Valid Answers Since Trial'] = 0
-        # NEW COLUMN for how many questions were displayed 
-        participant_df['Displayed Questions Since Trial'] = 0
-
-        questionnaire_data = fetch_questionnaire_data()
-        questionnaire_df, timetable_df = transform_questionnaire_data(questionnaire_data)
-
-        end_date_36hr = pd.Timestamp.now(tz=israel_tz)  # tz-aware now
-
-        for idx, participant in participant_df.iterrows():
-            patient_id = participant['patientId']
-            questions_data = get_questions(patient_id)
-
-            # trial start date
-            patient_start_str = participant.get('trialStartingDate', None)
-            if not patient_start_str or patient_start_str == 'None':
-                # default to 30 days ago
-                patient_start_trial = end_date_36hr - pd.Timedelta(days=30)
-            else:
-                patient_start_trial = pd.to_datetime(patient_start_str, errors='coerce')
-                if pd.isna(patient_start_trial):
-                    patient_start_trial = end_date_36hr - pd.Timedelta(days=14)
-                # localize if naive
-                if patient_start_trial.tzinfo is None:
-                    patient_start_trial = israel_tz.localize(patient_start_trial)
-
-            # trial is 30 days
-            total_end_date = patient_start_trial + pd.Timedelta(days=30)
-            # if it’s in future, cap it
-            if total_end_date > end_date_36hr:
-                total_end_date = end_date_36hr
-
-            if questions_data:
-                # 1. last 36 hours unanswered
-                current_time = pd.Timestamp.now(tz=israel_tz)
-                hours_since_start = (current_time - patient_start_trial).total_seconds() / 3600.0
-                hours_to_calc = min(36, hours_since_start)
-
-                perc_36_hrs = calculate_percentage_of_nan_questions_last_x_hrs(questions_data, timetable_df, current_time, hrs=hours_to_calc)
-
-                # 2. total unanswered from trial start
-                perc_total = calculate_percentage_of_nan_questions(questions_data, timetable_df, patient_start_trial, total_end_date)
-
-                # 3. valid answers from trial start
-                valid_answers_count = compute_valid_answers_count(
-                    questions_data, 
-                    start_date=patient_start_trial, 
-                    end_date=total_end_date
-                )
-                
-                # 4) Displayed questions in [trialStart, now]
-                displayed_q_count = calculate_displayed_questions(
-                    timetable_df, 
-                    start_date=patient_start_trial, 
-                    end_date=total_end_date
-                )
-
-                participant_df.at[idx, 'NaN ans last 36 hours (%)'] = perc_36_hrs
-                participant_df.at[idx, 'NaN ans total (%)'] = perc_total
-                participant_df.at[idx, 'Valid Answers Since Trial'] = valid_answers_count
-                participant_df.at[idx, 'Displayed Questions Since Trial'] = displayed_q_count
-
-            else:
-                # if no questions data
-                participant_df.at[idx, 'NaN ans last 36 hours (%)'] = 100.0
-                participant_df.at[idx, 'NaN ans total (%)'] = 100.0
-                participant_df.at[idx, 'Valid Answers Since Trial'] = 0
-                participant_df.at[idx, 'Displayed Questions Since Trial'] = 0
-
-
-        # time since last update
-        participant_df['Time Since Empatica Update'] = participant_df['empatica_last_update'].apply(calculate_time_since_last_connection)
-        participant_df['Time Since Empatica Update'] = participant_df['Time Since Empatica Update'].apply(format_time_since_update)
-
-        # events in the last 7 days & total
-        participant_df['Events last 7 days'] = calculate_num_events(event_data, participant_df, days=7)
-        participant_df['Events total'] = calculate_num_events(event_data, participant_df, days=None)
-
-        participant_df = participant_df[participant_df["is_active"] == "True"].copy()
-
-        # reorder columns
-        column_order = [
-            'nickName',
-            'Time Since Empatica Update',
-            'Empatica Wearing Status',
-            'NaN ans last 36 hours (%)',
-            'NaN ans total (%)',
-            'Events last 7 days',
-            'Events total'
-        ]
-        participant_df = participant_df[column_order]
-        return participant_df
-    else:
+    status_df = compute_full_status(participant_data, event_data, fetch_questionnaire_by_site())
+    if status_df is None:
         st.error("Failed to fetch participant or event data.")
         return None
+    return select_displayed_status(status_df)
+
+def compute_full_status(participant_data, event_data, questionnaire_by_site):
+    """
+    Status of all participants indexed by patientId (see compute_participants_status).
+    Makes no Streamlit calls, so it can also run in the background reconciliation thread.
+    """
+    if not has_participants(participant_data) or event_data is None or len(event_data) == 0 or not questionnaire_by_site:
+        return None
+    questions_by_patient = fetch_questions_by_patient(participant_data['patientId'])
+    return compute_status_by_site(participant_data, event_data, questions_by_patient, questionnaire_by_site)
+
+def compute_status_by_site(participant_data, event_data, questions_by_patient, questionnaire_by_site):
+    """
+    compute_participants_status with each site's participants scored against their site's
+    questionnaire (the first site's one when theirs is missing). Keeps the participants' order.
+    """
+    default_questionnaire = next(iter(questionnaire_by_site.values()))
+    frames = []
+    for site, site_participants in participant_data.groupby('site', sort=False, dropna=False):
+        _, timetable_df = transform_questionnaire_data(questionnaire_by_site.get(site, default_questionnaire))
+        frames.append(compute_status(site_participants, event_data, questions_by_patient, timetable_df))
+    return pd.concat(frames).reindex(participant_data.index)
+
+def select_displayed_status(status_df):
+    """Active participants only, with the columns shown in Participants Status."""
+    active_df = status_df[status_df["is_active"]]
+    return active_df[STATUS_COLUMNS]
 
 def highlight_if_above(val, threshold):
     """
@@ -399,12 +368,39 @@ def highlight_if_below(val, threshold):
     """
     Return a highlight style if val > threshold, else no styling.
     """
-    if pd.notnull(val) and float(val) < threshold:
-        return 'background-color: yellow;'
+    try:
+        if pd.notnull(val) and float(val) < threshold:
+            return 'background-color: yellow;'
+    except (TypeError, ValueError):
+        pass
     return ''
 
+# Empatica history columns (see empatica_stats.py)
+EMPATICA_STATS_COLUMN_CONFIG = {
+    'Wear trend 24h': st.column_config.BarChartColumn('Wear trend 24h', y_min=0, y_max=100,
+                                                      help="Hourly wearing status over the last 24 hours"),
+}
+
+@st.cache_resource
+def get_empatica_collector():
+    """Process-wide Empatica sampler; starts with the first session and samples every 5 minutes."""
+    collector = EmpaticaCollector()
+    start_collector(collector, fetch_participants)
+    return collector
+
+def with_empatica_stats(participants_status_df):
+    """The status table with the Empatica history columns after 'Empatica Wearing Status'."""
+    stats = get_empatica_collector().stats()
+    joined = participants_status_df.join(stats, how='left')
+    # Participants not sampled yet have no trend
+    joined['Wear trend 24h'] = [trend if isinstance(trend, list) else [] for trend in joined['Wear trend 24h']]
+    columns = list(participants_status_df.columns)
+    position = columns.index('Empatica Wearing Status') + 1
+    return joined[columns[:position] + EMPATICA_STATS_COLUMNS + columns[position:]]
+
 def show_participants_status(participants_status_df):
     if participants_status_df is not None:
+        participants_status_df = with_empatica_stats(participants_status_df)
         styled_df = (
             participants_status_df.style
             # 1) Still highlight Time Since Empatica Update as before
@@ -424,61 +420,71 @@ def show_participants_status(participants_status_df):
 
             # 4) Highlight "Events last 7 days" if > 7
             .applymap(lambda x: highlight_if_below(x, 75), 
-                      subset=["Empatica Wearing Status"])
+                      subset=["Empatica Wearing Status", "Empatica uptime 24h (%)", "Wear 24h (%)"])
             
-            # 6) Finally format certain columns as integers (if desired)
+            # 6) Finally format certain columns as integers (if desired);
+            #    answer metrics are N/A when the backend was unavailable
             .format({
                 "NaN ans last 36 hours (%)": "{:.0f}",
                 "NaN ans total (%)": "{:.0f}",
                 "Events last 7 days": "{:.0f}",
                 "Events total": "{:.0f}",
-            })
+                "Empatica uptime 24h (%)": "{:.0f}",
+                "Longest sync gap (h)": "{:.1f}",
+                "Sync delay EWMA (h)": "{:.1f}",
+                "Wear 24h (%)": "{:.0f}",
+            }, na_rep="N/A")
         )
-        status_placeholder.dataframe(styled_df, use_container_width=True, hide_index=True)
+        status_placeholder.dataframe(styled_df, column_config=EMPATICA_STATS_COLUMN_CONFIG,
+                                     use_container_width=True, hide_index=True)
     else:
         st.error("Failed to fetch participants status data.")
 # ----------------------------
 # SHOW QUESTIONS + EVENTS
 # ----------------------------
-def show_questions(patient_id, questionnaire_df):
-    questions_data = get_questions(patient_id)
+def show_answer_matrix(questions_data, timetable_df, trial_start):
+    """
+    Scheduled slots (newest first) x questions since the trial start: missed questions
+    in red, questions not scheduled in that slot greyed out.
+    """
+    now = pd.Timestamp.now(tz=israel_tz)
+    start_date = trial_start if pd.notnull(trial_start) else now - pd.Timedelta(days=30)
+    end_date = min(start_date + pd.Timedelta(days=30), now)
+    answers, scheduled = build_answer_matrix(questions_data, timetable_df, start_date, end_date)
+    if answers.empty:
+        st.warning("No questions were scheduled since the trial start.")
+        return
+
+    missed = scheduled & answers.isna()
+    st.caption(f"{int(missed.to_numpy().sum())} of {int(scheduled.to_numpy().sum())} scheduled questions missed")
+    cell_styles = (
+        pd.DataFrame('', index=answers.index, columns=answers.columns)
+        .mask(missed, 'background-color: #f8d7da;')
+        .mask(~scheduled, 'background-color: #eeeeee;')
+    )
+    styled = (
+        answers.iloc[::-1].style
+        .apply(lambda _: cell_styles.iloc[::-1], axis=None)
+        .format("{:.0f}", na_rep="")
+        .format_index(lambda slot: slot.strftime('%a %d/%m %H:%M'))
+    )
+    st.dataframe(styled, use_container_width=True)
+
+def show_questions(questions_data, questionnaire_df):
     if questions_data and questionnaire_df is not None:
-        timestamps = []
-        question_nums = []
-        question_texts = []
-        answers = []
-
-        for question in questions_data:
-            answer = question.get('answer', None)
-            question_num = question.get('questionNum')
-            row_match = questionnaire_df.loc[questionnaire_df['מס שאלה'] == question_num, 'השאלה']
-            question_text = row_match.iloc[0] if not row_match.empty else "(Missing question)"
-            timestamp = question.get('timestamp', 'No timestamp provided')
-            # Parse tz-aware
-            parsed_ts = pd.to_datetime(timestamp, errors='coerce')
-            if parsed_ts is not None and not pd.isna(parsed_ts):
-                if parsed_ts.tzinfo is None:
-                    parsed_ts = israel_tz.localize(parsed_ts)
-                formatted_ts = parsed_ts.strftime('%Y-%m-%d %H:%M:%S %Z')
-            else:
-                formatted_ts = "Invalid or missing"
-
-            timestamps.append(formatted_ts)
-            question_nums.append(question_num)
-            question_texts.append(question_text)
-            answers.append(answer)
-
-        if timestamps:
-            questions_df = pd.DataFrame({
-                'Timestamp': timestamps,
-                'Num': question_nums,
-                'Question': question_texts,
-                'Answer': answers
-            })
-            questions_df.sort_values(by='Timestamp', ascending=False, inplace=True)
-            st.dataframe(questions_df, use_container_width=True, hide_index=True)
-        else:
-            st.warning("No questions with answers found.")
+        answers = pd.DataFrame(questions_data).reindex(columns=['timestamp', 'questionNum', 'answer'])
+        question_texts = dict(zip(questionnaire_df['מס שאלה'], questionnaire_df['השאלה']))
+
+        # Parse in one pass (naive ones are Israel time); unparsable timestamps become NaT
+        questions_df = pd.DataFrame({
+            'Timestamp': to_local(answers['timestamp'], ANSWER_NAIVE_TZ),
+            'Num': answers['questionNum'],
+            'Question': answers['questionNum'].map(question_texts).fillna("(Missing question)"),
+            'Answer': answers['answer'],
+        })
+        questions_df.sort_values(by='Timestamp', ascending=False, inplace=True)
+        st.dataframe(to_display_table(questions_df, categorical=['Question']),
+                     column_config=QUESTIONS_COLUMN_CONFIG, use_container_width=True, hide_index=True)
     else:
         st.error("Failed to retrieve questions or questionnaire data.")
 
@@ -519,105 +525,654 @@ def update_participant_data_status_display():
     show_participants_status(participants_status_df)
 
 
-def display_events_data(event_data, participant_data):
-    participant_df = pd.DataFrame(participant_data)
-    if event_data and participant_data:
-        events_df = pd.DataFrame(event_data)
-        
-         # A) Convert the column to strings with microseconds if missing
-        events_df['timestamp'] = events_df['timestamp'].apply(
-            lambda x: ensure_microseconds(x) if pd.notnull(x) else x
-        )
+# ----------------------------
+# LOCAL STATE + INCREMENTAL UPDATES
+# ----------------------------
+# Local state older than this is reconciled with the server in the background
+RECONCILE_AFTER_SECONDS = 300
+# A reconciliation first waits this long for queued form writes to reach the server
+RECONCILE_DRAIN_TIMEOUT_SECONDS = 120
 
-        # B) Now parse to datetime
-        events_df['timestamp'] = pd.to_datetime(events_df['timestamp'], errors='coerce')
+# Set to run the local receiver for pushed events (see event_receiver.py; needs its secret)
+EVENT_RECEIVER_PORT = os.environ.get("BOOGGII_EVENT_RECEIVER_PORT")
+EVENT_RECEIVER_HOST = os.environ.get("BOOGGII_EVENT_RECEIVER_HOST", "127.0.0.1")
 
-        # C) Format for display
-        events_df['timestamp'] = events_df['timestamp'].apply(
-            lambda x: x.strftime('%Y-%m-%d %H:%M:%S %Z') if pd.notnull(x) else None
-        )
-        
-        # For display, optionally convert to a string without microseconds
-    #    events_df['timestamp'] = events_df['timestamp'].apply(lambda x: x.strftime('%Y-%m-%d %H:%M:%S %Z') if pd.notnull(x) else None)
+@st.cache_resource
+def get_event_store():
+    """
+    Process-wide store of pushed events, shared by all sessions; None when the receiver is disabled.
+    The receiver starts with the first session of the server process.
+    """
+    if not EVENT_RECEIVER_PORT:
+        return None
+    store = EventStore()
+    start_receiver(store, host=EVENT_RECEIVER_HOST, port=int(EVENT_RECEIVER_PORT))
+    return store
+
+@st.cache_resource
+def get_outbox():
+    """Process-wide outbox of form writes; its flusher starts with the first session."""
+    outbox = Outbox()
+    start_flusher(outbox, send_site_write)
+    return outbox
+
+def show_outbox_status():
+    """Writes still waiting for the server, and any the server rejected."""
+    counts = get_outbox().counts()
+    if counts.get('pending'):
+        st.caption(f"{counts['pending']} saved change(s) waiting to be sent to the server")
+    if counts.get('rejected'):
+        with st.expander(f"{counts['rejected']} change(s) rejected by the server"):
+            for kind, payload, error in get_outbox().rejected():
+                st.write(f"{kind}: {error}")
+                st.json(payload)
+
+def fetch_local_state(event_store=None):
+    """
+    Full download of participants, events and questionnaire plus the full status table.
+    Makes no Streamlit calls, so it can run in the background reconciliation thread.
+    """
+    cohort = fetch_cohort()
+    participant_data = parse_participants(cohort['participants'])
+    event_data = cohort['events']
+    questionnaire_by_site = cohort['questionnaire_by_site']
+    # Validated, deduplicated events used by all views (see event_ingest.py)
+    event_frame, event_quarantine = ingest_events(event_data or [], participant_data)
+    return {
+        'participants': participant_data,
+        'events': event_data,
+        'event_frame': event_frame if event_data is not None else None,
+        'event_quarantine': event_quarantine,
+        # Dedup keys of event_frame, for ingesting single events (see apply_events_to_state)
+        'dedup_keys': set(event_frame['dedup_key']),
+        # Shown in the questionnaire views; status uses each site's own questionnaire
+        'questionnaire_data': next(iter(questionnaire_by_site.values()), None),
+        'questionnaire_by_site': questionnaire_by_site,
+        'failed_sites': cohort['failed_sites'],
+        'status': compute_full_status(participant_data, event_frame, questionnaire_by_site),
+        'synced_at': time.time(),
+        # Bumped by every local patch (see state_version)
+        'revision': 0,
+        # Events pushed from here on are applied on top of this download
+        'event_cursor': len(event_store) if event_store is not None else 0,
+    }
+
+def reconcile_in_background():
+    """
+    Starts one background full fetch; load_local_state swaps its result in on a later rerun.
+    The fetch starts once the writes queued so far have reached the server, so the
+    download includes them and doesn't undo their local patches; if they are still queued
+    after RECONCILE_DRAIN_TIMEOUT_SECONDS, this reconciliation is skipped.
+    """
+    job = st.session_state.get('reconcile_job')
+    if job is not None and 'result' not in job:
+        return  # already running
+    job = {}
+    st.session_state['reconcile_job'] = job
+    event_store = get_event_store()
+    outbox = get_outbox()
+    written_through = outbox.last_id()
+
+    def run():
+        # Always sets a result, so load_local_state clears the job and a later rerun can retry;
+        # a failed reconciliation (status None) keeps the current local state
+        try:
+            if not wait_drained(outbox, written_through, RECONCILE_DRAIN_TIMEOUT_SECONDS):
+                job['result'] = {'status': None}
+                return
+            job['result'] = fetch_local_state(event_store)
+        except Exception as e:
+            job['result'] = {'status': None, 'error': str(e)}
 
-        merged_df = pd.merge(events_df, participant_df[['patientId', 'nickName']], on='patientId', how='left')
-        
-        # Convert trial start column to datetime
-        participant_df['trial_starting_date'] = pd.to_datetime(participant_df['trial_starting_date'], errors='coerce')
+    threading.Thread(target=run, daemon=True).start()
 
-        # Localize trial start if naive
-        participant_df['trial_starting_date'] = participant_df['trial_starting_date'].apply(
-            lambda x: israel_tz.localize(x) if pd.notnull(x) and x.tzinfo is None else x
-        )
+def load_local_state(fetch_if_missing=True):
+    """
+    Participants, events, questionnaire and full status kept in st.session_state between reruns,
+    so reruns and form writes don't re-download everything.
+    The first run of a session fetches synchronously; afterwards a finished background
+    reconciliation replaces the local state, and a stale one triggers a new reconciliation.
+    With fetch_if_missing=False (live panel reruns) it never blocks and returns None
+    until a full run has loaded the state.
+    """
+    state = st.session_state.get('local_state')
+    job = st.session_state.get('reconcile_job')
+    event_store = get_event_store()
+
+    if job is not None and 'result' in job:
+        st.session_state.pop('reconcile_job')
+        if job['result']['status'] is not None:
+            state = job['result']
+            st.session_state['local_state'] = state
+            apply_pushed_events(state, event_store)
+            return state
+
+    if state is None or state['status'] is None:
+        if not fetch_if_missing:
+            return None
+        state = fetch_local_state(event_store)
+        st.session_state['local_state'] = state
+        return state
 
-        # Merge trial start into merged_df
-        merged_df = pd.merge(
-            merged_df,
-            participant_df[['patientId', 'trial_starting_date']],
-            on='patientId',
-            how='left'
-        )
+    apply_pushed_events(state, event_store)
+    if time.time() - state['synced_at'] > RECONCILE_AFTER_SECONDS:
+        reconcile_in_background()
+    return state
 
-        # Convert events_df timestamp to datetime again just in case (safe step)
-        merged_df['timestamp'] = pd.to_datetime(merged_df['timestamp'], errors='coerce')
+def apply_events_to_state(state, events):
+    """
+    Appends events to the local state in one batch and, for each one ingest accepts (not
+    invalid nor a duplicate of a known event), increments its participant's counts in place.
+    Duplicates are found in the state's set of dedup keys, without scanning the events.
+    """
+    if not events:
+        return
+    events = [dict(event) for event in events]
+    for event in events:
+        if 'Location' in event:
+            event['location'] = event.pop('Location')
+    state['events'].extend(events)
+    state['revision'] += 1
+
+    accepted, rejected = ingest_events(events, state['participants'], existing=state['dedup_keys'])
+    if not rejected.empty:
+        state['event_quarantine'] = pd.concat([state['event_quarantine'], rejected], ignore_index=True)
+    if accepted.empty:
+        return
+    state['dedup_keys'].update(accepted['dedup_key'])
+    state['event_frame'] = pd.concat([state['event_frame'], accepted], ignore_index=True)
+
+    status_df = state['status']
+    week_ago = pd.Timestamp.now(tz=israel_tz) - pd.Timedelta(days=7)
+    for patient_id, event_time in zip(accepted['patientId'], accepted['timestamp']):
+        if patient_id in status_df.index:
+            status_df.at[patient_id, 'Events total'] += 1
+            if event_time >= week_ago:
+                status_df.at[patient_id, 'Events last 7 days'] += 1
+
+def apply_pushed_events(state, event_store):
+    """
+    Applies the events the receiver got since this session last looked. If some were
+    already dropped from the receiver's buffer, a reconciliation brings them in.
+    """
+    if event_store is None or state['status'] is None:
+        return
+    events, state['event_cursor'], missed = event_store.events_since(state['event_cursor'])
+    if missed:
+        reconcile_in_background()
+    apply_events_to_state(state, events)
+
+def refresh_status_rows(state, patient_ids, questions_by_patient=None):
+    """
+    Recomputes the status rows of the given participants only (one get_questions call
+    each, unless their answers are given as `questions_by_patient`).
+    """
+    records = state['participants'][state['participants'].index.isin(patient_ids)]
+    if records.empty or not state['questionnaire_by_site']:
+        return
+    if questions_by_patient is None:
+        questions_by_patient = fetch_questions_by_patient(records['patientId'])
+    rows = compute_status_by_site(records, state['event_frame'], questions_by_patient, state['questionnaire_by_site'])
+
+    status_df = state['status']
+    status_df = pd.concat([status_df[~status_df.index.isin(rows.index)], rows])
+    # Keep the participants' order
+    state['status'] = status_df.reindex(state['participants'].index)
+    state['revision'] += 1
+
+def show_local_state(state):
+    show_participants_status(select_displayed_status(state['status']))
+    show_participants_data(participants_display_table(state['participants'], state['event_frame'], state_version(state)))
+
+def apply_participant_write():
+    """
+    Updates the local state after add_participant_form / update_participant_form
+    queued a write: only the written participant's row is recomputed.
+    Falls back to a full refresh when there is no local state to patch.
+    """
+    state = st.session_state.get('local_state')
+    write = st.session_state.pop('last_participant_write', None)
+    if state is None or state['status'] is None or write is None:
+        update_participant_data_status_display()
+        return
+
+    participants = state['participants']
+    patient_id = write.get('patientId')
+    if write.get('pending'):
+        # New participant, still queued: a provisional row from the form's payload until the
+        # reconciliation brings the server's row (and patientId); no answers to fetch yet
+        record = {field: value for field, value in write.items() if field != 'pending'}
+        state['participants'] = pd.concat([participants, parse_participants([record])])
+        state['revision'] += 1
+        refresh_status_rows(state, [patient_id], questions_by_patient={patient_id: None})
+    elif patient_id in participants.index:
+        state['participants'] = apply_participant_updates(participants, patient_id, write)
+        state['revision'] += 1
+        refresh_status_rows(state, [patient_id])
+
+    show_local_state(state)
+    reconcile_in_background()
+
+def apply_event_write():
+    """
+    Updates the local state after add_event_form queued an event:
+    appends it and increments that participant's event counts.
+    """
+    state = st.session_state.get('local_state')
+    event = st.session_state.pop('last_event_write', None)
+    if state is None or state['status'] is None or event is None:
+        return
 
-        # Localize if needed
-        merged_df['timestamp'] = merged_df['timestamp'].apply(
-            lambda x: israel_tz.localize(x) if pd.notnull(x) and x.tzinfo is None else x
-        )
+    apply_events_to_state(state, [event])
+    show_local_state(state)
+    reconcile_in_background()
 
-        # Keep only events after trial start
-        merged_df = merged_df[
-            (pd.notnull(merged_df['trial_starting_date'])) &
-            (merged_df['timestamp'] >= merged_df['trial_starting_date'])
-        ]
 
-        
-        if 'deviceId' in merged_df.columns:
-            merged_df.drop(columns=['deviceId'], inplace=True)
+def build_events_table(event_data, participant_data):
+    """
+    All events after each participant's trial start, newest first, as an Arrow table (None if no data).
+    `event_data` is the ingested events frame (see event_ingest.ingest_events).
+    """
+    if event_data is None or event_data.empty or not has_participants(participant_data):
+        return None
+    merged_df = pd.merge(in_trial(event_data), participant_data[['patientId', 'nickName']].reset_index(drop=True),
+                         on='patientId', how='left')
 
-        reordered_columns = ['timestamp', 'nickName', 'severity', 'eventType', 'activity', 'origin', 'patientId', 'location']
-        merged_df = merged_df[reordered_columns]
-        events_df_sorted = merged_df.sort_values(by='timestamp', ascending=False)
-        st.dataframe(events_df_sorted, use_container_width=True, hide_index=True)
+    reordered_columns = ['timestamp', 'nickName', 'severity', 'eventType', 'activity', 'origin', 'patientId', 'location']
+    merged_df = merged_df.reindex(columns=reordered_columns)
+    events_df_sorted = merged_df.sort_values(by='timestamp', ascending=False)
+    return to_display_table(events_df_sorted, categorical=['nickName', 'eventType', 'activity', 'origin', 'patientId'])
+
+def display_events_data(event_data, participant_data, version=None):
+    events_table = cached_display_table(
+        'events', version, lambda: build_events_table(event_data, participant_data)
+    )
+    if events_table is not None:
+        st.dataframe(events_table, column_config=EVENTS_COLUMN_CONFIG, use_container_width=True, hide_index=True)
     else:
         st.error("Failed to fetch data or no data available.")
 
+def show_event_quarantine(quarantine):
+    """Events left out at ingest (invalid or duplicate), with the reason."""
+    if quarantine is None or quarantine.empty:
+        return
+    with st.expander(f"Rejected events ({len(quarantine)})"):
+        st.dataframe(quarantine['reason'].value_counts(), use_container_width=True)
+        st.dataframe(to_display_table(quarantine.drop(columns=['Location', 'location'], errors='ignore'),
+                                      categorical=['reason']),
+                     use_container_width=True, hide_index=True)
+
+# ----------------------------
+# LIVE STATUS PANEL
+# ----------------------------
+LIVE_REFRESH_SECONDS = 60
+
+# st.fragment reruns only the decorated function (Streamlit >= 1.37; experimental before)
+fragment = getattr(st, "fragment", None) or st.experimental_fragment
+
+@fragment(run_every=LIVE_REFRESH_SECONDS)
+def live_status_panel():
+    """
+    Participants Status on its own rerun loop: each tick only applies pushed events and
+    swaps in a finished background reconciliation (starting one when the data is stale),
+    then redraws this table. The rest of the page and its widgets are not rerun.
+    """
+    global status_placeholder
+    status_placeholder = st.empty()
+    state = load_local_state(fetch_if_missing=False)
+    if state is None or state['status'] is None:
+        return  # the first full run fills the placeholder
+    show_participants_status(select_displayed_status(state['status']))
+    synced_at = pd.Timestamp(state['synced_at'], unit='s', tz='UTC').tz_convert(israel_tz)
+    st.caption(f"Live - last full sync {synced_at.strftime('%H:%M:%S')}, "
+               f"updated {pd.Timestamp.now(tz=israel_tz).strftime('%H:%M:%S')}")
+
+# ----------------------------
+# TRENDS
+# ----------------------------
+answers_cache = cache_manager.namespace('answers', ttl=600)
+
+def fetch_answers_data(patient_ids):
+    """
+    All questionnaire answers of the given participants as one DataFrame with a patientId
+    column, and the patientIds whose answers are unavailable (backend down), which are
+    unknown rather than unanswered. Cached (10 minutes) until 'Refresh Data' clears the data caches.
+    """
+    cached = answers_cache.get(patient_ids)
+    if cached is not None:
+        return cached
+    frames = []
+    unavailable = []
+    for patient_id, questions_data in fetch_questions_by_patient(patient_ids).items():
+        if questions_data is None:
+            unavailable.append(patient_id)
+        elif questions_data:
+            answers = pd.DataFrame(questions_data)
+            answers['patientId'] = patient_id
+            frames.append(answers)
+    if not frames:
+        answers_df = pd.DataFrame(columns=['patientId', 'questionNum', 'answer', 'timestamp'])
+    else:
+        answers_df = pd.concat(frames, ignore_index=True)
+    answers_cache.put(patient_ids, (answers_df, tuple(unavailable)))
+    return answers_df, tuple(unavailable)
+
+
+def show_trends(participant_data, event_data, timetable_df, synced_at):
+    """
+    Daily/hourly/weekly answer compliance and event frequency for the cohort or one participant.
+    `synced_at` identifies the full download, so the answers are snapshotted once per download.
+    """
+    if not has_participants(participant_data):
+        st.error("No participant data available.")
+        return
+    participant_df = participant_data
+
+    col1, col2, col3 = st.columns(3, gap="small")
+    with col1:
+        metric = st.selectbox("Metric", ["Answer compliance (%)", "Events"], key="trend_metric")
+    with col2:
+        granularity = st.selectbox("Granularity", GRANULARITIES, index=1, key="trend_granularity")
+    with col3:
+        who = st.selectbox("Participant", ["Cohort"] + participant_df['nickName'].tolist(), key="trend_participant")
+
+    end_date = pd.Timestamp.now(tz=israel_tz)
+    start_date = end_date - pd.Timedelta(days=30)
+
+    if metric == "Events":
+        trend_df = event_frequency_trend(event_data, participant_df, start_date, end_date, granularity)
+        chart = trend_df.sum(axis=1).rename("Cohort") if who == "Cohort" else trend_df[who]
+        st.bar_chart(chart)
+    else:
+        if timetable_df is None:
+            st.error("Failed to fetch questionnaire data.")
+            return
+        answers_df, unavailable = fetch_answers_data(tuple(participant_df['patientId']))
+        # Snapshot the answers once per full download, like the main snapshot
+        if st.session_state.get('answers_snapshot_synced_at') != synced_at:
+            st.session_state['answers_snapshot_synced_at'] = synced_at
+            save_snapshot({'answers': answers_df})
+        if unavailable:
+            # Unknown answers would count as unanswered, so leave these participants out
+            st.warning(f"Answers of {len(unavailable)} participant(s) are unavailable and left out")
+            participant_df = participant_df[~participant_df['patientId'].isin(unavailable)]
+            if who != "Cohort" and who not in set(participant_df['nickName']):
+                return
+        per_participant, cohort = answer_compliance_trend(
+            answers_df, participant_df, timetable_df, start_date, end_date, granularity
+        )
+        chart = cohort if who == "Cohort" else per_participant[who]
+        st.line_chart(chart)
+
+# ----------------------------
+# STATUS AS OF A PAST TIME
+# ----------------------------
+status_history_cache = cache_manager.namespace('status_history', ttl=3600)
+
+def get_status_history(participant_data, event_data, timetable_df, synced_at):
+    """Time-indexed history of the data of one full download (rebuilt if evicted)."""
+    key = (synced_at, tuple(participant_data['patientId']))
+    history = status_history_cache.get(key)
+    if history is None:
+        answers_df, unavailable = fetch_answers_data(tuple(participant_data['patientId']))
+        history = StatusHistory(participant_data, event_data, answers_df, timetable_df, unavailable)
+        status_history_cache.put(key, history)
+    return history
+
+def show_status_as_of(participant_data, event_data, timetable_df, synced_at):
+    """
+    The Participants Status table as it was at a chosen past time, or its hourly
+    values for one participant over the preceding week.
+    """
+    if not has_participants(participant_data) or timetable_df is None:
+        st.error("No participant or questionnaire data available.")
+        return
+    history = get_status_history(participant_data, event_data, timetable_df, synced_at)
+
+    now = pd.Timestamp.now(tz=israel_tz)
+    col1, col2, col3 = st.columns(3, gap="small")
+    with col1:
+        as_of_date = st.date_input("Date", value=now.date(), max_value=now.date(), key="as_of_date")
+    with col2:
+        as_of_time = st.time_input("Time", value=datetime.time(now.hour), key="as_of_time")
+    with col3:
+        who = st.selectbox("Participant", ["All"] + participant_data['nickName'].tolist(), key="as_of_participant")
+    as_of = to_timestamp(datetime.datetime.combine(as_of_date, as_of_time), israel_tz)
+
+    if who == "All":
+        status_df = history.status_as_of(as_of)
+        st.dataframe(status_df[status_df['is_active']][STATUS_COLUMNS], use_container_width=True, hide_index=True)
+    else:
+        hourly = history.status_at(pd.date_range(as_of - pd.Timedelta(days=7), as_of, freq='h'))
+        hourly = hourly[hourly['nickName'] == who].set_index('as_of')
+        st.line_chart(hourly[["NaN ans last 36 hours (%)", "NaN ans total (%)", "Events last 7 days"]])
+    st.caption("Wearing status and activity are shown as they are now; their history is not recorded.")
+
+# ----------------------------
+# EVENT MAP
+# ----------------------------
+event_locations_cache = cache_manager.namespace('event_locations')
+
+def get_event_locations(event_data, version):
+    """Columnar locations of the events of one state version (see event_map.event_locations)."""
+    locations = event_locations_cache.get(version) if version is not None else None
+    if locations is None:
+        locations = event_locations(event_data)
+        if version is not None:
+            event_locations_cache.put(version, locations)
+    return locations
+
+def show_event_map(participant_data, event_data, version=None):
+    """
+    Event locations by participant, event type and severity, aggregated into geohash
+    cells; each cell's size is its event count and its colour its mean severity.
+    """
+    locations = get_event_locations(event_data, version)
+    if locations.empty:
+        st.warning("No events with a location.")
+        return
+
+    names = dict(zip(participant_data['patientId'], participant_data['nickName'])) if has_participants(participant_data) else {}
+    col1, col2, col3, col4 = st.columns(4, gap="small")
+    with col1:
+        who = st.multiselect("Participants", sorted(locations['patientId'].unique()),
+                             format_func=lambda patient_id: names.get(patient_id, patient_id), key="map_participants")
+    with col2:
+        event_types = st.multiselect("Event types", sorted(locations['eventType'].dropna().unique()), key="map_event_types")
+    with col3:
+        min_severity, max_severity = st.slider("Severity", 0, 4, (0, 4), key="map_severity")
+    with col4:
+        precision = st.select_slider("Cell size", options=list(GEOHASH_PRECISIONS), value=5,
+                                     format_func=GEOHASH_PRECISIONS.get, key="map_precision")
+
+    mask = locations['severity'].between(min_severity, max_severity)
+    if who:
+        mask &= locations['patientId'].isin(who)
+    if event_types:
+        mask &= locations['eventType'].isin(event_types)
+    cells = aggregate_cells(locations[mask], precision)
+    if cells.empty:
+        st.info("No events match the filters.")
+        return
+
+    # Radius grows with the count (square root, so area is proportional); colour goes yellow -> red with severity
+    cell_metres = {4: 20000, 5: 2500, 6: 600, 7: 80}[precision]
+    cells['mean_severity'] = cells['mean_severity'].round(2)
+    cells['radius'] = cell_metres * (cells['count'] / cells['count'].max()) ** 0.5
+    cells['color'] = [[255, int(g), 0, 180] for g in 220 * (1 - cells['mean_severity'].fillna(0) / 4)]
+    layer = pdk.Layer(
+        'ScatterplotLayer', data=cells, get_position='[lon, lat]',
+        get_radius='radius', radius_min_pixels=3, get_fill_color='color', pickable=True,
+    )
+    view = pdk.ViewState(latitude=float(cells['lat'].mean()), longitude=float(cells['lon'].mean()), zoom=8)
+    st.pydeck_chart(pdk.Deck(
+        layers=[layer], initial_view_state=view,
+        tooltip={"text": "{geohash}\n{count} events\nmean severity {mean_severity}"},
+    ))
+    st.caption(f"{int(mask.sum())} events in {len(cells)} cells")
+
+# ----------------------------
+# CACHES
+# ----------------------------
+def clear_data_caches():
+    """Forgets all downloaded data, so the next run fetches everything again."""
+    answers_cache.clear()
+    status_history_cache.clear()
+    event_locations_cache.clear()
+    st.session_state.pop('local_state', None)
+
+def show_cache_stats():
+    """Memory used by the server-wide caches against their budget."""
+    used_mb = cache_manager.total_bytes / 1024 / 1024
+    budget_mb = cache_manager.budget_bytes / 1024 / 1024
+    st.caption(f"{used_mb:.1f} MB used of {budget_mb:.0f} MB (shared by all sessions)")
+    st.dataframe(cache_manager.stats(), use_container_width=True)
+
+# ----------------------------
+# PROFILER (admins only)
+# ----------------------------
+def request_profile():
+    st.session_state['profile_next_run'] = True
+
+
+def profiled_render():
+    """Runs render_dashboard under RerunProfiler and keeps the result in the session."""
+    if st.session_state.get('profile_clear_caches'):
+        clear_data_caches()
+    profiler = RerunProfiler()
+    try:
+        with profiler:
+            render_dashboard()
+    except ProfilerBusy:
+        st.warning("Another rerun is being profiled - this one ran without the profiler")
+        render_dashboard()
+        return
+    finally:
+        # Also when the run ended with st.rerun()/st.stop()
+        if profiler.seconds is not None:
+            stats = profiler.stats()
+            pstats_path, folded_path = save_profile(stats)
+            st.session_state['last_profile'] = {
+                'at': pd.Timestamp.now(tz=israel_tz), 'seconds': profiler.seconds, 'threads': profiler.threads,
+                'pstats': pstats_path, 'folded': folded_path,
+                'hot': hot_functions(stats, limit=30), 'hot_app': hot_functions(stats, limit=30, app_only=True),
+            }
+
+
+def show_profiler():
+    """Button to profile the next rerun, and the last profile's hot functions and files."""
+    st.checkbox("Clear data caches first (profile a full download)", key="profile_clear_caches")
+    st.button("Profile next rerun", key="profile_button", on_click=request_profile)
+    profile = st.session_state.get('last_profile')
+    if profile is None:
+        return
+    st.caption(f"Rerun at {profile['at'].strftime('%Y-%m-%d %H:%M:%S')}: {profile['seconds']:.2f} s, "
+               f"{profile['threads']} thread(s). Saved {profile['pstats']} and {profile['folded']} "
+               f"(collapsed stacks for flamegraph.pl / speedscope.app)")
+    app_only = st.checkbox("Only the dashboard's modules", value=True, key="profile_app_only")
+    st.dataframe(profile['hot_app'] if app_only else profile['hot'], hide_index=True, use_container_width=True)
+    col1, col2 = st.columns(2)
+    with col1:
+        with open(profile['pstats'], 'rb') as file:
+            st.download_button("Download .pstats", file.read(), os.path.basename(profile['pstats']))
+    with col2:
+        with open(profile['folded'], 'rb') as file:
+            st.download_button("Download flame graph stacks", file.read(), os.path.basename(profile['folded']))
+
 # ----------------------------
 # MAIN DASHBOARD
 # ----------------------------
 def show_dashboard():
+    """The dashboard; an admin's "Profile next rerun" runs it under the profiler."""
+    admin = is_admin(st.session_state.get('username'))
+    if admin and st.session_state.pop('profile_next_run', False):
+        profiled_render()
+    else:
+        render_dashboard()
+    if admin:
+        with st.expander("Profiler"):
+            show_profiler()
+
+
+def render_dashboard():
     global status_placeholder
     global participants_placeholder
 
-    # 1. fetch data
-    event_data = fetch_events_data()
-    participant_data = fetch_participants_data()
-    questionnaire_data = fetch_questionnaire_data()
-    
-    # 2. participants status
-    participants_status_df = fetch_participants_status(participant_data, event_data)
-
     st.subheader("Participants Status")
-    status_placeholder = st.empty()
-    show_participants_status(participants_status_df)
+    live_mode = st.toggle(
+        "Live refresh",
+        key="live_status",
+        help=f"Refresh only this table every {LIVE_REFRESH_SECONDS} seconds, without rerunning the page",
+    )
+    snapshot_notice = st.empty()
+    if live_mode:
+        live_status_panel()
+    else:
+        status_placeholder = st.empty()
 
     st.subheader("Participants Data")
     participants_placeholder = st.empty()
-    show_participants_data()
+
+    # 0. on the first run of a session, paint the last snapshot while the live data loads
+    snapshot = None
+    if not st.session_state.get('snapshot_shown', False):
+        st.session_state['snapshot_shown'] = True
+        snapshot, saved_at = load_snapshot(['status', 'participants_table'])
+        if snapshot:
+            saved_at_str = saved_at.tz_convert(israel_tz).strftime('%Y-%m-%d %H:%M:%S')
+            snapshot_notice.warning(f"Showing saved data from {saved_at_str} (stale) - refreshing...")
+            show_participants_status(snapshot['status'])
+            show_participants_data(snapshot['participants_table'])
+
+    # 1. fetch data (kept in the session between reruns, see load_local_state)
+    state = load_local_state()
+    if state.get('failed_sites'):
+        st.warning(f"Could not reach site(s): {', '.join(state['failed_sites'])} - showing the other sites only")
+    event_data = state['event_frame']
+    participant_data = state['participants']
+    questionnaire_data = state['questionnaire_data']
+    
+    # 2. participants status
+    if state['status'] is not None:
+        participants_status_df = select_displayed_status(state['status'])
+    else:
+        st.error("Failed to fetch participant or event data.")
+        participants_status_df = None
+    participants_table = participants_display_table(participant_data, event_data, state_version(state))
+
+    if snapshot and participants_status_df is None:
+        # Keep the snapshot on screen rather than replacing it with an error
+        snapshot_notice.warning(f"Failed to refresh - showing saved data from {saved_at_str} (stale)")
+    else:
+        snapshot_notice.empty()
+        show_participants_status(participants_status_df)
+        show_participants_data(participants_table)
+
+    # Snapshot each full download once
+    if participants_status_df is not None and st.session_state.get('snapshot_synced_at') != state['synced_at']:
+        st.session_state['snapshot_synced_at'] = state['synced_at']
+        save_snapshot({
+            'status': participants_status_df,
+            'participants_table': build_participants_table(participant_data, event_data),
+            'participants': participant_data,
+            'events': state['events'],
+        })
 
     with st.expander("Add New Participant"):
-        if add_participant_form(st) == True:
-            update_participant_data_status_display()
+        if add_participant_form(st, get_outbox()) == True:
+            apply_participant_write()
 
     with st.expander("Update Participant"):
         # If the button was pressed, we updated the displayed data
-        if update_participant_form(st) == True:
-            update_participant_data_status_display()
+        if update_participant_form(st, get_outbox()) == True:
+            apply_participant_write()
+
+    show_outbox_status()
 
 
     if st.button('Refresh Data', key='refresh_button1'):
-        st.cache_data.clear()
+        clear_data_caches()
+        st.rerun()
 
     if questionnaire_data:
         questionnaire_df, timetable_df = transform_questionnaire_data(questionnaire_data)
@@ -658,40 +1213,17 @@ def show_dashboard():
             #     lambda x: x.strftime('%Y-%m-%d %H:%M:%S %Z') if pd.notnull(x) else None
             # )
          
-            user_events = pd.DataFrame(event_data)
-
-            # Ensure microseconds
-            user_events['timestamp'] = user_events['timestamp'].apply(
-                lambda x: ensure_microseconds(x) if pd.notnull(x) else x
-            )
-            user_events['timestamp'] = pd.to_datetime(user_events['timestamp'], errors='coerce')
-
-            # Localize to Israel timezone if naive
-            user_events['timestamp'] = user_events['timestamp'].apply(
-                lambda x: israel_tz.localize(x) if pd.notnull(x) and x.tzinfo is None else x
-            )
-
-            # Filter by patient ID
-            user_events = user_events[user_events['patientId'] == patient_id]
-
             # Trial start parsing
-            trial_start_str = selected_partici.get('trial_starting_date', None)
-            trial_start = pd.to_datetime(trial_start_str, errors='coerce')
-            if pd.notnull(trial_start) and trial_start.tzinfo is None:
-                trial_start = israel_tz.localize(trial_start)
-
-            # Filter by trial start
-            user_events = user_events[user_events['timestamp'] >= trial_start]
-
-            # Format for display
-            user_events['timestamp'] = user_events['timestamp'].apply(
-                lambda x: x.strftime('%Y-%m-%d %H:%M:%S %Z') if pd.notnull(x) else None
-            )
+            trial_start = selected_partici['trial_starting_date']
 
+            # This participant's events since trial start (already parsed and tagged at ingest)
+            user_events = in_trial(event_data)
+            user_events = user_events[user_events['patientId'] == patient_id].drop(columns=['dedup_key', 'trial_phase'])
 
             if not user_events.empty:
                 user_events_sorted = user_events.sort_values(by='timestamp', ascending=False)
-                st.dataframe(user_events_sorted, use_container_width=True, hide_index=True)
+                st.dataframe(to_display_table(user_events_sorted, categorical=['eventType', 'activity', 'origin']),
+                             column_config=EVENTS_COLUMN_CONFIG, use_container_width=True, hide_index=True)
             else:
                 st.warning(f"No events found for user {selected_user2}.")
         except Exception as e:
@@ -700,24 +1232,46 @@ def show_dashboard():
         # Retrieving and showing Patient's scheduled questionnaire answers
         try:
             if questionnaire_df is not None and patient_id:
-                show_questions(patient_id, questionnaire_df)
+                questions_data = fetch_questions_by_patient([patient_id]).get(patient_id)
+                st.markdown("**Answers by scheduled slot**")
+                show_answer_matrix(questions_data, timetable_df, trial_start)
+                with st.expander("All answers"):
+                    show_questions(questions_data, questionnaire_df)
                 st.success(f"Questions from user fetched!")
         except Exception as e:
             st.error(f"Failed to get questions from user: {e}")
 
+    # Trends over the last 30 days
+    st.subheader("Trends")
+    if st.checkbox("Show trends", key="show_trends"):
+        show_trends(participant_data, event_data, timetable_df, state['synced_at'])
+
+    # Status at a past time, e.g. to audit why someone was flagged
+    st.subheader("Status As Of")
+    if st.checkbox("Show status at a past time", key="show_status_as_of"):
+        show_status_as_of(participant_data, event_data, timetable_df, state['synced_at'])
+
+    # Where events happen, aggregated per map cell
+    st.subheader("Event Map")
+    if st.checkbox("Show event map", key="show_event_map"):
+        show_event_map(participant_data, event_data, state_version(state))
+
     # 4. Post Event
     st.subheader("Post Event")
     with st.expander("Add Event"):
-        add_event_form(st, participant_data)
+        if add_event_form(st, participant_data, get_outbox()) == True:
+            apply_event_write()
 
     st.markdown("<hr>", unsafe_allow_html=True)
 
     if st.button('Refresh Data', key='refresh_button2'):
-        st.cache_data.clear()
+        clear_data_caches()
+        st.rerun()
 
     # 5. Show All Events
     st.subheader("All Events Data")
-    display_events_data(event_data, participant_data)
+    display_events_data(event_data, participant_data, state_version(state))
+    show_event_quarantine(state['event_quarantine'])
 
     # 6. Show Questionnaire
     if questionnaire_data:
@@ -735,8 +1289,8 @@ def show_dashboard():
     col1, col2, col3 = st.columns(3, gap="small")
 
     with col1:
-        if participant_data:
-            participant_df = pd.DataFrame(participant_data)
+        if has_participants(participant_data):
+            participant_df = participant_data
             user_options = participant_df['nickName'].tolist()
             selected_user = st.selectbox("Select User for Notification", user_options)
         else:
@@ -770,6 +1324,9 @@ def show_dashboard():
 
     st.markdown("<hr>", unsafe_allow_html=True)
 
+    with st.expander("Cache memory"):
+        show_cache_stats()
+
 
 if __name__ == "__main__":
     show_dashboard()
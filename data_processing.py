@@ -1,40 +1,148 @@
 import pandas as pd
-import datetime
-import pytz
+import numpy as np
+import hashlib
+import json
 
-# Set a global timezone for the entire app
-israel_tz = pytz.timezone('Asia/Jerusalem')
-UTC_tz = pytz.timezone('Etc/GMT')
+from cache_manager import cache_manager
+
+from time_utils import (
+    israel_tz,
+    ANSWER_NAIVE_TZ,
+    EMPATICA_NAIVE_TZ,
+    EVENT_NAIVE_TZ,
+    TRIAL_START_NAIVE_TZ,
+    localize_naive,
+    to_timestamp,
+    to_utc
+)
 
 
 # ----------------------------
 # QUESTIONNAIRE TIMETABLE
 # ----------------------------
-def transform_questionnaire_data(questionnaire_data):
+# Derived questionnaire artifacts per content hash, shared by all reruns and sessions
+questionnaire_cache = cache_manager.namespace('questionnaire')
+
+DAYS_OF_WEEK = {
+    1: 'Sunday', 2: 'Monday', 3: 'Tuesday',
+    4: 'Wednesday', 5: 'Thursday', 6: 'Friday', 7: 'Saturday'
+}
+SLOT_HOURS = ['10:00', '14:00', '18:00']
+
+def questionnaire_version(questionnaire_data):
+    """Content hash of a questionnaire definition; changes whenever any question changes."""
+    canonical = json.dumps(questionnaire_data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def build_questionnaire_artifacts(questionnaire_data):
+    """
+    Everything derived from the questionnaire definition:
+    'questions' (display df), 'timetable' (hours x weekdays, cells like "1, 2"),
+    'question_sets' ((hour, weekday) -> question numbers) and 'question_counts'
+    (questions per timetable cell).
+    """
     df = pd.DataFrame(questionnaire_data)
     df.rename(columns={'num': 'מס שאלה', 'type': 'סוג', 'question': 'השאלה'}, inplace=True)
-    days_of_week = {
-        1: 'Sunday', 2: 'Monday', 3: 'Tuesday', 
-        4: 'Wednesday', 5: 'Thursday', 6: 'Friday', 7: 'Saturday'
+
+    hours = list(SLOT_HOURS)
+    question_sets = {}
+    for question_number, days, question_hours in zip(df['מס שאלה'], df['days'], df['hours']):
+        for day in days:
+            day_name = DAYS_OF_WEEK.get(day)
+            for hour in question_hours:
+                # Zero-padded like the '%H:%M' lookups of slot times (e.g. '09:00')
+                hour_str = f'{int(hour):02d}:00'
+                if hour_str not in hours:
+                    hours.append(hour_str)
+                cell = question_sets.setdefault((hour_str, day_name), [])
+                if str(question_number) not in cell:
+                    cell.append(str(question_number))
+
+    # Slots are laid out (and searched) in the order of the hours, so keep them in time order
+    hours = sorted(hours)  # zero-padded 'HH:00', so string order is time order
+    timetable = pd.DataFrame('', index=hours, columns=list(DAYS_OF_WEEK.values()))
+    question_counts = pd.DataFrame(0, index=hours, columns=list(DAYS_OF_WEEK.values()))
+    for (hour_str, day_name), numbers in question_sets.items():
+        timetable.at[hour_str, day_name] = ', '.join(numbers)
+        question_counts.at[hour_str, day_name] = len(numbers)
+    timetable.attrs['question_counts'] = question_counts
+    timetable.attrs['question_sets'] = question_sets
+
+    return {
+        'version': questionnaire_version(questionnaire_data),
+        'questions': df[['סוג', 'השאלה', 'מס שאלה']],
+        'timetable': timetable,
+        'question_sets': question_sets,
+        'question_counts': question_counts,
     }
-    hours = ['10:00', '14:00', '18:00']
-    timetable = pd.DataFrame(index=hours, columns=days_of_week.values()).fillna('')
-
-    for index, row in df.iterrows():
-        question_number = row['מס שאלה']
-        for day in row['days']:
-            day_name = days_of_week.get(day)
-            for hour in row['hours']:
-                hour_str = f'{hour}:00'
-                cell_value = timetable.at[hour_str, day_name]
-                if str(question_number) not in cell_value.split(', '):
-                    if cell_value == '':
-                        timetable.at[hour_str, day_name] = str(question_number)
-                    else:
-                        timetable.at[hour_str, day_name] += f', {question_number}'
-
-    df = df[['סוג', 'השאלה', 'מס שאלה']]
-    return df, timetable
+
+def questionnaire_artifacts(questionnaire_data):
+    """build_questionnaire_artifacts, computed once per questionnaire version."""
+    version = questionnaire_version(questionnaire_data)
+    artifacts = questionnaire_cache.get(version)
+    if artifacts is None:
+        artifacts = build_questionnaire_artifacts(questionnaire_data)
+        questionnaire_cache.put(version, artifacts)
+    return artifacts
+
+def transform_questionnaire_data(questionnaire_data):
+    """
+    (questions display df, timetable) of the questionnaire. Memoized per version and shared
+    across sessions, so treat both frames as read-only.
+    """
+    artifacts = questionnaire_artifacts(questionnaire_data)
+    return artifacts['questions'], artifacts['timetable']
+
+def expand_question_schedule(timetable_df, start_date, end_date):
+    """
+    Expands the weekly timetable into concrete slots in [start_date, end_date], tz-aware.
+    Returns a DataFrame with 'slot_time' (Asia/Jerusalem) and 'num_questions' per slot.
+    """
+    start_date = pd.Timestamp(start_date)
+    end_date = pd.Timestamp(end_date)
+    if start_date.tzinfo is None:
+        start_date = start_date.tz_localize(israel_tz)
+    if end_date.tzinfo is None:
+        end_date = end_date.tz_localize(israel_tz)
+    start_date = start_date.tz_convert(israel_tz)
+    end_date = end_date.tz_convert(israel_tz)
+
+    empty = pd.DataFrame({
+        'slot_time': pd.DatetimeIndex([], tz=israel_tz),
+        'num_questions': np.array([], dtype=np.int64),
+    })
+    if timetable_df is None or end_date < start_date:
+        return empty
+
+    # Questions per (hour, weekday) cell, e.g. "5, 7, 12" -> 3 (precomputed per questionnaire version)
+    counts = timetable_df.attrs.get('question_counts')
+    if counts is None:
+        counts = timetable_df.apply(
+            lambda col: col.map(lambda cell: len(cell.split(', ')) if cell else 0)
+        )
+
+    days = pd.date_range(start_date.tz_localize(None).normalize(),
+                         end_date.tz_localize(None).normalize(), freq='D')
+    hour_offsets = pd.to_timedelta([f'{hour}:00' for hour in timetable_df.index])
+
+    # (days x hours) grid of naive wall-clock slot times and their question counts
+    slot_times = days.values[:, None] + hour_offsets.values[None, :]
+    day_names = days.day_name()
+    num_questions = np.zeros(slot_times.shape, dtype=np.int64)
+    for day_name in counts.columns:
+        num_questions[day_names == day_name, :] = counts[day_name].to_numpy()
+
+    slot_times = pd.DatetimeIndex(slot_times.ravel()).tz_localize(
+        israel_tz, ambiguous='NaT', nonexistent='shift_forward'
+    )
+    num_questions = num_questions.ravel()
+    keep = (num_questions > 0) & (slot_times >= start_date) & (slot_times <= end_date)
+    if not keep.any():
+        return empty
+    return pd.DataFrame({
+        'slot_time': slot_times[keep],
+        'num_questions': num_questions[keep],
+    })
 
 def calculate_percentage_of_nan_questions_last_x_hrs(questions_data, timetable_df, current_time, hrs):
     """
@@ -119,16 +227,8 @@ def calculate_percentage_of_nan_questions_last_x_hrs(questions_data, timetable_d
     if 'timestamp' not in questions_data.columns or 'questionNum' not in questions_data.columns:
         raise ValueError("questions_data is missing 'timestamp' or 'questionNum' columns")
 
-    # Convert question timestamps
-    questions_data['timestamp'] = pd.to_datetime(questions_data['timestamp'], errors='coerce')
-
-    # If some rows are naive and you want them also in 'Asia/Jerusalem', do:
-    def localize_if_naive(dt):
-        if pd.notnull(dt) and dt.tzinfo is None:
-            return dt.tz_localize(israel_tz)
-        return dt
-
-    questions_data['timestamp'] = questions_data['timestamp'].apply(localize_if_naive)
+    # Convert question timestamps (naive ones are Israel time)
+    questions_data['timestamp'] = to_utc(questions_data['timestamp'], ANSWER_NAIVE_TZ)
 
     # Filter to [start_time, current_time)
     answered_in_window = questions_data[
@@ -161,19 +261,11 @@ def calculate_percentage_of_nan_questions(questions_data, timetable_df, start_da
         return 100.0
 
     # Convert to tz-aware
-    df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-    df['timestamp'] = df['timestamp'].dt.tz_localize(israel_tz)
-
-
+    df['timestamp'] = to_utc(df['timestamp'], ANSWER_NAIVE_TZ)
 
     # Convert the start_date / end_date to tz-aware if naive
-    start_date = pd.to_datetime(start_date, errors='coerce')
-    if start_date is not None and start_date.tzinfo is None:
-        start_date = israel_tz.localize(start_date)
-
-    end_date = pd.to_datetime(end_date, errors='coerce')
-    if end_date is not None and end_date.tzinfo is None:
-        end_date = israel_tz.localize(end_date)
+    start_date = to_timestamp(start_date, TRIAL_START_NAIVE_TZ)
+    end_date = to_timestamp(end_date, TRIAL_START_NAIVE_TZ)
 
     if pd.isna(start_date) or pd.isna(end_date):
         return 100.0  # if we can't parse the dates, fallback
@@ -199,44 +291,68 @@ def calculate_displayed_questions(timetable_df, start_date, end_date):
     """
     start_date = start_date.tz_convert("Asia/Jerusalem")
     end_date = end_date.tz_convert("Asia/Jerusalem")
-    # Ensure tz-aware
-    if start_date.tzinfo is None:
-        start_date = israel_tz.localize(start_date)
-    if end_date.tzinfo is None:
-        end_date = israel_tz.localize(end_date)
     if end_date < start_date:
         end_date = start_date + pd.Timedelta(hours=36)
 
-    total_questions_displayed = 0
-    # If start_date and end_date are both tz-aware in Asia/Jerusalem:
-    date_range = pd.date_range(
-        start=start_date, 
-        end=end_date,
-        freq='D'
-    )
-    # No tz parameter needed; Pandas takes the timezone from start/end.
-    days_of_week_map = {0: 'Monday', 1: 'Tuesday', 2: 'Wednesday', 3: 'Thursday',
-                        4: 'Friday', 5: 'Saturday', 6: 'Sunday'}
-
-    for current_day in date_range:
-        day_of_week = current_day.strftime('%A')  # e.g. 'Monday'
-        if day_of_week in timetable_df.columns:
-            for time in timetable_df.index:
-                question_set = timetable_df.at[time, day_of_week]
-                if question_set:
-                    # Build a dt for this date+time
-                    question_time_str = f"{current_day.strftime('%Y-%m-%d')} {time}"
-    #                question_time = pd.to_datetime(question_time_str, errors='coerce').tz_localize(israel_tz, ambiguous='NaT', nonexistent='shift_forward')
-                    question_time = pd.to_datetime(question_time_str, errors='coerce').tz_localize(israel_tz)
-                    # Now skip if outside the actual [start_date, end_date] range
-                    if question_time < start_date:
-                        continue
-                    if question_time > end_date:
-                        continue
-                    question_list = question_set.split(', ')
-                    total_questions_displayed += len(question_list)
-
-    return total_questions_displayed
+    slots = expand_question_schedule(timetable_df, start_date, end_date)
+    return int(slots['num_questions'].sum())
+
+# ----------------------------
+# ANSWER MATRIX
+# ----------------------------
+def build_answer_matrix(questions_data, timetable_df, start_date, end_date):
+    """
+    One participant's answers laid out against the schedule: rows = scheduled slots in
+    [start_date, end_date] (Asia/Jerusalem), columns = question numbers as strings.
+    Returns (answers, scheduled): `answers` holds the numeric answer given in that slot
+    (the slot is the latest one at or before the answer), NaN otherwise; `scheduled` is a
+    bool frame of the same shape, so scheduled & answers.isna() are the missed questions.
+    """
+    slots = expand_question_schedule(timetable_df, start_date, end_date)
+    slot_index = pd.DatetimeIndex(slots['slot_time'], name='Slot')
+
+    # Questions shown in each (hour, weekday) cell, from the memoized questionnaire when available
+    question_sets = timetable_df.attrs.get('question_sets') if timetable_df is not None else None
+    if question_sets is None:
+        question_sets = {
+            (hour, day): [q.strip() for q in cell.split(',')]
+            for hour, row in (timetable_df.iterrows() if timetable_df is not None else [])
+            for day, cell in row.items() if cell
+        }
+    questions = sorted({q for numbers in question_sets.values() for q in numbers},
+                       key=lambda q: (len(q), q))
+    question_column = {q: i for i, q in enumerate(questions)}
+
+    # Scheduled mask: one row per distinct cell, gathered by each slot's cell code
+    cells = list(question_sets)
+    cell_mask = np.zeros((len(cells) + 1, len(questions)), dtype=bool)
+    for code, cell in enumerate(cells):
+        cell_mask[code, [question_column[q] for q in question_sets[cell]]] = True
+    cell_code = {cell: code for code, cell in enumerate(cells)}
+    slot_cells = zip(slot_index.strftime('%H:%M'), slot_index.day_name())
+    slot_codes = np.array([cell_code.get(cell, len(cells)) for cell in slot_cells], dtype=np.int64)
+    scheduled = pd.DataFrame(cell_mask[slot_codes], index=slot_index, columns=questions)
+
+    answers = pd.DataFrame(np.nan, index=slot_index, columns=questions)
+    if not questions_data or slot_index.empty:
+        return answers, scheduled
+
+    answer_df = pd.DataFrame(questions_data).reindex(columns=['timestamp', 'questionNum', 'answer'])
+    answer_ns = pd.DatetimeIndex(to_utc(answer_df['timestamp'], ANSWER_NAIVE_TZ)).as_unit('ns').asi8
+    slot_ns = slot_index.as_unit('ns').asi8
+    row = np.searchsorted(slot_ns, answer_ns, side='right') - 1
+    column = answer_df['questionNum'].astype(str).map(question_column)
+    keep = (row >= 0) & column.notna().to_numpy() & (answer_ns != np.iinfo(np.int64).min)
+    if keep.any():
+        # Rows are in time order, so a later answer to the same slot/question wins
+        order = np.argsort(answer_ns[keep], kind='stable')
+        rows = row[keep][order]
+        columns = column[keep].to_numpy(dtype=np.int64)[order]
+        values = pd.to_numeric(answer_df['answer'][keep], errors='coerce').to_numpy(dtype=float)[order]
+        matrix = answers.to_numpy(copy=True)
+        matrix[rows, columns] = values
+        answers = pd.DataFrame(matrix, index=slot_index, columns=questions)
+    return answers, scheduled
 
 def unify_timestamp_str(ts):
     """
@@ -250,8 +366,17 @@ def unify_timestamp_str(ts):
     return ts
 
 def force_uniform_datetime(event_data, tz=None):
-    # 1) Convert everything to string & strip
-    event_data['timestamp'] = event_data['timestamp'].astype(str).apply(unify_timestamp_str)
+    # 0) Already parsed (e.g. events from event_ingest): only convert to `tz`
+    if pd.api.types.is_datetime64_any_dtype(event_data['timestamp']):
+        if tz and event_data['timestamp'].dt.tz is not None:
+            event_data['timestamp'] = event_data['timestamp'].dt.tz_convert(tz)
+        elif tz:
+            event_data['timestamp'] = localize_naive(event_data['timestamp'], tz)
+        return event_data
+
+    # 1) Convert everything to string & strip, adding microseconds where missing (see unify_timestamp_str)
+    timestamps = event_data['timestamp'].astype(str).str.strip()
+    event_data['timestamp'] = timestamps.where(timestamps.str.contains('.', regex=False), timestamps + ".000000")
 
     # 2) Parse with a single format that includes microseconds
     event_data['timestamp'] = pd.to_datetime(
@@ -262,11 +387,11 @@ def force_uniform_datetime(event_data, tz=None):
 
     # 3) (Optional) localize to your tz
     if tz:
-        event_data['timestamp'] = event_data['timestamp'].dt.tz_localize(tz)
+        event_data['timestamp'] = localize_naive(event_data['timestamp'], tz)
 
     return event_data
 
-def calculate_num_events(event_data, participant_df, days=None):
+def calculate_num_events(event_data, participant_df, days=None, now=None):
     """
     Returns a Pandas Series with the count of events per participant (patientId).
     If `days` is provided, only counts events more recent than (now - days).
@@ -283,7 +408,9 @@ def calculate_num_events(event_data, participant_df, days=None):
   
     # Optionally filter to last N days
     if days is not None:
-        cutoff_time = pd.Timestamp.now(tz=israel_tz) - pd.Timedelta(days=days)
+        if now is None:
+            now = pd.Timestamp.now(tz=israel_tz)
+        cutoff_time = now - pd.Timedelta(days=days)
         event_data = event_data[event_data['timestamp'] >= cutoff_time]
 
     # Count events per patientId
@@ -304,11 +431,6 @@ def calculate_num_events(event_data, participant_df, days=None):
     return merged['num_events']
 
 
-import pandas as pd
-import pytz
-
-israel_tz = pytz.timezone("Asia/Jerusalem")
-
 def calculate_num_events_since_trial(event_data, participant_df):
     """
     Returns a Pandas Series with the count of events per participant,
@@ -329,23 +451,12 @@ def calculate_num_events_since_trial(event_data, participant_df):
 
     # 1) Parse event timestamps
     event_data = event_data.copy()  # to avoid mutating original
-    event_data['timestamp'] = pd.to_datetime(event_data['timestamp'], errors='coerce')
-
-    # localize any naive datetimes to Israel time if you want
-    event_data['timestamp'] = event_data['timestamp'].apply(
-        lambda dt: dt.tz_localize(israel_tz) if pd.notnull(dt) and dt.tzinfo is None else dt
-    )
+    # naive timestamps are Israel time
+    event_data['timestamp'] = to_utc(event_data['timestamp'], EVENT_NAIVE_TZ)
 
     # 2) Parse participant_df trial_starting_date
     participant_df = participant_df.copy()
-    participant_df['trial_starting_date'] = pd.to_datetime(
-        participant_df['trial_starting_date'], 
-        errors='coerce'
-    )
-    # localize if naive
-    participant_df['trial_starting_date'] = participant_df['trial_starting_date'].apply(
-        lambda dt: dt.tz_localize(israel_tz) if pd.notnull(dt) and dt.tzinfo is None else dt
-    )
+    participant_df['trial_starting_date'] = to_utc(participant_df['trial_starting_date'], TRIAL_START_NAIVE_TZ)
 
     # 3) Merge event_data with each participant's trial_start
     merged = pd.merge(
@@ -395,8 +506,7 @@ def calculate_time_since_last_connection(empatica_last_update):
 
     if empatica_last_update.tz is None:
         # localize it if you stored it as naive
-  #      empatica_last_update = empatica_last_update.tz_localize(israel_tz, nonexistent='shift_forward', ambiguous='NaT')
-        empatica_last_update = empatica_last_update.tz_localize(UTC_tz)
+        empatica_last_update = empatica_last_update.tz_localize(EMPATICA_NAIVE_TZ)
 
     current_time = pd.Timestamp.now(tz=israel_tz)
     time_diff = current_time - empatica_last_update
@@ -410,20 +520,121 @@ def compute_valid_answers_count(questions_data, start_date, end_date):
     if df.empty:
         return 0
 
-    df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-    df['timestamp'] = df['timestamp'].dt.tz_localize(israel_tz)
- 
+    df['timestamp'] = to_utc(df['timestamp'], ANSWER_NAIVE_TZ)
 
     # localize start/end if needed
-    start_date = pd.to_datetime(start_date, errors='coerce')
-    if start_date is not None and start_date.tzinfo is None:
-        start_date = israel_tz.localize(start_date)
-
-    end_date = pd.to_datetime(end_date, errors='coerce')
-    if end_date is not None and end_date.tzinfo is None:
-        end_date = israel_tz.localize(end_date)
+    start_date = to_timestamp(start_date, TRIAL_START_NAIVE_TZ)
+    end_date = to_timestamp(end_date, TRIAL_START_NAIVE_TZ)
 
     df_filtered = df[(df['timestamp'] >= start_date) & (df['timestamp'] <= end_date)]
     df_filtered['answer'] = pd.to_numeric(df_filtered['answer'], errors='coerce')
     valid_answers_count = df_filtered['answer'].between(0, 4, inclusive='both').sum()
-    return int(valid_answers_count)
\ No newline at end of file
+    return int(valid_answers_count)
+
+# ----------------------------
+# PARTICIPANTS STATUS
+# ----------------------------
+STATUS_COLUMNS = [
+    'nickName',
+    'Time Since Empatica Update',
+    'Empatica Wearing Status',
+    'NaN ans last 36 hours (%)',
+    'NaN ans total (%)',
+    'Events last 7 days',
+    'Events total'
+]
+
+def format_time_since_update(hours):
+    if pd.isna(hours):
+        return "N/A"
+    if hours < 24:
+        return f"{hours:.1f} Hrs"
+    else:
+        days = int(hours // 24)
+        remaining_hours = hours % 24
+        return f"{days} days, {remaining_hours:.1f} Hrs"
+
+def compute_answer_status(questions_data, trial_start, timetable_df, now):
+    """
+    Questionnaire metrics of one participant, as a dict keyed by status column:
+    % unanswered last 36 hours, % unanswered since trial start,
+    valid answers and displayed questions since trial start.
+    """
+    # trial start date, default to 30 days ago if missing or invalid
+    patient_start_trial = to_timestamp(trial_start, TRIAL_START_NAIVE_TZ)
+    if pd.isna(patient_start_trial):
+        patient_start_trial = now - pd.Timedelta(days=30)
+
+    # trial is 30 days
+    total_end_date = patient_start_trial + pd.Timedelta(days=30)
+    # if it's in future, cap it
+    if total_end_date > now:
+        total_end_date = now
+
+    # None: the backend was unavailable, so the answers are unknown rather than missing
+    if questions_data is None:
+        return {
+            'NaN ans last 36 hours (%)': np.nan,
+            'NaN ans total (%)': np.nan,
+            'Valid Answers Since Trial': np.nan,
+            'Displayed Questions Since Trial': np.nan,
+        }
+    if len(questions_data) == 0:
+        return {
+            'NaN ans last 36 hours (%)': 100.0,
+            'NaN ans total (%)': 100.0,
+            'Valid Answers Since Trial': 0,
+            'Displayed Questions Since Trial': 0,
+        }
+
+    # 1. last 36 hours unanswered
+    hours_since_start = (now - patient_start_trial).total_seconds() / 3600.0
+    hours_to_calc = min(36, hours_since_start)
+    perc_36_hrs = calculate_percentage_of_nan_questions_last_x_hrs(questions_data, timetable_df, now, hrs=hours_to_calc)
+
+    # 2. total unanswered from trial start
+    perc_total = calculate_percentage_of_nan_questions(questions_data, timetable_df, patient_start_trial, total_end_date)
+
+    # 3. valid answers from trial start
+    valid_answers_count = compute_valid_answers_count(questions_data, start_date=patient_start_trial, end_date=total_end_date)
+
+    # 4. displayed questions in [trialStart, now]
+    displayed_q_count = calculate_displayed_questions(timetable_df, start_date=patient_start_trial, end_date=total_end_date)
+
+    return {
+        'NaN ans last 36 hours (%)': perc_36_hrs,
+        'NaN ans total (%)': perc_total,
+        'Valid Answers Since Trial': valid_answers_count,
+        'Displayed Questions Since Trial': displayed_q_count,
+    }
+
+def compute_participants_status(participant_data, event_data, questions_by_patient, timetable_df, now=None):
+    """
+    Status of every participant (active or not), indexed by patientId.
+    `participant_data` is the table from participants.parse_participants and
+    `questions_by_patient` maps patientId -> answers list as returned by the API
+    (None when the backend was unavailable: answer metrics are then NaN).
+    Includes 'is_active' so callers can filter; select STATUS_COLUMNS for display.
+    """
+    if now is None:
+        now = pd.Timestamp.now(tz=israel_tz)
+
+    participant_df = participant_data.reset_index(drop=True)
+    participant_df['Empatica Wearing Status'] = participant_df['empatica_wearing_status']
+
+    answer_status = [
+        compute_answer_status(questions_by_patient.get(patient_id), trial_start, timetable_df, now)
+        for patient_id, trial_start in zip(participant_df['patientId'], participant_df['trial_starting_date'])
+    ]
+    answer_status_df = pd.DataFrame(answer_status, index=participant_df.index)
+    participant_df = pd.concat([participant_df, answer_status_df], axis=1)
+
+    # time since last update
+    participant_df['Time Since Empatica Update'] = (now - participant_df['empatica_last_update']).dt.total_seconds() / 3600
+    participant_df['Time Since Empatica Update'] = participant_df['Time Since Empatica Update'].apply(format_time_since_update)
+
+    # events in the last 7 days & total
+    participant_df['Events last 7 days'] = calculate_num_events(event_data, participant_df, days=7, now=now)
+    participant_df['Events total'] = calculate_num_events(event_data, participant_df, days=None)
+
+    return participant_df.set_index('patientId', drop=False)
@@ -0,0 +1,181 @@
+"""
+Connectivity and wear history of the Empatica watches, kept in constant memory.
+
+The participant record only holds the latest empatica_last_update and wearing status, so
+a collector samples them every SAMPLE_INTERVAL_SECONDS into fixed-size ring buffers (one
+row per participant, one column per sample of the last WINDOW_HOURS) and updates online
+statistics as it goes: uptime % over the window, the longest sync gap seen, and an EWMA
+of the sync delay. Reading the statistics never rescans more than the ring.
+"""
+import threading
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from participants import has_participants, parse_participants
+from time_utils import israel_tz
+
+SAMPLE_INTERVAL_SECONDS = 300
+WINDOW_HOURS = 24
+# A watch counts as connected while its last sync is at most this old
+CONNECTED_WITHIN_HOURS = 2
+# Half-life of the sync delay EWMA
+EWMA_HALFLIFE_HOURS = 6
+
+EMPATICA_STATS_COLUMNS = [
+    'Empatica uptime 24h (%)',
+    'Longest sync gap (h)',
+    'Sync delay EWMA (h)',
+    'Wear 24h (%)',
+    'Wear trend 24h',
+]
+
+
+class RingBuffer:
+    """The last `capacity` samples of many series: a (rows x capacity) float32 array written column by column."""
+
+    def __init__(self, rows, capacity):
+        self.values = np.full((rows, capacity), np.nan, dtype=np.float32)
+        self.position = 0
+        self.count = 0
+
+    @property
+    def capacity(self):
+        return self.values.shape[1]
+
+    def push(self, column):
+        """Writes one sample per row, overwriting the oldest once full."""
+        self.values[:, self.position] = column
+        self.position = (self.position + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def grow(self, rows):
+        """Adds empty rows (new series) up to `rows`."""
+        extra = rows - self.values.shape[0]
+        if extra > 0:
+            self.values = np.vstack([self.values, np.full((extra, self.capacity), np.nan, dtype=np.float32)])
+
+    def ordered(self):
+        """The samples written so far, oldest first."""
+        if self.count < self.capacity:
+            return self.values[:, :self.count]
+        return np.roll(self.values, -self.position, axis=1)
+
+
+def wear_percent(values):
+    """Wearing status as %: True -> 100, False -> 0, numbers as they are, anything else NaN."""
+    def convert(value):
+        if isinstance(value, (bool, np.bool_)):
+            return 100.0 if value else 0.0
+        if isinstance(value, str) and value.strip().lower() in ('true', 'false'):
+            return 100.0 if value.strip().lower() == 'true' else 0.0
+        return value
+    return pd.to_numeric(pd.Series(values, dtype=object).map(convert), errors='coerce').to_numpy(dtype=np.float32)
+
+
+class EmpaticaCollector:
+    """Online Empatica statistics of all participants seen so far. Thread-safe."""
+
+    def __init__(self, interval_seconds=SAMPLE_INTERVAL_SECONDS, window_hours=WINDOW_HOURS):
+        self.interval_seconds = interval_seconds
+        self.samples_per_hour = max(1, round(3600 / interval_seconds))
+        capacity = window_hours * self.samples_per_hour
+        self._rows = {}  # patientId -> row
+        self._delay = RingBuffer(0, capacity)   # hours since the last sync, per sample
+        self._wear = RingBuffer(0, capacity)    # wearing status %, per sample
+        self._ewma_delay = np.empty(0)
+        self._longest_gap = np.empty(0)
+        self._alpha = 1 - 0.5 ** (interval_seconds / 3600 / EWMA_HALFLIFE_HOURS)
+        self.last_sample = None
+        self._lock = threading.Lock()
+
+    def _ensure_rows(self, patient_ids):
+        for patient_id in patient_ids:
+            if patient_id not in self._rows:
+                self._rows[patient_id] = len(self._rows)
+        rows = len(self._rows)
+        if rows > len(self._ewma_delay):
+            extra = rows - len(self._ewma_delay)
+            self._ewma_delay = np.concatenate([self._ewma_delay, np.full(extra, np.nan)])
+            self._longest_gap = np.concatenate([self._longest_gap, np.full(extra, np.nan)])
+            self._delay.grow(rows)
+            self._wear.grow(rows)
+
+    def sample(self, participant_data, now=None):
+        """Records one sample of every participant in the table (from participants.parse_participants)."""
+        now = pd.Timestamp.now(tz=israel_tz) if now is None else now
+        delay_hours = ((now - participant_data['empatica_last_update']).dt.total_seconds() / 3600).to_numpy(
+            dtype=np.float64, na_value=np.nan)
+        wear = wear_percent(participant_data['empatica_wearing_status'])
+
+        with self._lock:
+            self._ensure_rows(participant_data['patientId'])
+            rows = np.array([self._rows[p] for p in participant_data['patientId']], dtype=np.int64)
+
+            # Participants missing from this sample get NaN, as unknown
+            delay_column = np.full(len(self._rows), np.nan, dtype=np.float32)
+            wear_column = np.full(len(self._rows), np.nan, dtype=np.float32)
+            delay_column[rows] = delay_hours
+            wear_column[rows] = wear
+            self._delay.push(delay_column)
+            self._wear.push(wear_column)
+
+            known = rows[~np.isnan(delay_hours)]
+            delay_known = delay_hours[~np.isnan(delay_hours)]
+            previous = self._ewma_delay[known]
+            self._ewma_delay[known] = np.where(np.isnan(previous), delay_known,
+                                               self._alpha * delay_known + (1 - self._alpha) * previous)
+            # The sync delay keeps growing during a gap, so a gap's length is the largest delay seen in it
+            self._longest_gap[known] = np.fmax(self._longest_gap[known], delay_known)
+            self.last_sample = now
+
+    def stats(self):
+        """One row per participant (indexed by patientId) with EMPATICA_STATS_COLUMNS."""
+        with self._lock:
+            patient_ids = list(self._rows)
+            delay = self._delay.ordered().copy()
+            wear = self._wear.ordered().copy()
+            ewma_delay = self._ewma_delay.copy()
+            longest_gap = self._longest_gap.copy()
+
+        # All-NaN rows (no sample yet) give NaN, without 'Mean of empty slice' warnings
+        with np.errstate(invalid='ignore'), warnings.catch_warnings():
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            known = ~np.isnan(delay)
+            connected = (delay <= CONNECTED_WITHIN_HOURS) & known
+            uptime = 100.0 * connected.sum(axis=1) / np.where(known.any(axis=1), known.sum(axis=1), np.nan)
+            wear_mean = np.nanmean(wear, axis=1) if wear.shape[1] else np.full(len(patient_ids), np.nan)
+            # Hourly means for the trend column, oldest hour first (a partial first hour is padded)
+            pad = (-wear.shape[1]) % self.samples_per_hour
+            hourly = np.hstack([np.full((wear.shape[0], pad), np.nan, dtype=np.float32), wear])
+            hours = hourly.shape[1] // self.samples_per_hour
+            hourly = np.nanmean(hourly.reshape(wear.shape[0], hours, self.samples_per_hour), axis=2)
+
+        return pd.DataFrame({
+            'Empatica uptime 24h (%)': uptime,
+            'Longest sync gap (h)': longest_gap,
+            'Sync delay EWMA (h)': ewma_delay,
+            'Wear 24h (%)': wear_mean,
+            'Wear trend 24h': [np.round(row[~np.isnan(row)].astype(float), 1).tolist() for row in hourly],
+        }, index=pd.Index(patient_ids, name='patientId'))
+
+
+def start_collector(collector, fetch_participants, interval=None):
+    """Samples fetch_participants() (raw API records) into `collector` every interval in a daemon thread."""
+    interval = collector.interval_seconds if interval is None else interval
+
+    def run():
+        while True:
+            try:
+                participant_data = parse_participants(fetch_participants())
+                if has_participants(participant_data):
+                    collector.sample(participant_data)
+            except Exception:
+                pass
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
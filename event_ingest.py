@@ -0,0 +1,121 @@
+"""
+Ingest stage for events: one pass that turns the raw event list into a clean frame.
+
+Rows are validated column-wise; invalid rows go to a quarantine frame with the reason.
+Duplicates are then dropped: exact repeats of the same record, and near-duplicates, which
+are events of the same participant and type in the same NEAR_DUPLICATE_BUCKET. Both the
+app and the assistant may report the same episode, and the earliest report is kept.
+Each clean row is tagged with its trial phase once, so views don't have to re-derive it.
+"""
+import numpy as np
+import pandas as pd
+
+from time_utils import EVENT_NAIVE_TZ, israel_tz, to_utc
+
+# Events of one participant and type within the same bucket are one episode
+NEAR_DUPLICATE_BUCKET = pd.Timedelta(minutes=10)
+
+# Fields that identify an exact duplicate (when present)
+EXACT_KEY_COLUMNS = ['patientId', 'timestamp', 'eventType', 'severity', 'activity', 'origin', 'deviceId']
+
+# Severity scale of the event form
+SEVERITY_RANGE = (0, 4)
+
+# Trial phase tag: before or after the participant's trial start
+PRE_TRIAL = 'pre'
+POST_TRIAL = 'post'
+
+
+def _blank(values):
+    """Missing or whitespace-only values."""
+    return values.isna().to_numpy(dtype=bool) | (values.astype('string').str.strip() == '').fillna(True).to_numpy(dtype=bool)
+
+
+def _hash_rows(frame):
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def ingest_events(event_data, participant_data=None, existing=None):
+    """
+    Validates and deduplicates raw events. Returns (events, quarantine):
+    `events` has the raw fields plus a tz-aware 'timestamp' (Asia/Jerusalem), numeric
+    'severity', 'location' (also read from 'Location'), 'trial_phase' and 'dedup_key';
+    `quarantine` has the rejected rows with a 'reason'. With `participant_data`, events of
+    unknown participants are rejected. `existing` is an earlier `events` frame, or the set
+    of its 'dedup_key' values: rows that duplicate one of its events are rejected too
+    (incremental ingest; with a set, the check doesn't scan the earlier events).
+    """
+    raw = event_data if isinstance(event_data, pd.DataFrame) else pd.DataFrame(event_data)
+    raw = raw.reset_index(drop=True)
+    for column in ['patientId', 'timestamp', 'eventType', 'severity']:
+        if column not in raw.columns:
+            raw[column] = None
+
+    events = raw.copy()
+    if 'Location' in events.columns:
+        location = events['location'] if 'location' in events.columns else pd.Series(None, index=events.index)
+        events['location'] = location.where(location.notna(), events['Location'])
+        events = events.drop(columns='Location')
+    events['timestamp'] = to_utc(events['timestamp'], EVENT_NAIVE_TZ).dt.tz_convert(israel_tz)
+    severity = pd.to_numeric(events['severity'], errors='coerce')
+    events['severity'] = severity
+
+    # Validation: the first failing check is the row's reason
+    missing_patient = _blank(events['patientId'])
+    unknown_patient = np.zeros(len(events), dtype=bool)
+    if participant_data is not None:
+        unknown_patient = ~events['patientId'].isin(participant_data['patientId']).to_numpy(dtype=bool)
+    bad_timestamp = events['timestamp'].isna().to_numpy(dtype=bool)
+    missing_type = _blank(events['eventType'])
+    bad_severity = (raw['severity'].notna() & ~severity.between(*SEVERITY_RANGE)).to_numpy(dtype=bool)
+    reason = pd.Series(np.select(
+        [missing_patient, unknown_patient, bad_timestamp, missing_type, bad_severity],
+        ['missing patientId', 'unknown patientId', 'invalid timestamp', 'missing eventType', 'invalid severity'],
+        default='',
+    ), index=events.index)
+
+    # Dedup among the valid rows, earliest first
+    valid = reason == ''
+    order = events.loc[valid, 'timestamp'].sort_values(kind='stable').index
+    candidates = events.loc[order]
+    exact_columns = [column for column in EXACT_KEY_COLUMNS if column in candidates.columns]
+    exact_key = _hash_rows(candidates[exact_columns].astype(
+        {column: 'string' for column in exact_columns if column not in ('timestamp', 'severity')}))
+    bucket = candidates['timestamp'].dt.tz_convert('UTC').dt.floor(NEAR_DUPLICATE_BUCKET)
+    dedup_key = _hash_rows(pd.DataFrame({
+        'patientId': candidates['patientId'].astype('string'),
+        'eventType': candidates['eventType'].astype('string'),
+        'bucket': bucket,
+    }))
+
+    exact_duplicate = pd.Series(exact_key).duplicated().to_numpy()
+    near_duplicate = pd.Series(dedup_key).duplicated().to_numpy() & ~exact_duplicate
+    if isinstance(existing, (set, frozenset)):
+        known = np.fromiter((key in existing for key in dedup_key), dtype=bool, count=len(dedup_key))
+        near_duplicate |= known & ~exact_duplicate
+    elif existing is not None and 'dedup_key' in existing.columns:
+        near_duplicate |= np.isin(dedup_key, existing['dedup_key'].to_numpy()) & ~exact_duplicate
+    reason.loc[order[exact_duplicate]] = 'duplicate'
+    reason.loc[order[near_duplicate]] = 'near duplicate'
+
+    keep = order[~exact_duplicate & ~near_duplicate]
+    clean = events.loc[keep].copy()
+    clean['dedup_key'] = dedup_key[~exact_duplicate & ~near_duplicate]
+
+    # Trial phase, relative to each participant's trial start (post when the start is unknown)
+    phase = np.full(len(clean), POST_TRIAL, dtype=object)
+    if participant_data is not None and 'trial_starting_date' in participant_data.columns:
+        trial_starts = participant_data.drop_duplicates('patientId').set_index('patientId')['trial_starting_date']
+        trial_start = clean['patientId'].map(trial_starts)
+        before = (pd.to_datetime(trial_start, utc=True) > clean['timestamp']).fillna(False)
+        phase[before.to_numpy(dtype=bool)] = PRE_TRIAL
+    clean['trial_phase'] = pd.Categorical(phase, categories=[PRE_TRIAL, POST_TRIAL])
+
+    quarantine = raw.loc[reason != ''].copy()
+    quarantine.insert(0, 'reason', reason[reason != ''])
+    return clean.reset_index(drop=True), quarantine.reset_index(drop=True)
+
+
+def in_trial(events):
+    """The events at or after their participant's trial start."""
+    return events[events['trial_phase'] == POST_TRIAL]
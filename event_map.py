@@ -0,0 +1,123 @@
+"""
+Event locations aggregated into geohash cells for the map view.
+
+Points are binned with vectorized numpy over the columnar events frame, so the browser
+gets one row per non-empty cell (count and severity) instead of one per event and stays
+responsive with hundreds of thousands of events.
+"""
+import numpy as np
+import pandas as pd
+
+# Geohash cell sizes offered in the dashboard (precision -> approximate cell size)
+GEOHASH_PRECISIONS = {4: "~39 km", 5: "~5 km", 6: "~1.2 km", 7: "~150 m"}
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+# ----------------------------
+# EVENT LOCATIONS
+# ----------------------------
+def event_locations(event_data):
+    """
+    Columnar frame of the events that have a usable location:
+    patientId, eventType, severity, lat, lon. Events posted without a real position
+    (missing, out of range, or the 0/0 placeholder the assistant form sends) are left out.
+    """
+    events = event_data if isinstance(event_data, pd.DataFrame) else pd.DataFrame(event_data)
+    if events.empty:
+        return pd.DataFrame(columns=['patientId', 'eventType', 'severity', 'lat', 'lon'])
+
+    # The API returns the position as 'location'; events pushed straight from the form use 'Location'
+    location = events['location'] if 'location' in events.columns else pd.Series(None, index=events.index)
+    if 'Location' in events.columns:
+        location = location.where(location.notna(), events['Location'])
+    location = location.where(location.map(lambda value: isinstance(value, dict)), None)
+
+    frame = pd.DataFrame({
+        'patientId': events['patientId'],
+        'eventType': events.get('eventType'),
+        'severity': pd.to_numeric(events.get('severity'), errors='coerce'),
+        'lat': pd.to_numeric(location.str.get('lat'), errors='coerce'),
+        'lon': pd.to_numeric(location.str.get('long'), errors='coerce'),
+    })
+    usable = (
+        frame['lat'].between(-90, 90) & frame['lon'].between(-180, 180)
+        & ~((frame['lat'] == 0) & (frame['lon'] == 0))
+    )
+    return frame[usable].reset_index(drop=True)
+
+
+# ----------------------------
+# GEOHASH BINNING
+# ----------------------------
+def _geohash_bits(precision):
+    total_bits = 5 * precision
+    lon_bits = (total_bits + 1) // 2
+    return total_bits, total_bits - lon_bits, lon_bits
+
+
+def geohash_cells(lat, lon, precision=5):
+    """
+    Integer geohash cell of each point (same cells as the geohash string of `precision`
+    characters), vectorized: quantize lat/lon and interleave their bits, longitude first.
+    """
+    total_bits, lat_bits, lon_bits = _geohash_bits(precision)
+    lat_idx = np.clip(((np.asarray(lat, dtype=float) + 90) / 180 * (1 << lat_bits)).astype(np.int64),
+                      0, (1 << lat_bits) - 1)
+    lon_idx = np.clip(((np.asarray(lon, dtype=float) + 180) / 360 * (1 << lon_bits)).astype(np.int64),
+                      0, (1 << lon_bits) - 1)
+    codes = np.zeros(len(lat_idx), dtype=np.int64)
+    for bit in range(total_bits):
+        if bit % 2 == 0:
+            source, position = lon_idx, lon_bits - 1 - bit // 2
+        else:
+            source, position = lat_idx, lat_bits - 1 - bit // 2
+        codes = (codes << 1) | ((source >> position) & 1)
+    return codes
+
+
+def geohash_decode(codes, precision=5):
+    """Centre (lat, lon) arrays and geohash strings of integer cells."""
+    total_bits, lat_bits, lon_bits = _geohash_bits(precision)
+    codes = np.asarray(codes, dtype=np.int64)
+    lat_idx = np.zeros(len(codes), dtype=np.int64)
+    lon_idx = np.zeros(len(codes), dtype=np.int64)
+    for bit in range(total_bits):
+        value = (codes >> (total_bits - 1 - bit)) & 1
+        if bit % 2 == 0:
+            lon_idx = (lon_idx << 1) | value
+        else:
+            lat_idx = (lat_idx << 1) | value
+    lat = (lat_idx + 0.5) * 180 / (1 << lat_bits) - 90
+    lon = (lon_idx + 0.5) * 360 / (1 << lon_bits) - 180
+    names = [
+        ''.join(_BASE32[(code >> (5 * (precision - 1 - i))) & 31] for i in range(precision))
+        for code in codes.tolist()
+    ]
+    return lat, lon, names
+
+
+def aggregate_cells(locations, precision=5, by=None):
+    """
+    Events per geohash cell (and per `by` column if given): count, mean and max severity,
+    plus the cell centre and geohash. One row per non-empty cell, largest first.
+    """
+    columns = ['geohash', 'lat', 'lon', 'count', 'mean_severity', 'max_severity']
+    if by:
+        columns = [by] + columns
+    if locations.empty:
+        return pd.DataFrame(columns=columns)
+
+    grouped = pd.DataFrame({
+        'cell': geohash_cells(locations['lat'].to_numpy(), locations['lon'].to_numpy(), precision),
+        'severity': locations['severity'].to_numpy(dtype=float),
+    })
+    keys = ['cell']
+    if by:
+        grouped[by] = locations[by].to_numpy()
+        keys = [by, 'cell']
+    cells = grouped.groupby(keys, sort=False)['severity'].agg(['size', 'mean', 'max']).reset_index()
+    cells = cells.rename(columns={'size': 'count', 'mean': 'mean_severity', 'max': 'max_severity'})
+
+    cells['lat'], cells['lon'], cells['geohash'] = geohash_decode(cells['cell'].to_numpy(), precision)
+    return cells.sort_values('count', ascending=False, ignore_index=True)[columns]
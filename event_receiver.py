@@ -0,0 +1,207 @@
+"""
+Local receiver for pushed events, so the dashboard doesn't have to re-poll /events/.
+
+The app/backend (or the stand-in producer below) POSTs events as JSON, one object or a list,
+to http://<host>:<port>/events. Events are appended to an in-process EventStore that
+dashboard sessions read incrementally with events_since(cursor).
+
+Every request must carry the shared secret (BOOGGII_EVENT_RECEIVER_SECRET, or
+EVENT_RECEIVER_SECRET in private_config) in the SECRET_HEADER header. The receiver listens
+on localhost only unless given another host, and rejects bodies over MAX_BODY_BYTES.
+
+Stand-in producer for local testing:
+    BOOGGII_EVENT_RECEIVER_SECRET=... python event_receiver.py --serve --port 8765
+    BOOGGII_EVENT_RECEIVER_SECRET=... python event_receiver.py --produce 100 --url http://localhost:8765/events
+"""
+import argparse
+import collections
+import datetime
+import hmac
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import private_config
+
+REQUIRED_FIELDS = ('patientId', 'timestamp', 'eventType')
+
+SECRET_HEADER = 'X-Booggii-Secret'
+RECEIVER_SECRET = (os.environ.get('BOOGGII_EVENT_RECEIVER_SECRET')
+                   or getattr(private_config, 'EVENT_RECEIVER_SECRET', None))
+# Largest accepted request body (a batch of a few thousand events)
+MAX_BODY_BYTES = 1024 * 1024
+# Events kept for sessions to catch up on; older ones are only in the next full download
+MAX_BUFFERED_EVENTS = 10000
+
+
+class EventStore:
+    """
+    Thread-safe buffer of the last `capacity` received events, with per-participant counters,
+    so memory stays flat however long the server runs. Events are numbered in order of
+    arrival; readers keep a cursor (the number of events seen) and fetch only newer events.
+    """
+
+    def __init__(self, capacity=MAX_BUFFERED_EVENTS):
+        self._lock = threading.Lock()
+        self._events = collections.deque(maxlen=capacity)
+        self._total = 0
+        self.counts = collections.Counter()
+
+    def append(self, event):
+        with self._lock:
+            self._events.append(event)
+            self._total += 1
+            self.counts[event['patientId']] += 1
+            return self._total
+
+    def events_since(self, cursor):
+        """
+        Events received after `cursor`, the new cursor, and how many events after `cursor`
+        were already dropped from the buffer (the reader needs a full download for those).
+        """
+        with self._lock:
+            first = self._total - len(self._events)
+            missed = max(0, first - cursor)
+            start = max(cursor, first) - first
+            return list(itertools.islice(self._events, start, None)), self._total, missed
+
+    def __len__(self):
+        """Number of events received so far (the cursor of a reader that is up to date)."""
+        return self._total
+
+
+def validate_event(event):
+    """Returns an error message, or None if the event can be stored."""
+    if not isinstance(event, dict):
+        return "event must be a JSON object"
+    missing = [field for field in REQUIRED_FIELDS if not event.get(field)]
+    if missing:
+        return f"missing fields: {', '.join(missing)}"
+    return None
+
+
+def make_handler(store, secret):
+    class EventHandler(BaseHTTPRequestHandler):
+        def _reply(self, status, body):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _authorized(self):
+            given = self.headers.get(SECRET_HEADER, '')
+            if hmac.compare_digest(given.encode(), secret.encode()):
+                return True
+            self._reply(401, {'error': 'unauthorized'})
+            return False
+
+        def do_POST(self):
+            if not self._authorized():
+                return
+            if self.path.rstrip('/') != '/events':
+                self._reply(404, {'error': 'not found'})
+                return
+            try:
+                length = int(self.headers['Content-Length'])
+            except (KeyError, ValueError):
+                self._reply(411, {'error': 'Content-Length required'})
+                return
+            if length < 0 or length > MAX_BODY_BYTES:
+                # Not read, so the connection can't be reused
+                self.close_connection = True
+                self._reply(413, {'error': f'body must be at most {MAX_BODY_BYTES} bytes'})
+                return
+            try:
+                body = json.loads(self.rfile.read(length))
+            except ValueError:
+                self._reply(400, {'error': 'invalid JSON'})
+                return
+
+            events = body if isinstance(body, list) else [body]
+            errors = [validate_event(event) for event in events]
+            if any(errors):
+                self._reply(400, {'error': next(error for error in errors if error)})
+                return
+            for event in events:
+                # The API stores the location under 'Location' but returns it as 'location'
+                if 'Location' in event:
+                    event['location'] = event.pop('Location')
+                store.append(event)
+            self._reply(202, {'accepted': len(events), 'total': len(store)})
+
+        def do_GET(self):
+            if not self._authorized():
+                return
+            if self.path.rstrip('/') == '/stats':
+                self._reply(200, {'total': len(store), 'per_participant': dict(store.counts)})
+            else:
+                self._reply(404, {'error': 'not found'})
+
+        def log_message(self, format, *args):
+            pass  # keep the Streamlit console quiet
+
+    return EventHandler
+
+
+def start_receiver(store, host='127.0.0.1', port=8765, secret=None):
+    """Serves the receiver in a daemon thread and returns the server."""
+    secret = secret or RECEIVER_SECRET
+    if not secret:
+        raise ValueError("the event receiver needs BOOGGII_EVENT_RECEIVER_SECRET (or EVENT_RECEIVER_SECRET)")
+    server = ThreadingHTTPServer((host, port), make_handler(store, secret))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def produce_events(url, count, patient_ids, interval=0.0, secret=None):
+    """Stand-in producer: posts `count` random events like the app would."""
+    headers = {SECRET_HEADER: secret or RECEIVER_SECRET or ''}
+    for _ in range(count):
+        # With an explicit offset: naive event times are read as Israel time (time_utils.EVENT_NAIVE_TZ)
+        timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='milliseconds')
+        event = {
+            "patientId": random.choice(patient_ids),
+            "deviceId": "stand-in-producer",
+            "timestamp": timestamp,
+            "Location": {"lat": 0.0, "long": 0.0},
+            "eventType": random.choice(["dissociation", "sadness", "anger", "anxiety", "other"]),
+            "activity": random.choice(["rest", "eating", "exercise", "other"]),
+            "severity": random.randint(0, 4),
+            "origin": "app",
+        }
+        requests.post(url, json=event, headers=headers)
+        if interval:
+            time.sleep(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--serve', action='store_true', help="run a standalone receiver")
+    parser.add_argument('--host', default='127.0.0.1', help="interface to listen on (default: localhost only)")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--produce', type=int, metavar='N', help="post N random events")
+    parser.add_argument('--url', default='http://localhost:8765/events')
+    parser.add_argument('--patients', default='patient-1,patient-2,patient-3',
+                        help="comma separated patientIds for produced events")
+    parser.add_argument('--interval', type=float, default=0.0, help="seconds between produced events")
+    args = parser.parse_args()
+
+    if args.serve:
+        if not RECEIVER_SECRET:
+            parser.error("set BOOGGII_EVENT_RECEIVER_SECRET")
+        store = EventStore()
+        server = ThreadingHTTPServer((args.host, args.port), make_handler(store, RECEIVER_SECRET))
+        print(f"Receiving events on http://{args.host}:{args.port}/events")
+        server.serve_forever()
+    elif args.produce:
+        produce_events(args.url, args.produce, args.patients.split(','), args.interval)
+    else:
+        parser.print_help()
@@ -3,16 +3,15 @@ import pandas as pd
 import datetime
 import pytz
 
-from api import (
-    add_participant_to_db, 
-    update_participant_to_db,
-    post_event_to_db
-)
+from api import event_payload, new_participant_payload
+from outbox import EVENT, PARTICIPANT_ADD, PARTICIPANT_UPDATE
+from sites import SITES, site_of
 israel_tz = pytz.timezone("Asia/Jerusalem")
 
-def update_participant_form(container):
+def update_participant_form(container, outbox):
     ''' This function creates a form that enables updating participant's data
         If the update buttin is pressed it returns True so the display will be updated, otherwise it returns False
+        The update is queued in `outbox` (the dashboard's shared outbox)
     '''
     with st.form("update_participant_form"):
         patientId = st.text_input("Patient ID", key="patientId")
@@ -54,13 +53,13 @@ def update_participant_form(container):
                 **({"trialStartingDate": trialStartingDateTimeStr} if trialStartingDateTimeStr else {}),
                 **({"isActive": isActive} if isActive is not None else {}),
             }
-            response = update_participant_to_db(patientId, updates)
-            if response.status_code == 200:
-                st.success("Participant updated successfully!")
-                st.session_state['show_update_participant_form'] = False
-                container.empty()
-            else:
-                st.error(f"Failed to update participant. Status code: {response.status_code}")
+            # Queued locally; the outbox flusher sends it to the server
+            outbox.enqueue(PARTICIPANT_UPDATE, dict(updates, site=site_of(patientId)))
+            st.success("Participant update saved!")
+            # Lets the dashboard patch only this participant locally
+            st.session_state['last_participant_write'] = updates
+            st.session_state['show_update_participant_form'] = False
+            container.empty()
             
             # Update button was pressed, tell the display to refresh data
             return True
@@ -69,7 +68,7 @@ def update_participant_form(container):
             return False    
             
 
-def add_participant_form(form_expander):
+def add_participant_form(form_expander, outbox):
     with st.form("new_participant_form"):
         nickName = st.text_input("Nickname")
         phone = st.text_input("Phone")
@@ -77,6 +76,8 @@ def add_participant_form(form_expander):
         firebaseId = st.text_input("Firebase ID")
         trialStartingDate = st.date_input("Trial Starting Date (Date)", key="trialStartingDate_date-Add")
         trialStartingTime = st.time_input("Trial Starting Time", key="trialStartingDate_time-Add")
+        # Backend the participant is added to, when the dashboard covers several sites
+        site = st.selectbox("Site", list(SITES)) if len(SITES) > 1 else next(iter(SITES))
 
         submit_button = st.form_submit_button("Submit")
         if submit_button:
@@ -88,22 +89,22 @@ def add_participant_form(form_expander):
             else:
                 trialStartingDateTimeStr = None
 
-            response = add_participant_to_db(nickName, phone, empaticaId, firebaseId, trialStartingDateTimeStr)
-
-            if response.status_code == 201:
-                st.success("Participant added successfully!")
-                form_expander.empty()
-                return True
-            else:
-                st.error(f"Failed to add participant. Status code: {response.status_code}")
-                return False
+            payload = new_participant_payload(nickName, phone, empaticaId, firebaseId, trialStartingDateTimeStr)
+            # Queued locally; the outbox flusher sends it to the server
+            key = outbox.enqueue(PARTICIPANT_ADD, dict(payload, site=site))
+            st.success("Participant saved! Its ID is assigned once the server gets it.")
+            # The patientId is server-assigned: the dashboard shows a provisional row until then
+            st.session_state['last_participant_write'] = dict(payload, site=site, isActive=True,
+                                                              patientId=f"pending-{key}", pending=True)
+            form_expander.empty()
+            return True
                             
         else:
             return False
                 
                 
                 
-def add_event_form(form_expander, participant_data):
+def add_event_form(form_expander, participant_data, outbox):
    # participant_data = fetch_participants_data()
     participant_df = pd.DataFrame(participant_data)
     
@@ -129,9 +130,8 @@ def add_event_form(form_expander, participant_data):
                 
                 # 4) Format as 'yyyy-MM-dd HH:mm:ss.SSSZ' with 3 decimal places
                 #    e.g. "2025-01-01 15:00:00.123Z"
-                #    We'll format microseconds and then slice off to 3 decimals:
-#                eventDateTimeStr = event_dt_utc.strftime("%Y-%m-%d %H:%M:%S.%fZ")
-                eventDateTimeStr = event_dt_utc.strftime("%Y-%m-%d %H:%M:%S.%f")
+                #    The 'Z' is needed: naive event times are read as Israel time (time_utils.EVENT_NAIVE_TZ)
+                eventDateTimeStr = event_dt_utc.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3] + "Z"
 
             else:
                 eventDateTimeStr = None
@@ -146,9 +146,13 @@ def add_event_form(form_expander, participant_data):
             location = {"lat": lat, "long": long}
             origin = "assistant"
 
-            response = post_event_to_db(patientId, deviceId, eventDateTimeStr, location, eventType, activity, severity, origin)
-            if response.status_code == 201:
-                st.success("Event posted successfully!")
-                form_expander.empty()
-            else:
-                st.error(f"Failed to post event. Status code: {response.status_code}")
+            payload = event_payload(patientId, deviceId, eventDateTimeStr, location, eventType, activity, severity, origin)
+            # Queued locally; the outbox flusher sends it to the server
+            outbox.enqueue(EVENT, dict(payload, site=selected_participant.get('site') or site_of(patientId)))
+            st.success("Event saved!")
+            # Lets the dashboard update this participant's event counts locally
+            st.session_state['last_event_write'] = payload
+            form_expander.empty()
+            return True
+        else:
+            return False
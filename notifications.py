@@ -0,0 +1,130 @@
+"""
+Push notifications (Firebase Cloud Messaging) and SMS (Twilio) to participants.
+
+firebase_admin and twilio are imported on first use, so importing this module reads no
+credentials. FcmSender and SmsSender share one interface, send(messages) -> patientIds
+that could not be reached, so the reminder scheduler can take any sender (or a fake one).
+"""
+import os
+
+import private_config
+from private_config import FIREBASE_CRED_PATH
+
+# FCM accepts at most 500 messages per batch request
+FCM_BATCH_SIZE = 500
+
+# Twilio sender number, e.g. "+972..."; SMS is disabled when not configured
+TWILIO_FROM = os.environ.get('BOOGGII_TWILIO_FROM') or getattr(private_config, 'TWILIO_FROM', None)
+
+
+def init_firebase():
+    """
+    Initializes the Firebase Admin SDK on first use, so that loading the dashboard
+    does not read the credentials or import firebase_admin until a notification is sent.
+    """
+    import firebase_admin
+    from firebase_admin import credentials
+
+    if not firebase_admin._apps:
+        cred = credentials.Certificate(FIREBASE_CRED_PATH)
+        firebase_admin.initialize_app(cred)
+
+
+def send_firebase_notification(token, title, body, data=None):
+    init_firebase()
+    from firebase_admin import messaging
+
+    message = messaging.Message(
+        notification=messaging.Notification(title=title, body=body),
+        data=data,
+        token=token,
+    )
+    response = messaging.send(message)
+    return response
+
+
+class Message:
+    """One notification to one participant; `token` is their FCM token, `phone` their number."""
+
+    __slots__ = ('patient_id', 'title', 'body', 'token', 'phone', 'data')
+
+    def __init__(self, patient_id, title, body, token=None, phone=None, data=None):
+        self.patient_id = patient_id
+        self.title = title
+        self.body = body
+        self.token = token
+        self.phone = phone
+        self.data = data
+
+    def __repr__(self):
+        return f"Message({self.patient_id!r}, {self.body!r})"
+
+
+class FcmSender:
+    """Sends messages as FCM notifications, in batches of up to FCM_BATCH_SIZE."""
+
+    def send(self, messages):
+        """Returns the patientIds whose message had no token or was not accepted by FCM."""
+        failed = {message.patient_id for message in messages if not message.token}
+        messages = [message for message in messages if message.token]
+        if not messages:
+            return failed
+
+        init_firebase()
+        from firebase_admin import messaging
+
+        # send_each replaced send_all in firebase_admin 6
+        send_batch = getattr(messaging, 'send_each', None) or messaging.send_all
+        for start in range(0, len(messages), FCM_BATCH_SIZE):
+            batch = messages[start:start + FCM_BATCH_SIZE]
+            try:
+                response = send_batch([
+                    messaging.Message(
+                        notification=messaging.Notification(title=message.title, body=message.body),
+                        data=message.data,
+                        token=message.token,
+                    )
+                    for message in batch
+                ])
+            except Exception:
+                failed.update(message.patient_id for message in batch)
+                continue
+            failed.update(message.patient_id for message, result in zip(batch, response.responses)
+                          if not result.success)
+        return failed
+
+
+class SmsSender:
+    """Sends messages as SMS through Twilio, one request per message (Twilio has no batch send)."""
+
+    def __init__(self, from_number=TWILIO_FROM):
+        self.from_number = from_number
+        self._client = None
+
+    def send(self, messages):
+        """Returns the patientIds without a phone number or whose SMS Twilio refused."""
+        if not self.from_number:
+            return {message.patient_id for message in messages}
+        if self._client is None:
+            from twilio.rest import Client
+            self._client = Client(private_config.account_sid, private_config.auth_token)
+
+        failed = set()
+        for message in messages:
+            if not message.phone:
+                failed.add(message.patient_id)
+                continue
+            try:
+                self._client.messages.create(to=message.phone, from_=self.from_number, body=message.body)
+            except Exception:
+                failed.add(message.patient_id)
+        return failed
+
+
+class PrintSender:
+    """Prints messages instead of sending them (reminders.py --dry-run)."""
+
+    def send(self, messages):
+        for message in messages:
+            print(f"would send to {message.patient_id}: {message.body}")
+        return set()
@@ -0,0 +1,209 @@
+"""
+Durable outbox for writes to the backend (new events, new/updated participants).
+
+Forms enqueue a write into a local SQLite file and return immediately; a background
+flusher sends queued writes in order, retrying with exponential backoff while the backend
+is unreachable. Each write carries an idempotency key (sent as the Idempotency-Key header)
+so a retry after a lost response doesn't create a duplicate.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+OUTBOX_PATH = os.environ.get('BOOGGII_OUTBOX_PATH', '.outbox.sqlite3')
+
+FLUSH_INTERVAL_SECONDS = 5
+BATCH_SIZE = 50
+MAX_BACKOFF_SECONDS = 300
+# Sent writes are kept a week (for debugging), purged at most this often when idle
+PURGE_INTERVAL_SECONDS = 3600
+
+# Write kinds and the request each one becomes (see api.send_write)
+EVENT = 'event'
+PARTICIPANT_ADD = 'participant_add'
+PARTICIPANT_UPDATE = 'participant_update'
+
+PENDING = 'pending'
+SENT = 'sent'
+# Rejected by the backend (4xx other than 409/429): kept for inspection, never retried
+REJECTED = 'rejected'
+
+# Wakes the flusher as soon as something is enqueued by any Outbox of this process
+_wakeup = threading.Event()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS writes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    created_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT
+)
+"""
+
+
+class Outbox:
+    """Queue of writes stored in SQLite; safe to use from several threads and processes."""
+
+    def __init__(self, path=OUTBOX_PATH):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(_SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def enqueue(self, kind, payload):
+        """Stores a write durably and returns its idempotency key."""
+        key = str(uuid.uuid4())
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO writes (idempotency_key, kind, payload, created_at) VALUES (?, ?, ?, ?)',
+                (key, kind, json.dumps(payload), time.time()),
+            )
+        _wakeup.set()
+        return key
+
+    def due(self, limit=BATCH_SIZE):
+        """
+        Oldest pending writes, up to the first one still waiting for its retry time
+        (so writes are sent in order): (id, key, kind, payload).
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT id, idempotency_key, kind, payload, next_attempt_at FROM writes '
+                'WHERE state = ? ORDER BY id LIMIT ?',
+                (PENDING, limit),
+            ).fetchall()
+        now = time.time()
+        due = []
+        for row_id, key, kind, payload, next_attempt_at in rows:
+            if next_attempt_at > now:
+                break
+            due.append((row_id, key, kind, json.loads(payload)))
+        return due
+
+    def mark_sent(self, row_ids):
+        with self._connect() as conn:
+            conn.executemany('UPDATE writes SET state = ?, last_error = NULL WHERE id = ?',
+                             [(SENT, row_id) for row_id in row_ids])
+
+    def mark_rejected(self, row_id, error):
+        with self._connect() as conn:
+            conn.execute('UPDATE writes SET state = ?, last_error = ? WHERE id = ?', (REJECTED, error, row_id))
+
+    def mark_retry(self, row_id, error):
+        """Schedules another attempt with exponential backoff (2s, 4s, ... capped)."""
+        with self._connect() as conn:
+            (attempts,) = conn.execute('SELECT attempts FROM writes WHERE id = ?', (row_id,)).fetchone()
+            delay = min(MAX_BACKOFF_SECONDS, 2 ** (attempts + 1))
+            conn.execute(
+                'UPDATE writes SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?',
+                (attempts + 1, time.time() + delay, error, row_id),
+            )
+
+    def last_id(self):
+        """Id of the newest write (0 when empty); later writes get larger ids."""
+        with self._connect() as conn:
+            (row_id,) = conn.execute('SELECT COALESCE(MAX(id), 0) FROM writes').fetchone()
+        return row_id
+
+    def pending_through(self, row_id):
+        """Number of writes up to `row_id` that are still pending."""
+        with self._connect() as conn:
+            (count,) = conn.execute('SELECT COUNT(*) FROM writes WHERE state = ? AND id <= ?',
+                                    (PENDING, row_id)).fetchone()
+        return count
+
+    def counts(self):
+        """Number of writes per state, e.g. {'pending': 2, 'sent': 40}."""
+        with self._connect() as conn:
+            return dict(conn.execute('SELECT state, COUNT(*) FROM writes GROUP BY state').fetchall())
+
+    def rejected(self, limit=20):
+        """Most recent rejected writes: (kind, payload, last_error)."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT kind, payload, last_error FROM writes WHERE state = ? ORDER BY id DESC LIMIT ?',
+                (REJECTED, limit),
+            ).fetchall()
+        return [(kind, json.loads(payload), error) for kind, payload, error in rows]
+
+    def purge_sent(self, older_than_seconds=7 * 24 * 3600):
+        """Deletes the writes sent more than `older_than_seconds` ago (run by the flusher)."""
+        with self._connect() as conn:
+            conn.execute('DELETE FROM writes WHERE state = ? AND created_at < ?',
+                         (SENT, time.time() - older_than_seconds))
+
+
+def flush(outbox, send, batch_size=BATCH_SIZE):
+    """
+    Sends due writes in order. `send(kind, payload, idempotency_key)` returns a
+    status code or raises on network errors. Stops at the first retryable failure so
+    writes keep their order (e.g. an update isn't sent before the add it depends on).
+    Returns the number of writes sent.
+    """
+    sent = []
+    try:
+        for row_id, key, kind, payload in outbox.due(batch_size):
+            try:
+                status_code = send(kind, payload, key)
+            except Exception as e:
+                outbox.mark_retry(row_id, str(e))
+                break
+            # 409: the backend already has this idempotency key
+            if 200 <= status_code < 300 or status_code == 409:
+                sent.append(row_id)
+            elif status_code == 429 or status_code >= 500:
+                outbox.mark_retry(row_id, f"HTTP {status_code}")
+                break
+            else:
+                outbox.mark_rejected(row_id, f"HTTP {status_code}")
+    finally:
+        if sent:
+            outbox.mark_sent(sent)
+    return len(sent)
+
+
+def wait_drained(outbox, through_id, timeout, poll=1.0):
+    """Waits until no write up to `through_id` is pending; False if still pending after `timeout` s."""
+    deadline = time.time() + timeout
+    while outbox.pending_through(through_id):
+        if time.time() >= deadline:
+            return False
+        time.sleep(poll)
+    return True
+
+
+def start_flusher(outbox, send, interval=FLUSH_INTERVAL_SECONDS):
+    """
+    Runs flush() in a daemon thread: right after each enqueue, and every `interval` seconds.
+    Old sent writes are purged when a flush finds nothing to send, at most every PURGE_INTERVAL_SECONDS.
+    """
+    def run():
+        next_purge = time.monotonic()
+        while True:
+            _wakeup.clear()
+            try:
+                # Keep going while full batches go through
+                sent = flush(outbox, send)
+                while sent == BATCH_SIZE:
+                    sent = flush(outbox, send)
+                if sent == 0 and time.monotonic() >= next_purge:
+                    outbox.purge_sent()
+                    next_purge = time.monotonic() + PURGE_INTERVAL_SECONDS
+            except sqlite3.Error:
+                pass
+            _wakeup.wait(interval)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
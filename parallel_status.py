@@ -0,0 +1,234 @@
+"""
+Optional process-pool backend for compute_participants_status, for cohorts of thousands.
+
+Participants are split into partitions by a stable hash of their patientId; each worker
+process computes the status rows of one partition with the same data_processing code as
+the serial path, so the result is identical. Events and answers, the bulk of the input,
+are packed once into columnar NumPy arrays in one shared-memory block that the workers
+attach to, instead of pickling DataFrames and answer lists to every task; only each
+partition's participant rows and the (small) timetable are pickled.
+
+Enabled with BOOGGII_STATUS_WORKERS=<processes> for cohorts of at least
+PARALLEL_MIN_PARTICIPANTS participants; see compute_status.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from data_processing import compute_participants_status, force_uniform_datetime
+from time_utils import ANSWER_NAIVE_TZ, from_utc_ns, israel_tz, to_utc_ns
+
+STATUS_WORKERS = int(os.environ.get('BOOGGII_STATUS_WORKERS', '0'))
+# Smaller cohorts are faster serially than the cost of shipping them to the pool
+PARALLEL_MIN_PARTICIPANTS = 500
+# Partitions per worker, so a slow partition doesn't leave the other workers idle
+PARTITIONS_PER_WORKER = 4
+
+
+# ----------------------------
+# SHARED-MEMORY ARRAYS
+# ----------------------------
+class SharedArrays:
+    """
+    Named NumPy arrays packed into one shared-memory block. The creating process owns the
+    block (unlinked on close); workers rebuild the arrays from `spec` with attach().
+    """
+
+    def __init__(self, arrays):
+        offsets, offset = {}, 0
+        for name, array in arrays.items():
+            offset = -(-offset // 8) * 8  # 8-byte alignment
+            offsets[name] = offset
+            offset += array.nbytes
+        self._shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        self.spec = {'name': self._shm.name, 'arrays': {}}
+        for name, array in arrays.items():
+            view = np.ndarray(array.shape, dtype=array.dtype, buffer=self._shm.buf, offset=offsets[name])
+            view[...] = array
+            self.spec['arrays'][name] = (array.dtype.str, array.shape, offsets[name])
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach(spec):
+    """(SharedMemory, {name: read-only array view}) of a block made by SharedArrays; close the block when done."""
+    # Pool workers share their parent's resource tracker, so the block stays registered
+    # once and is unlinked by its creator only
+    shm = shared_memory.SharedMemory(name=spec['name'])
+    arrays = {}
+    for name, (dtype, shape, offset) in spec['arrays'].items():
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+        array.flags.writeable = False
+        arrays[name] = array
+    return shm, arrays
+
+
+# ----------------------------
+# PARTITIONING
+# ----------------------------
+def partition_of(patient_ids, num_partitions):
+    """Partition number of each patientId; stable across processes and runs (unlike hash())."""
+    hashes = pd.util.hash_array(np.asarray(patient_ids, dtype=object))
+    return (hashes % np.uint64(num_partitions)).astype(np.int64)
+
+
+def _grouped(codes, num_groups):
+    """Stable sort order of rows by group code and each group's [start, end) offsets."""
+    order = np.argsort(codes, kind='stable')
+    offsets = np.searchsorted(codes[order], np.arange(num_groups + 1), side='left')
+    return order, offsets
+
+
+def pack_inputs(participant_data, event_data, questions_by_patient):
+    """
+    Columnar arrays of the events and answers, rows grouped by participant (row of
+    `participant_data`), plus the answers' question numbers (their codes index this list).
+    Timestamps are parsed here once, exactly as the serial path parses them.
+    """
+    patient_ids = participant_data['patientId'].to_numpy(dtype=object)
+    num_participants = len(patient_ids)
+
+    events = pd.DataFrame(event_data)
+    if events.empty:
+        events = pd.DataFrame({'patientId': [], 'timestamp': []})
+    events = force_uniform_datetime(events[['patientId', 'timestamp']].copy(), tz=israel_tz)
+    event_codes = pd.Categorical(events['patientId'], categories=pd.unique(patient_ids)).codes.astype(np.int64)
+    event_ns = pd.DatetimeIndex(events['timestamp']).as_unit('ns').asi8
+    known = event_codes >= 0
+    event_codes, event_ns = event_codes[known], event_ns[known]
+    order, event_offsets = _grouped(event_codes, num_participants)
+
+    # Answers: None (backend unavailable) and [] (no answers) are told apart by answers_known
+    frames, answer_codes = [], []
+    answers_known = np.zeros(num_participants, dtype=bool)
+    for row, patient_id in enumerate(patient_ids):
+        questions_data = questions_by_patient.get(patient_id)
+        if questions_data is None:
+            continue
+        answers_known[row] = True
+        if len(questions_data):
+            frames.append(pd.DataFrame(questions_data).reindex(columns=['timestamp', 'questionNum', 'answer']))
+            answer_codes.append(np.full(len(questions_data), row, dtype=np.int64))
+    answers = (pd.concat(frames, ignore_index=True) if frames
+               else pd.DataFrame({'timestamp': [], 'questionNum': [], 'answer': []}))
+    question_codes, question_numbers = pd.factorize(answers['questionNum'].astype(str))
+    answer_codes = np.concatenate(answer_codes) if answer_codes else np.zeros(0, dtype=np.int64)
+    answer_order, answer_offsets = _grouped(answer_codes, num_participants)
+
+    arrays = {
+        'event_ns': event_ns[order],
+        'event_offsets': event_offsets,
+        'answer_ns': to_utc_ns(answers['timestamp'], ANSWER_NAIVE_TZ)[answer_order],
+        'answer_question': question_codes.astype(np.int32)[answer_order],
+        'answer_value': pd.to_numeric(answers['answer'], errors='coerce').to_numpy(dtype=np.float64)[answer_order],
+        'answer_offsets': answer_offsets,
+        'answers_known': answers_known,
+    }
+    return arrays, list(question_numbers)
+
+
+# ----------------------------
+# WORKER
+# ----------------------------
+def _status_partition(args):
+    """Worker: status rows of one partition, from the shared arrays."""
+    spec, rows, participants, question_numbers, timetable_df, now = args
+    shm, arrays = attach(spec)
+    try:
+        question_numbers = np.asarray(question_numbers, dtype=object)
+        event_offsets, answer_offsets = arrays['event_offsets'], arrays['answer_offsets']
+
+        event_frames = []
+        questions_by_patient = {}
+        for row, patient_id in zip(rows, participants['patientId']):
+            lo, hi = event_offsets[row], event_offsets[row + 1]
+            event_frames.append(pd.DataFrame({'patientId': patient_id, 'timestamp': from_utc_ns(arrays['event_ns'][lo:hi])}))
+            if not arrays['answers_known'][row]:
+                questions_by_patient[patient_id] = None
+                continue
+            lo, hi = answer_offsets[row], answer_offsets[row + 1]
+            questions_by_patient[patient_id] = pd.DataFrame({
+                'timestamp': from_utc_ns(arrays['answer_ns'][lo:hi], tz='UTC'),
+                'questionNum': question_numbers[arrays['answer_question'][lo:hi]],
+                'answer': arrays['answer_value'][lo:hi],
+            })
+        events = (pd.concat(event_frames, ignore_index=True) if event_frames
+                  else pd.DataFrame({'patientId': [], 'timestamp': pd.DatetimeIndex([], tz=israel_tz)}))
+        return compute_participants_status(participants, events, questions_by_patient, timetable_df, now)
+    finally:
+        shm.close()
+
+
+# ----------------------------
+# PARALLEL STATUS
+# ----------------------------
+_executor = None
+_executor_workers = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(workers=None):
+    """
+    (process pool, its number of workers): the pool shared by all sessions, started on
+    first use ('spawn': safe from a threaded server).
+    """
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None:
+            _executor_workers = workers or STATUS_WORKERS or os.cpu_count() or 1
+            _executor = ProcessPoolExecutor(max_workers=_executor_workers,
+                                            mp_context=multiprocessing.get_context('spawn'))
+        return _executor, _executor_workers
+
+
+def compute_participants_status_parallel(participant_data, event_data, questions_by_patient, timetable_df,
+                                         now=None, executor=None, workers=None):
+    """
+    compute_participants_status computed across a process pool: `executor` with `workers`
+    processes (os.cpu_count() if not given), the shared pool by default. Same arguments and
+    result, rows in the order of `participant_data`.
+    """
+    if now is None:
+        now = pd.Timestamp.now(tz=israel_tz)
+    participants = participant_data.reset_index(drop=True)
+    if participants['patientId'].duplicated().any():
+        # Rows are matched to their events and answers by patientId
+        return compute_participants_status(participant_data, event_data, questions_by_patient, timetable_df, now)
+    if executor is None:
+        executor, workers = get_executor()
+    num_partitions = max(1, (workers or os.cpu_count() or 1) * PARTITIONS_PER_WORKER)
+    partitions = partition_of(participants['patientId'], num_partitions)
+
+    arrays, question_numbers = pack_inputs(participants, event_data, questions_by_patient)
+    with SharedArrays(arrays) as shared:
+        tasks = []
+        for partition in range(num_partitions):
+            rows = np.flatnonzero(partitions == partition)
+            if len(rows):
+                tasks.append((shared.spec, rows, participant_data.iloc[rows], question_numbers, timetable_df, now))
+        frames = list(executor.map(_status_partition, tasks))
+
+    if not frames:
+        return compute_participants_status(participant_data, event_data, questions_by_patient, timetable_df, now)
+    return pd.concat(frames).reindex(participants['patientId'])
+
+
+def compute_status(participant_data, event_data, questions_by_patient, timetable_df, now=None):
+    """compute_participants_status, on the process pool when enabled and the cohort is large enough."""
+    if STATUS_WORKERS and len(participant_data) >= PARALLEL_MIN_PARTICIPANTS:
+        return compute_participants_status_parallel(participant_data, event_data, questions_by_patient,
+                                                    timetable_df, now)
+    return compute_participants_status(participant_data, event_data, questions_by_patient, timetable_df, now)
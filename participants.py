@@ -0,0 +1,102 @@
+import pandas as pd
+
+from time_utils import EMPATICA_NAIVE_TZ, TRIAL_START_NAIVE_TZ, to_utc
+
+# ----------------------------
+# PARTICIPANT SCHEMA
+# ----------------------------
+# API field -> (column, kind). Built once at ingest so downstream code never renames or re-parses.
+PARTICIPANT_SCHEMA = {
+    'patientId': ('patientId', 'str'),
+    'nickName': ('nickName', 'str'),
+    'phone': ('phone', 'str'),
+    'empaticaId': ('empaticaId', 'str'),
+    'firebaseId': ('firebaseId', 'str'),
+    'createdAt': ('created_at', 'datetime'),
+    'updatedAt': ('updated_at', 'datetime'),
+    'trialStartingDate': ('trial_starting_date', 'datetime'),
+    'empatica_last_update': ('empatica_last_update', 'empatica_datetime'),
+    'empaticaStatus': ('empatica_status', 'str'),
+    'numOfEventsCurrentDate': ('num_of_events_current_date', 'int'),
+    'isActive': ('is_active', 'bool'),
+    # NONE / True / False - whether the watch is worn properly
+    'empaticaWearingStatus': ('empatica_wearing_status', 'object'),
+    # Trial site the participant was fetched from (see sites.py)
+    'site': ('site', 'str'),
+}
+
+PARTICIPANT_COLUMNS = [column for column, _ in PARTICIPANT_SCHEMA.values()]
+
+# Older payloads already use some of the column names
+_FALLBACK_FIELDS = {
+    'created_at': 'createdAt',
+    'updated_at': 'updatedAt',
+    'trial_starting_date': 'trialStartingDate',
+    'empatica_status': 'empaticaStatus',
+    'is_active': 'isActive',
+}
+
+
+def _parse_bool(values):
+    """'True'/'true'/True -> True, anything else (including missing) -> False."""
+    return values.map(lambda x: str(x).strip().lower() == 'true').astype(bool)
+
+
+def _parse_column(values, kind):
+    if kind == 'datetime':
+        return to_utc(values, TRIAL_START_NAIVE_TZ)
+    if kind == 'empatica_datetime':
+        return to_utc(values, EMPATICA_NAIVE_TZ)
+    if kind == 'bool':
+        return _parse_bool(values)
+    if kind == 'int':
+        return pd.to_numeric(values, errors='coerce').astype('Int64')
+    if kind == 'str':
+        return values.astype('string')
+    return values.astype(object).where(values.notna(), None)
+
+
+def parse_participants(participant_data):
+    """
+    Participants from the API as one typed table, indexed by patientId:
+    datetimes as UTC, 'is_active' as bool, strings as string dtype.
+    Returns None when there is no data.
+    """
+    if participant_data is None or len(participant_data) == 0:
+        return None
+    raw = pd.DataFrame(participant_data)
+
+    for column, field in _FALLBACK_FIELDS.items():
+        if field not in raw.columns and column in raw.columns:
+            raw[field] = raw[column]
+
+    table = pd.DataFrame(index=raw.index)
+    for field, (column, kind) in PARTICIPANT_SCHEMA.items():
+        values = raw[field] if field in raw.columns else pd.Series(None, index=raw.index, dtype=object)
+        table[column] = _parse_column(values, kind)
+
+    table.index = pd.Index(table['patientId'].to_numpy(dtype=object))
+    return table
+
+
+def has_participants(table):
+    return table is not None and not table.empty
+
+
+def apply_participant_updates(table, patient_id, updates):
+    """
+    Applies a PATCH payload (API field names) to one participant's row, parsing
+    values the same way as parse_participants. Returns the updated table.
+    """
+    table = table.copy()
+    for field, value in updates.items():
+        if field not in PARTICIPANT_SCHEMA or field == 'patientId':
+            continue
+        column, kind = PARTICIPANT_SCHEMA[field]
+        parsed = _parse_column(pd.Series([value], index=[patient_id]), kind)
+        table.loc[patient_id, column] = parsed.iloc[0]
+    return table
+
+
+def active_participants(table):
+    return table[table['is_active']]
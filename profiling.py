@@ -0,0 +1,170 @@
+"""
+Profiling of one dashboard rerun, for "the dashboard is slow today" reports.
+
+RerunProfiler runs cProfile on the script thread and on every thread started while it is
+active, since the backend fetches (api.py) run in short-lived thread pools. The merged
+result is saved as a .pstats file (snakeviz, gprof2dot, pstats) and as collapsed stacks
+(.folded, for flamegraph.pl or speedscope.app), and hot_functions() gives the table shown
+inline. Status computed on the process pool (parallel_status) shows up as waiting only.
+
+Admins are the usernames in BOOGGII_ADMINS ("name,name2") or ADMINS in private_config.
+"""
+import cProfile
+import os
+import pstats
+import threading
+import time
+
+import pandas as pd
+
+import private_config
+
+PROFILE_DIR = os.environ.get('BOOGGII_PROFILE_DIR', 'profiles')
+ADMINS = {name.strip() for name in os.environ.get('BOOGGII_ADMINS', '').split(',') if name.strip()} \
+    or set(getattr(private_config, 'ADMINS', ()))
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Collapsed stacks: paths with less than this share of the total time are left out
+MIN_STACK_FRACTION = 0.001
+MAX_STACK_DEPTH = 100
+
+HOT_FUNCTION_COLUMNS = ['Function', 'Location', 'Calls', 'Own time (s)', 'Total time (s)']
+
+
+def is_admin(username):
+    return username is not None and username in ADMINS
+
+
+# ----------------------------
+# PROFILER
+# ----------------------------
+class ProfilerBusy(RuntimeError):
+    """Another rerun is being profiled (threading.setprofile is process-wide)."""
+
+
+class RerunProfiler:
+    """
+    cProfile of the current thread and of the threads started while active (other
+    sessions' threads started meanwhile included). Use as a context manager, then stats().
+    """
+
+    _active = threading.Lock()
+
+    def __init__(self):
+        self._profiles = []  # (thread, cProfile.Profile)
+        self._profiles_lock = threading.Lock()
+        self.seconds = None
+        self.threads = None
+
+    def _start_thread(self, frame, event, arg):
+        # threading.setprofile hook: called on the first event of each new thread, and
+        # replaced there by that thread's own profiler
+        profile = cProfile.Profile()
+        with self._profiles_lock:
+            self._profiles.append((threading.current_thread(), profile))
+        profile.enable()
+
+    def __enter__(self):
+        if not RerunProfiler._active.acquire(blocking=False):
+            raise ProfilerBusy("another rerun is being profiled")
+        self._started = time.perf_counter()
+        self._main = cProfile.Profile()
+        threading.setprofile(self._start_thread)
+        self._main.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self._main.disable()
+        threading.setprofile(None)
+        self.seconds = time.perf_counter() - self._started
+        RerunProfiler._active.release()
+
+    def stats(self):
+        """pstats.Stats of the script thread and of the started threads that have finished."""
+        stats = pstats.Stats(self._main)
+        with self._profiles_lock:
+            # A profile can only be stopped by its own thread; still running ones are left out
+            finished = [profile for thread, profile in self._profiles if not thread.is_alive()]
+        for profile in finished:
+            profile.create_stats()
+            if profile.stats:
+                stats.add(profile)
+        self.threads = 1 + len(finished)
+        return stats
+
+
+# ----------------------------
+# EXPORT
+# ----------------------------
+def _label(function):
+    filename, line, name = function
+    if filename == '~':
+        return name.replace(';', ',')  # built-ins, e.g. <method 'join' of 'str' objects>
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(';', ',')
+
+
+def collapsed_stacks(stats):
+    """
+    {"root;caller;function": own seconds} from the call graph of `stats`. cProfile keeps
+    caller -> callee totals, not whole stacks, so a function's time is split between the
+    paths to it in proportion to the time of each call edge (as flameprof does).
+    """
+    entries = stats.stats
+    callees = {}
+    for function, (_, _, _, _, callers) in entries.items():
+        for caller, (_, _, _, edge_time) in callers.items():
+            callees.setdefault(caller, []).append((function, edge_time))
+    roots = [function for function, (_, _, _, _, callers) in entries.items() if not callers]
+    total = sum(entries[function][3] for function in roots)
+    if total <= 0:
+        return {}
+    min_seconds = total * MIN_STACK_FRACTION
+
+    stacks = {}
+    # Depth-first over (function, seconds through this path, stack so far)
+    pending = [(function, entries[function][3], ()) for function in roots]
+    while pending:
+        function, seconds, stack = pending.pop()
+        if seconds < min_seconds or function in stack or len(stack) >= MAX_STACK_DEPTH:
+            continue
+        _, _, own_time, total_time, _ = entries[function]
+        share = seconds / total_time if total_time > 0 else 0.0
+        stack = stack + (function,)
+        key = ';'.join(_label(frame) for frame in stack)
+        stacks[key] = stacks.get(key, 0.0) + own_time * share
+        for callee, edge_time in callees.get(function, ()):
+            pending.append((callee, edge_time * share, stack))
+    return stacks
+
+
+def save_profile(stats, directory=PROFILE_DIR, name=None):
+    """Writes <name>.pstats and <name>.folded (microseconds per stack); returns both paths."""
+    os.makedirs(directory, exist_ok=True)
+    name = name or f"rerun_{time.strftime('%Y%m%d-%H%M%S')}"
+    pstats_path = os.path.join(directory, f"{name}.pstats")
+    folded_path = os.path.join(directory, f"{name}.folded")
+    stats.dump_stats(pstats_path)
+    with open(folded_path, 'w') as file:
+        for stack, seconds in sorted(collapsed_stacks(stats).items()):
+            microseconds = round(seconds * 1e6)
+            if microseconds > 0:
+                file.write(f"{stack} {microseconds}\n")
+    return pstats_path, folded_path
+
+
+def _in_app(filename):
+    path = os.path.abspath(filename)
+    return path.startswith(APP_DIR + os.sep) and 'site-packages' not in path
+
+
+def hot_functions(stats, limit=20, app_only=False):
+    """The `limit` functions with the most own time; with app_only, only this app's modules."""
+    rows = []
+    for (filename, line, name), (_, calls, own_time, total_time, _) in stats.stats.items():
+        if app_only and not _in_app(filename):
+            continue
+        location = f"{os.path.basename(filename)}:{line}" if filename != '~' else 'built-in'
+        rows.append((name, location, calls, own_time, total_time))
+    table = pd.DataFrame(rows, columns=HOT_FUNCTION_COLUMNS)
+    return table.sort_values('Own time (s)', ascending=False).head(limit).reset_index(drop=True)
@@ -0,0 +1,281 @@
+"""
+Reminders to participants who haven't answered a scheduled questionnaire slot.
+
+A long-running process: every slot of each site's questionnaire timetable gets a timer
+`--delay` minutes after the slot, kept in a heap. When timers fire, the active
+participants in their trial who have not answered any of that slot's questions get one
+reminder, all due slots' reminders go out as one FCM batch, and participants FCM could
+not reach get an SMS instead. A participant is reminded at most once per slot. Imports
+neither Streamlit nor the dashboard:
+
+    python reminders.py --delay 60            # send
+    python reminders.py --delay 60 --dry-run  # print who would be reminded
+
+Only slots due after the process starts are scheduled, so a restart does not resend
+reminders for earlier slots.
+"""
+import argparse
+import heapq
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+import sites
+from data_processing import expand_question_schedule, transform_questionnaire_data
+from notifications import FcmSender, Message, PrintSender, SmsSender
+from participants import parse_participants, has_participants
+from time_utils import ANSWER_NAIVE_TZ, israel_tz, now as current_time, to_utc_ns
+
+DEFAULT_DELAY_MINUTES = 60
+# How far ahead slots are put on the timer heap, and how often the timetables are re-read
+SCHEDULE_HORIZON = pd.Timedelta(days=1)
+REFRESH_SECONDS = 15 * 60
+# Participants are reminded during the first TRIAL_DAYS days of their trial
+TRIAL_DAYS = 30
+# A slot whose participants could not be fetched or reached is retried every RETRY_DELAY,
+# until RETRY_WINDOW after it was first due
+RETRY_DELAY = pd.Timedelta(minutes=10)
+RETRY_WINDOW = pd.Timedelta(hours=6)
+
+REMINDER_TITLE = "תזכורת"
+REMINDER_BODY = "נא למלא את השאלון"
+
+
+def participant_sites(participant_data):
+    """Site of each participant; records fetched without one belong to the first site."""
+    return participant_data['site'].fillna(next(iter(sites.SITES))).astype(object)
+
+
+def _contact(value):
+    """FCM token / phone number, None when missing or empty."""
+    return None if pd.isna(value) or not str(value).strip() else str(value)
+
+
+class ReminderScheduler:
+    """
+    Heap of slot timers and the reminders already sent. `senders` are tried in order
+    (e.g. [FcmSender(), SmsSender()]): each gets the messages the previous ones could not
+    deliver. The fetch functions and clock default to the live backends of all sites.
+    """
+
+    def __init__(self, senders, delay_minutes=DEFAULT_DELAY_MINUTES,
+                 fetch_participants=sites.fetch_participants,
+                 fetch_questionnaires=sites.fetch_questionnaire_by_site,
+                 fetch_answers=sites.fetch_questions_by_patient,
+                 clock=current_time):
+        self.senders = senders
+        self.delay = pd.Timedelta(minutes=delay_minutes)
+        self.fetch_participants = fetch_participants
+        self.fetch_questionnaires = fetch_questionnaires
+        self.fetch_answers = fetch_answers
+        self.clock = clock
+        self.started_at = clock()
+
+        self._timers = []          # heap of (due ns, slot ns, site)
+        self._scheduled = set()    # (site, slot ns) already on the heap or fired
+        self._reminded = set()     # (patientId, slot ns) already reminded
+        self._timetables = {}      # site -> timetable_df
+
+    # ----------------------------
+    # TIMERS
+    # ----------------------------
+    def schedule(self, now=None):
+        """Re-reads the timetables and adds a timer for every slot due in the next SCHEDULE_HORIZON."""
+        now = self.clock() if now is None else now
+        questionnaires = self.fetch_questionnaires()
+        for site, questionnaire_data in questionnaires.items():
+            _, self._timetables[site] = transform_questionnaire_data(questionnaire_data)
+
+        first_due = max(now, self.started_at)
+        for site, timetable_df in self._timetables.items():
+            slots = expand_question_schedule(timetable_df, first_due - self.delay, now + SCHEDULE_HORIZON)
+            for slot_ns in pd.DatetimeIndex(slots['slot_time']).as_unit('ns').asi8.tolist():
+                due_ns = slot_ns + self.delay.value
+                if due_ns < first_due.value or (site, slot_ns) in self._scheduled:
+                    continue
+                self._scheduled.add((site, slot_ns))
+                heapq.heappush(self._timers, (due_ns, slot_ns, site))
+
+        # Forget slots older than any trial could still be reminded about
+        oldest_ns = (now - pd.Timedelta(days=2)).value
+        self._scheduled = {key for key in self._scheduled if key[1] >= oldest_ns}
+        self._reminded = {key for key in self._reminded if key[1] >= oldest_ns}
+
+    def next_due(self):
+        """Time of the earliest pending timer (None if there is none)."""
+        return pd.Timestamp(self._timers[0][0], tz='UTC').tz_convert(israel_tz) if self._timers else None
+
+    def pop_due(self, now):
+        """Removes and returns the (site, slot ns) of all timers due at `now`."""
+        due = []
+        while self._timers and self._timers[0][0] <= now.value:
+            _, slot_ns, site = heapq.heappop(self._timers)
+            due.append((site, slot_ns))
+        return due
+
+    def retry(self, slots, now):
+        """Puts slots back on the heap RETRY_DELAY from `now`, unless past their RETRY_WINDOW."""
+        retry_ns = (now + RETRY_DELAY).value
+        for site, slot_ns in slots:
+            if retry_ns <= slot_ns + (self.delay + RETRY_WINDOW).value:
+                heapq.heappush(self._timers, (retry_ns, slot_ns, site))
+
+    # ----------------------------
+    # NON-RESPONDERS
+    # ----------------------------
+    def _slot_questions(self, site, slot_ns):
+        timetable_df = self._timetables.get(site)
+        if timetable_df is None:
+            return set()
+        slot = pd.Timestamp(slot_ns, tz='UTC').tz_convert(israel_tz)
+        question_sets = timetable_df.attrs.get('question_sets')
+        if question_sets is not None:
+            return set(question_sets.get((slot.strftime('%H:%M'), slot.day_name()), ()))
+        cell = timetable_df.at[slot.strftime('%H:%M'), slot.day_name()]
+        return {q.strip() for q in cell.split(',')} if cell else set()
+
+    def non_responders(self, due_slots, participant_data, questions_by_patient, now):
+        """
+        [(patientId, slot ns)] of the active participants of each due slot's site, in their
+        trial at the slot, who answered none of the slot's questions between the slot and
+        `now`, and the due slots with candidates whose answers are unknown (backend
+        unavailable): those are skipped now and the slot is to be retried.
+        """
+        frames = []
+        for patient_id, questions_data in questions_by_patient.items():
+            if questions_data:
+                answers = pd.DataFrame(questions_data).reindex(columns=['questionNum', 'timestamp'])
+                answers['patientId'] = patient_id
+                frames.append(answers)
+        answers_df = (pd.concat(frames, ignore_index=True) if frames
+                      else pd.DataFrame(columns=['patientId', 'questionNum', 'timestamp']))
+        answer_ns = to_utc_ns(answers_df['timestamp'], ANSWER_NAIVE_TZ)
+        answer_questions = answers_df['questionNum'].astype(str).to_numpy()
+        answer_patients = answers_df['patientId'].to_numpy()
+
+        trial_start_ns = to_utc_ns(participant_data['trial_starting_date'])
+        missing = np.iinfo(np.int64).min
+        known = np.array([questions_by_patient.get(p) is not None for p in participant_data['patientId']], dtype=bool)
+        is_active = participant_data['is_active'].to_numpy(dtype=bool)
+        site_of_participant = participant_sites(participant_data).to_numpy()
+
+        found = []
+        incomplete = []
+        for site, slot_ns in due_slots:
+            questions = self._slot_questions(site, slot_ns)
+            if not questions:
+                continue
+            in_trial = (trial_start_ns == missing) | (
+                (trial_start_ns <= slot_ns) & (slot_ns < trial_start_ns + pd.Timedelta(days=TRIAL_DAYS).value))
+            candidates = is_active & in_trial & (site_of_participant == site)
+            if (candidates & ~known).any():
+                incomplete.append((site, slot_ns))
+            candidates &= known
+            answered_slot = (answer_ns >= slot_ns) & (answer_ns <= now.value) & np.isin(answer_questions, list(questions))
+            responders = set(answer_patients[answered_slot])
+            for patient_id in participant_data['patientId'].to_numpy()[candidates]:
+                if patient_id not in responders and (patient_id, slot_ns) not in self._reminded:
+                    found.append((patient_id, slot_ns))
+        return found, incomplete
+
+    # ----------------------------
+    # SENDING
+    # ----------------------------
+    def send(self, messages):
+        """Tries each sender in turn on what the previous ones failed to deliver; returns the undelivered patientIds."""
+        pending = messages
+        for sender in self.senders:
+            if not pending:
+                break
+            failed = sender.send(pending)
+            pending = [message for message in pending if message.patient_id in failed]
+        return {message.patient_id for message in pending}
+
+    def run_due(self, now=None):
+        """
+        Fires all due timers: finds the non-responders and sends their reminders as one batch.
+        Slots are retried later when the participants or answers can't be fetched (all of
+        them, or some site's or participant's), and for the participants no sender could reach.
+        """
+        now = self.clock() if now is None else now
+        due_slots = self.pop_due(now)
+        if not due_slots:
+            return []
+
+        try:
+            participants = self.fetch_participants()
+            if participants is None:
+                raise RuntimeError("participants unavailable")
+            participant_data = parse_participants(participants)
+            if not has_participants(participant_data):
+                # No site returned anyone: as for a missing site below, try again later
+                self.retry(due_slots, now)
+                return []
+            due_sites = {site for site, _ in due_slots}
+            in_due_sites = participant_sites(participant_data).isin(due_sites)
+            patient_ids = participant_data.loc[participant_data['is_active'] & in_due_sites, 'patientId'].tolist()
+            questions_by_patient = self.fetch_answers(patient_ids) if patient_ids else {}
+        except Exception:
+            self.retry(due_slots, now)
+            raise
+        reminders, incomplete = self.non_responders(due_slots, participant_data, questions_by_patient, now)
+        # A due site with no participants in the fetch is taken as a site that didn't answer
+        missing_sites = due_sites - set(participant_sites(participant_data))
+
+        # One message per participant, even when several slots fired at once
+        messages = []
+        for patient_id in dict.fromkeys(patient_id for patient_id, _ in reminders):
+            row = participant_data.loc[patient_id]
+            messages.append(Message(patient_id, REMINDER_TITLE, REMINDER_BODY,
+                                    token=_contact(row['firebaseId']), phone=_contact(row['phone'])))
+        undelivered = self.send(messages)
+        self._reminded.update(key for key in reminders if key[0] not in undelivered)
+        # Already reminded participants are skipped when a retried slot fires again
+        undelivered_slots = {slot_ns for patient_id, slot_ns in reminders if patient_id in undelivered}
+        self.retry([(site, slot_ns) for site, slot_ns in due_slots
+                    if slot_ns in undelivered_slots or site in missing_sites or (site, slot_ns) in incomplete], now)
+        return reminders
+
+    def run(self, stop=None):
+        """Schedules and fires timers until `stop` (a threading.Event) is set."""
+        stop = stop or threading.Event()
+        next_refresh = self.clock()
+        while not stop.is_set():
+            now = self.clock()
+            if now >= next_refresh:
+                try:
+                    self.schedule(now)
+                except Exception as e:
+                    print(f"could not refresh the timetables: {e}", file=sys.stderr)
+                next_refresh = now + pd.Timedelta(seconds=REFRESH_SECONDS)
+            try:
+                reminders = self.run_due(now)
+                if reminders:
+                    print(f"{now:%Y-%m-%d %H:%M}: reminded {len({p for p, _ in reminders})} participant(s)")
+            except Exception as e:
+                print(f"reminders failed: {e}", file=sys.stderr)
+
+            wake_at = min(filter(None, [self.next_due(), next_refresh]))
+            stop.wait(max(0.0, (wake_at - self.clock()).total_seconds()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--delay', type=int, default=DEFAULT_DELAY_MINUTES,
+                        help="minutes after a slot before non-responders are reminded")
+    parser.add_argument('--no-sms', action='store_true', help="don't fall back to SMS when FCM fails")
+    parser.add_argument('--dry-run', action='store_true', help="print the reminders instead of sending them")
+    args = parser.parse_args(argv)
+
+    if args.dry_run:
+        senders = [PrintSender()]
+    else:
+        senders = [FcmSender()] if args.no_sms else [FcmSender(), SmsSender()]
+    ReminderScheduler(senders, args.delay).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
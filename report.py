@@ -0,0 +1,139 @@
+"""
+Daily per-participant compliance/event report, without the Streamlit UI.
+
+Fetches each trial's participants, events and answers from its backend, computes the
+same status metrics as the dashboard's "Participants Status" table (data_processing)
+in a process pool, and writes CSV/HTML/Parquet files. Imports neither Streamlit nor
+Firebase, so it can run from cron:
+
+    # every day at 07:00
+    0 7 * * * cd /path/to/dashboard && python report.py --out-dir reports
+
+Several trials (backends): --trial NAME=BASE_URL, repeated. Default: BASE_URL from private_config.
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from api import fetch_events_data, fetch_participants, fetch_questionnaire_data, fetch_questions_by_patient
+from data_processing import STATUS_COLUMNS, transform_questionnaire_data
+from event_ingest import ingest_events
+from parallel_status import compute_participants_status_parallel
+from participants import active_participants, has_participants, parse_participants
+from private_config import BASE_URL
+from time_utils import israel_tz
+
+REPORT_FORMATS = ['csv', 'html', 'parquet']
+
+REPORT_COLUMNS = ['trial', 'patientId', 'is_active'] + STATUS_COLUMNS + [
+    'Valid Answers Since Trial',
+    'Displayed Questions Since Trial',
+]
+
+def fetch_trial(base_url):
+    """
+    (participants table, events, questionnaire data, answers by patientId) of one backend.
+    Events are None when the events API failed (not the same as a trial without events).
+    """
+    participant_data = parse_participants(fetch_participants(base_url))
+    if not has_participants(participant_data):
+        return None, None, None, {}
+    event_data = fetch_events_data(base_url)
+    questionnaire_data = fetch_questionnaire_data(base_url)
+    questions_by_patient = fetch_questions_by_patient(participant_data['patientId'], base_url)
+    return participant_data, event_data, questionnaire_data, questions_by_patient
+
+
+def compute_trial_report(participant_data, event_data, questionnaire_data, questions_by_patient,
+                         executor, workers=None, now=None):
+    """
+    Status of all participants of one trial, computed across `executor`'s `workers`
+    processes (see parallel_status.compute_participants_status_parallel).
+    """
+    if now is None:
+        now = pd.Timestamp.now(tz=israel_tz)
+    _, timetable_df = transform_questionnaire_data(questionnaire_data)
+    events_df, _ = ingest_events(event_data, participant_data)
+    return compute_participants_status_parallel(participant_data, events_df, questions_by_patient, timetable_df,
+                                                now, executor=executor, workers=workers)
+
+
+def write_report(report_df, out_dir, name, formats=REPORT_FORMATS):
+    """Writes `report_df` as <out_dir>/<name>.<format> for each format; returns the paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for fmt in formats:
+        path = os.path.join(out_dir, f"{name}.{fmt}")
+        if fmt == 'csv':
+            report_df.to_csv(path, index=False)
+        elif fmt == 'html':
+            report_df.to_html(path, index=False, na_rep="N/A", float_format="{:.0f}".format)
+        elif fmt == 'parquet':
+            report_df.to_parquet(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def parse_trials(values):
+    """['a=https://...', ...] -> {'a': 'https://...'}; default trial when none given."""
+    if not values:
+        return {'default': BASE_URL}
+    trials = {}
+    for value in values:
+        name, sep, url = value.partition('=')
+        if not sep or not name or not url:
+            raise argparse.ArgumentTypeError(f"expected NAME=BASE_URL, got {value!r}")
+        trials[name] = url.rstrip('/')
+    return trials
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--trial', action='append', metavar='NAME=BASE_URL', help="backend of one trial (repeatable)")
+    parser.add_argument('--out-dir', default='reports')
+    parser.add_argument('--formats', default=','.join(REPORT_FORMATS), help="comma separated: csv,html,parquet")
+    parser.add_argument('--include-inactive', action='store_true', help="also report inactive participants")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    formats = [fmt.strip() for fmt in args.formats.split(',') if fmt.strip()]
+    unknown = set(formats) - set(REPORT_FORMATS)
+    if unknown:
+        parser.error(f"unknown formats: {', '.join(sorted(unknown))}")
+    try:
+        trials = parse_trials(args.trial)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    now = pd.Timestamp.now(tz=israel_tz)
+    reports = []
+    failed = []
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for trial, base_url in trials.items():
+            participant_data, event_data, questionnaire_data, questions_by_patient = fetch_trial(base_url)
+            if not has_participants(participant_data) or event_data is None or not questionnaire_data:
+                print(f"{trial}: no data from {base_url}, skipped", file=sys.stderr)
+                failed.append(trial)
+                continue
+            if not args.include_inactive:
+                participant_data = active_participants(participant_data)
+                if participant_data.empty:
+                    continue
+            report_df = compute_trial_report(participant_data, event_data, questionnaire_data,
+                                             questions_by_patient, executor, args.workers, now)
+            report_df['trial'] = trial
+            reports.append(report_df[REPORT_COLUMNS])
+
+    if reports:
+        report_df = pd.concat(reports, ignore_index=True)
+        for path in write_report(report_df, args.out_dir, f"report_{now:%Y-%m-%d}", formats):
+            print(path)
+    # Non-zero exit so cron reports a trial that couldn't be fetched
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
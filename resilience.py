@@ -0,0 +1,90 @@
+import threading
+import time
+
+
+class AIMDLimiter:
+    """
+    Adaptive concurrency limit for calls to the backend (additive increase, multiplicative decrease).
+    Every `limit` successful calls raise the limit by one; a throttled/failed call halves it.
+    Use as a context manager around each request.
+    """
+
+    def __init__(self, initial=4, minimum=1, maximum=32, backoff_factor=0.5):
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff_factor = backoff_factor
+        self.in_flight = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    def __enter__(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+        return False
+
+    def on_success(self):
+        with self._condition:
+            self._successes += 1
+            if self._successes >= int(self.limit):
+                self._successes = 0
+                self.limit = min(self.maximum, self.limit + 1)
+                self._condition.notify()
+
+    def on_overload(self):
+        with self._condition:
+            self._successes = 0
+            self.limit = max(self.minimum, self.limit * self.backoff_factor)
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing backend. After `failure_threshold` consecutive failures the circuit
+    opens for `reset_timeout` seconds; then one probe call is let through (half-open) and its
+    outcome closes or re-opens the circuit.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
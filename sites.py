@@ -0,0 +1,180 @@
+"""
+Several trial sites, each with its own API deployment, merged into one cohort.
+
+Sites come from BOOGGII_SITES ("name=https://...,name2=https://...") or a SITES dict in
+private_config; by default there is one site, private_config.BASE_URL. All sites are
+fetched concurrently, so a full download takes as long as the slowest site. A failing
+site is reported and left out, and the other sites' data is still shown. Records get a
+'site' field so answers and writes go back to the backend they came from.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import private_config
+from api import (
+    fetch_events_data as fetch_site_events,
+    fetch_participants as fetch_site_participants,
+    fetch_questionnaire_data as fetch_site_questionnaire,
+    fetch_questions_by_patient as fetch_site_questions_by_patient,
+    send_write,
+)
+
+DEFAULT_SITE = 'default'
+
+
+def load_sites():
+    """{site name: base URL}, in the configured order."""
+    value = os.environ.get('BOOGGII_SITES')
+    if value:
+        sites = {}
+        for entry in value.split(','):
+            name, _, url = entry.strip().partition('=')
+            if name and url:
+                sites[name] = url.rstrip('/')
+        if sites:
+            return sites
+    sites = getattr(private_config, 'SITES', None)
+    if sites:
+        return dict(sites)
+    return {DEFAULT_SITE: private_config.BASE_URL}
+
+
+SITES = load_sites()
+
+# patientId -> site, filled whenever participants are fetched
+_patient_sites = {}
+_patient_sites_lock = threading.Lock()
+
+
+def site_of(patient_id):
+    with _patient_sites_lock:
+        return _patient_sites.get(patient_id, next(iter(SITES)))
+
+
+def base_url_of(site):
+    return SITES.get(site, next(iter(SITES.values())))
+
+
+def fetch_from_sites(fetch, sites=None):
+    """
+    Runs fetch(base_url) for every site concurrently. Returns {site: result};
+    a site whose fetch raises gets None, like an unavailable backend.
+    """
+    sites = SITES if sites is None else sites
+
+    def run(url):
+        try:
+            return fetch(url)
+        except Exception:
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, len(sites))) as executor:
+        futures = {site: executor.submit(run, url) for site, url in sites.items()}
+        return {site: future.result() for site, future in futures.items()}
+
+
+def _tag_records(records, site):
+    return [dict(record, site=site) for record in records]
+
+
+def fetch_cohort(sites=None):
+    """
+    Participants, events and questionnaires of all sites, fetched at once.
+    Returns a dict with the merged 'participants' and 'events' lists (None if no site
+    answered), 'questionnaire_by_site' and the names of 'failed_sites'.
+    """
+    sites = SITES if sites is None else sites
+    fetchers = {'participants': fetch_site_participants,
+                'events': fetch_site_events,
+                'questionnaire': fetch_site_questionnaire}
+    with ThreadPoolExecutor(max_workers=max(1, len(sites) * len(fetchers))) as executor:
+        futures = {
+            (site, kind): executor.submit(fetch, url)
+            for site, url in sites.items()
+            for kind, fetch in fetchers.items()
+        }
+        results = {}
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception:
+                results[key] = None
+
+    participants, events, questionnaire_by_site, failed_sites = [], [], {}, []
+    for site in sites:
+        site_participants = results[(site, 'participants')]
+        site_events = results[(site, 'events')]
+        if site_participants is None or site_events is None:
+            failed_sites.append(site)
+            continue
+        participants.extend(_tag_records(site_participants, site))
+        events.extend(_tag_records(site_events, site))
+        if results[(site, 'questionnaire')]:
+            questionnaire_by_site[site] = results[(site, 'questionnaire')]
+
+    with _patient_sites_lock:
+        _patient_sites.update((record.get('patientId'), record['site']) for record in participants)
+    answered = len(failed_sites) < len(sites)
+    return {
+        'participants': participants if answered else None,
+        'events': events if answered else None,
+        'questionnaire_by_site': questionnaire_by_site,
+        'failed_sites': failed_sites,
+    }
+
+
+def fetch_questions_by_patient(patient_ids):
+    """Answers of participants from any site, each from its own backend; sites in parallel."""
+    by_site = {}
+    for patient_id in patient_ids:
+        by_site.setdefault(site_of(patient_id), []).append(patient_id)
+    if not by_site:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=len(by_site)) as executor:
+        futures = {
+            site: executor.submit(fetch_site_questions_by_patient, site_ids, base_url_of(site))
+            for site, site_ids in by_site.items()
+        }
+        questions_by_patient = {}
+        for site, future in futures.items():
+            try:
+                questions_by_patient.update(future.result())
+            except Exception:
+                # Unknown answers for every participant of a site that failed as a whole
+                questions_by_patient.update(dict.fromkeys(by_site[site]))
+    return questions_by_patient
+
+
+def send_site_write(kind, payload, idempotency_key):
+    """Outbox flusher callback: sends a write to the backend of the site in its payload."""
+    payload = dict(payload)
+    site = payload.pop('site', None) or site_of(payload.get('patientId'))
+    return send_write(kind, payload, idempotency_key, base_url_of(site))
+
+
+def fetch_participants():
+    """Participants of all sites as one list (None if no site answered)."""
+    per_site = fetch_from_sites(fetch_site_participants)
+    participants = []
+    for site, records in per_site.items():
+        participants.extend(_tag_records(records or [], site))
+    with _patient_sites_lock:
+        _patient_sites.update((record.get('patientId'), record['site']) for record in participants)
+    if all(records is None for records in per_site.values()):
+        return None
+    return participants
+
+
+def fetch_events_data():
+    """Events of all sites as one list (None if no site answered)."""
+    per_site = fetch_from_sites(fetch_site_events)
+    if all(records is None for records in per_site.values()):
+        return None
+    return [event for site, records in per_site.items() for event in _tag_records(records or [], site)]
+
+
+def fetch_questionnaire_by_site():
+    """{site: questionnaire definition} of the sites that answered."""
+    return {site: data for site, data in fetch_from_sites(fetch_site_questionnaire).items() if data}
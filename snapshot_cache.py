@@ -0,0 +1,95 @@
+import json
+import os
+import datetime
+
+import pandas as pd
+
+# Bump when the layout of the stored frames changes; older snapshots are then ignored
+SNAPSHOT_VERSION = 1
+SNAPSHOT_DIR = os.environ.get("BOOGGII_SNAPSHOT_DIR", ".snapshot_cache")
+MANIFEST_FILE = "manifest.json"
+
+
+def _manifest_path(snapshot_dir):
+    return os.path.join(snapshot_dir, MANIFEST_FILE)
+
+
+def _read_manifest(snapshot_dir):
+    try:
+        with open(_manifest_path(snapshot_dir)) as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != SNAPSHOT_VERSION:
+        return None
+    return manifest
+
+
+def arrow_safe(df):
+    """
+    Feather needs a default index, string column names and one Arrow type per column.
+    Object columns Arrow cannot type (e.g. True/False/None mixed with numbers) are stored as strings.
+    """
+    import pyarrow as pa
+
+    df = df.reset_index(drop=True)
+    df.columns = [str(col) for col in df.columns]
+    for col in df.columns:
+        if df[col].dtype == object:
+            try:
+                pa.array(df[col], from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+                df[col] = df[col].map(lambda x: None if x is None else str(x))
+    return df
+
+
+def save_snapshot(frames, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Persists the given {name: DataFrame or list of records} to Feather files and stamps
+    them in the manifest. Frames not passed keep their previous snapshot.
+    Failures are swallowed: the snapshot is only a startup accelerator.
+    """
+    try:
+        os.makedirs(snapshot_dir, exist_ok=True)
+        manifest = _read_manifest(snapshot_dir) or {'version': SNAPSHOT_VERSION, 'frames': {}}
+        saved_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+        for name, frame in frames.items():
+            if frame is None:
+                continue
+            df = arrow_safe(pd.DataFrame(frame))
+            # Write to a temp file first so a crash never leaves a half-written snapshot
+            path = os.path.join(snapshot_dir, f"{name}.feather")
+            df.to_feather(path + ".tmp")
+            os.replace(path + ".tmp", path)
+            manifest['frames'][name] = {'saved_at': saved_at, 'rows': len(df)}
+
+        with open(_manifest_path(snapshot_dir) + ".tmp", "w") as file:
+            json.dump(manifest, file)
+        os.replace(_manifest_path(snapshot_dir) + ".tmp", _manifest_path(snapshot_dir))
+        return True
+    except Exception:
+        return False
+
+
+def load_snapshot(names, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Loads the requested frames of the last snapshot.
+    Returns ({name: DataFrame}, saved_at of the oldest frame) or (None, None) if
+    any frame is missing or the snapshot was written by another SNAPSHOT_VERSION.
+    """
+    manifest = _read_manifest(snapshot_dir)
+    if manifest is None:
+        return None, None
+
+    frames = {}
+    saved_at = []
+    try:
+        for name in names:
+            if name not in manifest['frames']:
+                return None, None
+            frames[name] = pd.read_feather(os.path.join(snapshot_dir, f"{name}.feather"))
+            saved_at.append(pd.Timestamp(manifest['frames'][name]['saved_at']))
+    except Exception:
+        return None, None
+    return frames, min(saved_at)
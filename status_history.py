@@ -0,0 +1,228 @@
+"""
+Point-in-time ("as of T") reconstruction of the Participants Status table.
+
+StatusHistory sorts every participant's events and answers by time once; the status at
+any past T is then computed with binary searches (np.searchsorted) over those arrays,
+so a week of hourly snapshots costs about as much as one live status computation.
+Metrics follow data_processing.compute_participants_status with `now` = T.
+"""
+import numpy as np
+import pandas as pd
+
+from data_processing import expand_question_schedule, force_uniform_datetime, format_time_since_update
+from time_utils import israel_tz, ANSWER_NAIVE_TZ, to_utc_ns
+
+HOUR_NS = 3600 * 10**9
+DAY_NS = 24 * HOUR_NS
+
+
+def _grouped(codes, ts_ns, num_groups):
+    """
+    Sorts rows by (group, time). Returns the sort order and each group's [start, end) offsets,
+    so group g's sorted times are ts_ns[order][offsets[g]:offsets[g + 1]].
+    """
+    order = np.lexsort((ts_ns, codes))
+    offsets = np.searchsorted(codes[order], np.arange(num_groups + 1), side='left')
+    return order, offsets
+
+
+class StatusHistory:
+    """
+    Time-indexed events and answers of a set of participants.
+    `participant_data` is the table from participants.parse_participants, `event_data` the
+    events list and `answers_df` all answers with a patientId column (see fetch_answers_data).
+    Participants in `unavailable` have unknown answers: their answer columns are NaN, as
+    in the live status, rather than 100% unanswered.
+    """
+
+    def __init__(self, participant_data, event_data, answers_df, timetable_df, unavailable=()):
+        self.participants = participant_data.reset_index(drop=True)
+        self.timetable_df = timetable_df
+        self._answers_unknown = self.participants['patientId'].isin(set(unavailable)).to_numpy()
+        patient_ids = self.participants['patientId']
+        num_groups = len(patient_ids)
+
+        # Events: sorted times per participant
+        events = pd.DataFrame(event_data)
+        if events.empty:
+            events = pd.DataFrame({'patientId': [], 'timestamp': []})
+        events = force_uniform_datetime(events[['patientId', 'timestamp']].copy(), tz=israel_tz)
+        codes = pd.Categorical(events['patientId'], categories=patient_ids).codes.astype(np.int64)
+        ts_ns = pd.DatetimeIndex(events['timestamp']).as_unit('ns').asi8
+        known = (codes >= 0) & ~events['timestamp'].isna().to_numpy()
+        codes, ts_ns = codes[known], ts_ns[known]
+        order, self._event_offsets = _grouped(codes, ts_ns, num_groups)
+        self._event_ns = ts_ns[order]
+
+        # Answers: sorted times, question numbers (as in the timetable) and validity per participant
+        if answers_df is None or answers_df.empty:
+            answers_df = pd.DataFrame({'patientId': [], 'questionNum': [], 'answer': [], 'timestamp': []})
+        codes = pd.Categorical(answers_df['patientId'], categories=patient_ids).codes.astype(np.int64)
+        ts_ns = to_utc_ns(answers_df['timestamp'], ANSWER_NAIVE_TZ)
+        known = (codes >= 0) & (ts_ns != np.iinfo(np.int64).min)
+        order, self._answer_offsets = _grouped(codes[known], ts_ns[known], num_groups)
+        self._answer_ns = ts_ns[known][order]
+        question_nums = answers_df['questionNum'].astype(str).to_numpy()[known][order]
+        valid = pd.to_numeric(answers_df['answer'], errors='coerce').between(0, 4).to_numpy()[known][order]
+        # Valid answers before each position, for O(1) range counts
+        self._valid_cumsum = np.concatenate([[0], np.cumsum(valid)])
+        self._has_answers = np.diff(self._answer_offsets) > 0
+
+        # Question numbers -> column of a (answer or slot) x question matrix
+        schedule_questions = set()
+        for cell in timetable_df.to_numpy().ravel() if timetable_df is not None else []:
+            if cell:
+                schedule_questions.update(q.strip() for q in cell.split(','))
+        self._questions = sorted(schedule_questions)
+        question_index = {q: i for i, q in enumerate(self._questions)}
+        answer_question = np.array([question_index.get(q, -1) for q in question_nums], dtype=np.int64)
+        # Answers of each question before each position (one-hot cumulative sum)
+        one_hot = np.zeros((len(answer_question), len(self._questions)), dtype=np.int32)
+        scheduled = answer_question >= 0
+        one_hot[np.flatnonzero(scheduled), answer_question[scheduled]] = 1
+        self._answer_question_cumsum = np.vstack([np.zeros((1, len(self._questions)), dtype=np.int32),
+                                                  np.cumsum(one_hot, axis=0)])
+
+        self._trial_start_ns = to_utc_ns(self.participants['trial_starting_date'])
+        self._empatica_ns = to_utc_ns(self.participants['empatica_last_update'])
+        self._slots_range = None
+
+    # ----------------------------
+    # SCHEDULE
+    # ----------------------------
+    def _ensure_slots(self, first_ns, last_ns):
+        """Expands the timetable once over a range covering [first_ns, last_ns]."""
+        if self._slots_range is not None and self._slots_range[0] <= first_ns and last_ns <= self._slots_range[1]:
+            return
+        start = pd.Timestamp(first_ns, tz='UTC').tz_convert(israel_tz).normalize() - pd.Timedelta(days=1)
+        end = pd.Timestamp(last_ns, tz='UTC').tz_convert(israel_tz).normalize() + pd.Timedelta(days=2)
+        slots = expand_question_schedule(self.timetable_df, start, end)
+        self._slot_ns = pd.DatetimeIndex(slots['slot_time']).as_unit('ns').asi8
+        self._slot_cumsum = np.concatenate([[0], np.cumsum(slots['num_questions'].to_numpy())])
+
+        # Which questions each slot displays, cumulated like the answers
+        question_index = {q: i for i, q in enumerate(self._questions)}
+        slot_questions = np.zeros((len(self._slot_ns), len(self._questions)), dtype=np.int32)
+        days = pd.DatetimeIndex(slots['slot_time']).day_name()
+        hours = pd.DatetimeIndex(slots['slot_time']).strftime('%H:%M')
+        for row, (day, hour) in enumerate(zip(days, hours)):
+            cell = self.timetable_df.at[hour, day] if hour in self.timetable_df.index else ''
+            for q in (cell.split(',') if cell else []):
+                slot_questions[row, question_index[q.strip()]] = 1
+        self._slot_question_cumsum = np.vstack([np.zeros((1, len(self._questions)), dtype=np.int32),
+                                                np.cumsum(slot_questions, axis=0)])
+
+        self._slots_range = (_ns(start), _ns(end))
+
+    def _displayed(self, start_ns, end_ns):
+        """Questions scheduled in [start, end] (calculate_displayed_questions)."""
+        lo = np.searchsorted(self._slot_ns, start_ns, side='left')
+        hi = np.searchsorted(self._slot_ns, end_ns, side='right')
+        return np.where(hi > lo, self._slot_cumsum[hi] - self._slot_cumsum[lo], 0)
+
+    # ----------------------------
+    # STATUS AS OF T
+    # ----------------------------
+    def _answer_status(self, group, as_of_ns, trial_start_ns):
+        """
+        Answer columns of one participant at each T (compute_answer_status).
+        `trial_start_ns` is already defaulted to T - 30 days where missing.
+        """
+        lo, hi = self._answer_offsets[group], self._answer_offsets[group + 1]
+        answer_ns = self._answer_ns[lo:hi]
+        trial_end_ns = np.minimum(trial_start_ns + 30 * DAY_NS, as_of_ns)
+
+        displayed_total = self._displayed(trial_start_ns, np.where(trial_end_ns < trial_start_ns,
+                                                                   trial_start_ns + 36 * HOUR_NS, trial_end_ns))
+        first = lo + np.searchsorted(answer_ns, trial_start_ns, side='left')
+        last = lo + np.searchsorted(answer_ns, trial_end_ns, side='right')
+        valid_total = np.where(last > first, self._valid_cumsum[last] - self._valid_cumsum[first], 0)
+
+        # Unanswered share of the distinct questions shown in the last min(36h, time since trial start)
+        window_ns = np.minimum(36 * HOUR_NS, as_of_ns - trial_start_ns)
+        window_start_ns = as_of_ns - window_ns
+        slot_lo = np.searchsorted(self._slot_ns, window_start_ns, side='left')
+        slot_hi = np.searchsorted(self._slot_ns, as_of_ns, side='left')
+        answer_lo = lo + np.searchsorted(answer_ns, window_start_ns, side='left')
+        answer_hi = lo + np.searchsorted(answer_ns, as_of_ns, side='left')
+        slot_hi = np.maximum(slot_hi, slot_lo)
+        answer_hi = np.maximum(answer_hi, answer_lo)
+        # (T x question) masks of the questions shown / answered in each window
+        shown = (self._slot_question_cumsum[slot_hi] - self._slot_question_cumsum[slot_lo]) > 0
+        answered = (self._answer_question_cumsum[answer_hi] - self._answer_question_cumsum[answer_lo]) > 0
+        num_shown = shown.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            perc_36 = np.where(num_shown > 0, 100.0 * (shown & ~answered).sum(axis=1) / num_shown, 0.0)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            perc_total = np.where(displayed_total > 0,
+                                  np.round(100.0 * (1 - valid_total / displayed_total)), 100.0)
+        return perc_36, perc_total, valid_total, displayed_total
+
+    def status_at(self, as_of_times):
+        """
+        Status rows of every participant at each time in `as_of_times`, as one long frame
+        with an 'as_of' column (Asia/Jerusalem) and the compute_participants_status columns.
+        Wearing status and is_active are only known as of now and are repeated as-is;
+        time since the Empatica update is N/A for times before the last known update.
+        """
+        as_of = pd.DatetimeIndex(pd.to_datetime(as_of_times))
+        if as_of.tz is None:
+            as_of = as_of.tz_localize(israel_tz)
+        as_of_ns = as_of.as_unit('ns').asi8
+        num_times = len(as_of_ns)
+        missing = np.iinfo(np.int64).min
+
+        trial_start_ns = np.where(self._trial_start_ns[:, None] == missing,
+                                  as_of_ns[None, :] - 30 * DAY_NS, self._trial_start_ns[:, None])
+        if len(self.participants) and num_times:
+            # Trials starting after T count the first 36 hours of their schedule
+            self._ensure_slots(min(trial_start_ns.min(), as_of_ns.min() - 36 * HOUR_NS),
+                               max(trial_start_ns.max() + 36 * HOUR_NS, as_of_ns.max()))
+
+        frames = []
+        for group, row in self.participants.iterrows():
+            lo, hi = self._event_offsets[group], self._event_offsets[group + 1]
+            event_ns = self._event_ns[lo:hi]
+            events_total = np.searchsorted(event_ns, as_of_ns, side='right')
+            events_7d = events_total - np.searchsorted(event_ns, as_of_ns - 7 * DAY_NS, side='left')
+
+            if self._answers_unknown[group]:
+                perc_36 = perc_total = valid_total = displayed_total = np.full(num_times, np.nan)
+            elif self._has_answers[group]:
+                perc_36, perc_total, valid_total, displayed_total = self._answer_status(
+                    group, as_of_ns, trial_start_ns[group])
+            else:
+                perc_36 = perc_total = np.full(num_times, 100.0)
+                valid_total = displayed_total = np.zeros(num_times, dtype=np.int64)
+
+            empatica_ns = self._empatica_ns[group]
+            hours_since_update = np.where(
+                (empatica_ns != missing) & (empatica_ns <= as_of_ns),
+                (as_of_ns - empatica_ns) / HOUR_NS, np.nan)
+
+            frames.append(pd.DataFrame({
+                'as_of': as_of.tz_convert(israel_tz),
+                'patientId': row['patientId'],
+                'nickName': row['nickName'],
+                'is_active': row['is_active'],
+                'Time Since Empatica Update': [format_time_since_update(h) for h in hours_since_update],
+                'Empatica Wearing Status': row['empatica_wearing_status'],
+                'NaN ans last 36 hours (%)': perc_36,
+                'NaN ans total (%)': perc_total,
+                'Events last 7 days': events_7d,
+                'Events total': events_total,
+                'Valid Answers Since Trial': valid_total,
+                'Displayed Questions Since Trial': displayed_total,
+            }))
+        if not frames:
+            return pd.DataFrame(columns=['as_of', 'patientId'])
+        return pd.concat(frames, ignore_index=True)
+
+    def status_as_of(self, as_of):
+        """The status table at one time, indexed by patientId like compute_participants_status."""
+        return self.status_at([as_of]).drop(columns='as_of').set_index('patientId', drop=False)
+
+
+def _ns(timestamp):
+    return pd.Timestamp(timestamp).as_unit('ns').value
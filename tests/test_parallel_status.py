@@ -0,0 +1,70 @@
+"""Process-pool status against the serial compute_participants_status on a small synthetic cohort."""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pytest
+
+from data_processing import compute_participants_status, transform_questionnaire_data
+from event_ingest import ingest_events
+from parallel_status import compute_participants_status_parallel
+from participants import parse_participants
+from time_utils import israel_tz
+
+NOW = pd.Timestamp('2026-03-04 20:00', tz=israel_tz)
+QUESTIONNAIRE = [
+    {'num': num, 'type': 'scale', 'question': f'question {num}', 'days': list(range(1, 8)), 'hours': [10, 14, 18]}
+    for num in (1, 2)
+]
+PATIENT_IDS = [f'p{number}' for number in range(8)] + ['unavailable', 'no_answers']
+
+
+def participant(patient_id, number):
+    return {
+        'patientId': patient_id, 'nickName': patient_id, 'phone': '+972500000000',
+        'firebaseId': f'token-{patient_id}', 'isActive': number % 5 != 4,
+        'trialStartingDate': f'2026-03-0{1 + number % 3} 00:00:00', 'site': 'default',
+    }
+
+
+def answers(number):
+    """Answers of the 10:00 and 14:00 slots of some days, fewer for higher numbers."""
+    return [
+        {'questionNum': question, 'answer': str((number + day) % 5),
+         'timestamp': f'2026-03-0{day} {hour}:{10 + number}:00'}
+        for day in (1, 2, 3, 4) for hour in (10, 14) for question in (1, 2)
+        if (day + hour + number) % (2 + number % 3)
+    ]
+
+
+def events(patient_id, number):
+    return [
+        {'patientId': patient_id, 'eventType': 'panic', 'severity': number % 5,
+         'timestamp': f'2026-03-0{1 + count % 4} {8 + count}:{number:02d}:00'}
+        for count in range(number % 4)
+    ]
+
+
+@pytest.fixture(scope='module')
+def cohort():
+    participant_data = parse_participants([participant(p, n) for n, p in enumerate(PATIENT_IDS)])
+    event_data, _ = ingest_events([event for n, p in enumerate(PATIENT_IDS) for event in events(p, n)],
+                                  participant_data)
+    questions_by_patient = {p: answers(n) for n, p in enumerate(PATIENT_IDS)}
+    questions_by_patient['unavailable'] = None
+    questions_by_patient['no_answers'] = []
+    _, timetable_df = transform_questionnaire_data(QUESTIONNAIRE)
+    return participant_data, event_data, questions_by_patient, timetable_df
+
+
+def test_parallel_status_matches_serial(cohort):
+    serial = compute_participants_status(*cohort, NOW)
+    # 'spawn' as in get_executor: the workers only see what goes through the shared memory
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('spawn')) as executor:
+        parallel = compute_participants_status_parallel(*cohort, NOW, executor=executor, workers=2)
+
+    pd.testing.assert_frame_equal(parallel, serial)
+    # Unknown answers stay unknown; no answers at all is 100% missed
+    answer_columns = ['NaN ans last 36 hours (%)', 'NaN ans total (%)']
+    assert parallel.loc['unavailable', answer_columns].isna().all()
+    assert parallel.loc['no_answers', answer_columns].notna().all()
@@ -0,0 +1,204 @@
+"""ReminderScheduler with a fake clock, fake senders and stub fetchers (no backend, FCM or SMS)."""
+import pandas as pd
+import pytest
+
+from reminders import RETRY_DELAY, ReminderScheduler
+from time_utils import israel_tz
+
+SITE = 'default'
+# A Monday; the questionnaire has slots at 10:00, 14:00 and 18:00 every day
+START = pd.Timestamp('2026-03-02 09:00', tz=israel_tz)
+QUESTIONNAIRE = [
+    {'num': num, 'type': 'scale', 'question': f'question {num}', 'days': list(range(1, 8)), 'hours': [10, 14, 18]}
+    for num in (1, 2)
+]
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeSender:
+    """Records every batch; the patientIds in `failing` are not delivered."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.batches = []
+
+    def send(self, messages):
+        self.batches.append([message.patient_id for message in messages])
+        return {message.patient_id for message in messages} & self.failing
+
+    @property
+    def sent_to(self):
+        return [patient_id for batch in self.batches for patient_id in batch]
+
+
+def participant(patient_id):
+    return {
+        'patientId': patient_id, 'nickName': patient_id, 'phone': '+972500000000',
+        'firebaseId': f'token-{patient_id}', 'isActive': True,
+        'trialStartingDate': '2026-02-25 00:00:00', 'site': SITE,
+    }
+
+
+PARTICIPANTS = [participant('answered'), participant('silent'), participant('unknown')]
+
+
+def answers(patient_ids):
+    """'answered' answered the 10:00 slot, 'silent' nothing, 'unknown' is unavailable."""
+    by_patient = {
+        'answered': [{'questionNum': 1, 'answer': '3', 'timestamp': '2026-03-02 10:20:00'}],
+        'silent': [],
+        'unknown': None,
+    }
+    return {patient_id: by_patient[patient_id] for patient_id in patient_ids}
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(START)
+
+
+def make_scheduler(clock, senders, fetch_participants=lambda: PARTICIPANTS, fetch_answers=answers,
+                   fetch_questionnaires=lambda: {SITE: QUESTIONNAIRE}):
+    scheduler = ReminderScheduler(senders, delay_minutes=60, fetch_participants=fetch_participants,
+                                  fetch_questionnaires=fetch_questionnaires,
+                                  fetch_answers=fetch_answers, clock=clock)
+    scheduler.schedule()
+    return scheduler
+
+
+def at(clock, time):
+    clock.now = pd.Timestamp(f'2026-03-02 {time}', tz=israel_tz)
+    return clock.now
+
+
+def test_timer_fires_delay_after_the_slot(clock):
+    sender = FakeSender()
+    scheduler = make_scheduler(clock, [sender])
+    assert scheduler.next_due() == pd.Timestamp('2026-03-02 11:00', tz=israel_tz)
+
+    at(clock, '10:59')
+    assert scheduler.run_due() == []
+    at(clock, '11:00')
+    reminders = scheduler.run_due()
+    # Not the one who answered, nor the one whose answers are unknown
+    assert [patient_id for patient_id, _ in reminders] == ['silent']
+    assert sender.batches == [['silent']]
+    # The slot is retried for 'unknown'
+    assert scheduler.next_due() == clock.now + RETRY_DELAY
+
+
+def test_reminded_once_per_slot_and_once_per_batch(clock):
+    sender = FakeSender()
+    scheduler = make_scheduler(clock, [sender])
+
+    # The 11:00 and 15:00 timers fire together ('answered' missed the 14:00 slot only):
+    # one message per participant
+    at(clock, '15:30')
+    reminders = scheduler.run_due()
+    assert sorted(patient_id for patient_id, _ in reminders) == ['answered', 'silent', 'silent']
+    assert [sorted(batch) for batch in sender.batches] == [['answered', 'silent']]
+
+    # Re-reading the timetables doesn't schedule those slots again
+    scheduler.schedule()
+    at(clock, '16:00')
+    assert scheduler.run_due() == []
+    assert len(sender.batches) == 1
+
+
+def test_undelivered_messages_fall_back_then_retry(clock):
+    fcm = FakeSender(failing={'silent'})
+    sms = FakeSender(failing={'silent'})
+    scheduler = make_scheduler(clock, [fcm, sms])
+
+    at(clock, '11:00')
+    scheduler.run_due()
+    assert fcm.sent_to == ['silent'] and sms.sent_to == ['silent']
+    assert scheduler.next_due() == clock.now + RETRY_DELAY
+
+    # Reachable again by SMS: sent on the retry, and not again after that
+    sms.failing.clear()
+    at(clock, '11:10')
+    assert [patient_id for patient_id, _ in scheduler.run_due()] == ['silent']
+    assert sms.sent_to == ['silent', 'silent']
+    at(clock, '11:20')
+    assert scheduler.run_due() == []
+    assert sms.sent_to == ['silent', 'silent']
+
+
+@pytest.mark.parametrize('failure', ['raises', 'unavailable'])
+def test_fetch_failure_keeps_the_slot(clock, failure):
+    sender = FakeSender()
+    calls = []
+
+    def fetch_participants():
+        calls.append(clock.now)
+        if len(calls) == 1:
+            if failure == 'raises':
+                raise ConnectionError("backend down")
+            return None
+        return PARTICIPANTS
+
+    scheduler = make_scheduler(clock, [sender], fetch_participants)
+    at(clock, '11:00')
+    with pytest.raises(Exception):
+        scheduler.run_due()
+    assert sender.batches == []
+    assert scheduler.next_due() == clock.now + RETRY_DELAY
+
+    at(clock, '11:10')
+    assert [patient_id for patient_id, _ in scheduler.run_due()] == ['silent']
+    assert sender.batches == [['silent']]
+
+
+def test_unknown_answers_retry_the_slot(clock):
+    sender = FakeSender()
+    available = []
+
+    def fetch_answers(patient_ids):
+        by_patient = answers(patient_ids)
+        if available and 'unknown' in by_patient:
+            by_patient['unknown'] = []
+        return by_patient
+
+    scheduler = make_scheduler(clock, [sender], fetch_answers=fetch_answers)
+    at(clock, '11:00')
+    assert [patient_id for patient_id, _ in scheduler.run_due()] == ['silent']
+
+    # Answers available again: reminded on the retry, 'silent' not a second time
+    available.append(True)
+    at(clock, '11:10')
+    assert [patient_id for patient_id, _ in scheduler.run_due()] == ['unknown']
+    assert sender.batches == [['silent'], ['unknown']]
+    assert scheduler.next_due() == pd.Timestamp('2026-03-02 15:00', tz=israel_tz)
+
+
+def test_site_missing_from_the_fetch_retries_its_slots(clock):
+    sender = FakeSender()
+    other = dict(participant('far'), site='north')
+    calls = []
+
+    def fetch_participants():
+        calls.append(clock.now)
+        # The north site doesn't answer the first fetch
+        return PARTICIPANTS[:2] + ([other] if len(calls) > 1 else [])
+
+    def fetch_answers(patient_ids):
+        return answers([p for p in patient_ids if p != 'far']) | ({'far': []} if 'far' in patient_ids else {})
+
+    scheduler = make_scheduler(clock, [sender], fetch_participants, fetch_answers,
+                               fetch_questionnaires=lambda: {SITE: QUESTIONNAIRE, 'north': QUESTIONNAIRE})
+    at(clock, '11:00')
+    assert [patient_id for patient_id, _ in scheduler.run_due()] == ['silent']
+    assert scheduler.next_due() == clock.now + RETRY_DELAY
+
+    at(clock, '11:10')
+    assert [patient_id for patient_id, _ in scheduler.run_due()] == ['far']
+    assert sender.batches == [['silent'], ['far']]
+    assert scheduler.next_due() == pd.Timestamp('2026-03-02 15:00', tz=israel_tz)
@@ -0,0 +1,59 @@
+"""StatusHistory as of now against the live compute_participants_status."""
+import pandas as pd
+
+from data_processing import STATUS_COLUMNS, compute_participants_status, transform_questionnaire_data
+from event_ingest import ingest_events
+from participants import parse_participants
+from status_history import StatusHistory
+from time_utils import israel_tz
+
+NOW = pd.Timestamp('2026-03-04 20:00', tz=israel_tz)
+QUESTIONNAIRE = [
+    {'num': num, 'type': 'scale', 'question': f'question {num}', 'days': list(range(1, 8)), 'hours': [10, 14, 18]}
+    for num in (1, 2)
+]
+PATIENT_IDS = ['early', 'late', 'inactive', 'unavailable', 'no_answers']
+COMPARED_COLUMNS = STATUS_COLUMNS + ['is_active', 'Valid Answers Since Trial', 'Displayed Questions Since Trial']
+
+
+def participant(patient_id, trial_start):
+    return {
+        'patientId': patient_id, 'nickName': patient_id, 'phone': '+972500000000',
+        'firebaseId': f'token-{patient_id}', 'isActive': patient_id != 'inactive',
+        'trialStartingDate': f'{trial_start} 00:00:00', 'site': 'default',
+    }
+
+
+def answer(question, answer, timestamp):
+    return {'questionNum': question, 'answer': answer, 'timestamp': timestamp}
+
+
+def test_status_as_of_now_matches_live_status():
+    participant_data = parse_participants([
+        participant(patient_id, '2026-03-01' if n % 2 == 0 else '2026-03-03') for n, patient_id in enumerate(PATIENT_IDS)
+    ])
+    events, _ = ingest_events([
+        {'patientId': patient_id, 'eventType': 'panic', 'severity': 2, 'timestamp': timestamp}
+        for patient_id, timestamp in [('early', '2026-02-20 12:00:00'), ('early', '2026-03-02 09:30:00'),
+                                      ('late', '2026-03-04 19:00:00'), ('unavailable', '2026-03-03 08:00:00')]
+    ], participant_data)
+    questions_by_patient = {
+        'early': [answer(1, '3', '2026-03-01 10:05:00'), answer(2, '4', '2026-03-01 10:06:00'),
+                  answer(1, '9', '2026-03-03 14:10:00'), answer(2, '1', '2026-03-04 18:20:00')],
+        'late': [answer(1, '0', '2026-03-03 10:30:00'), answer(2, '2', '2026-03-04 14:01:00')],
+        'inactive': [answer(1, '2', '2026-03-02 18:15:00')],
+        'unavailable': None,
+        'no_answers': [],
+    }
+    _, timetable_df = transform_questionnaire_data(QUESTIONNAIRE)
+
+    live = compute_participants_status(participant_data, events, questions_by_patient, timetable_df, NOW)
+    answers_df = pd.concat([pd.DataFrame(answers).assign(patientId=patient_id)
+                            for patient_id, answers in questions_by_patient.items() if answers],
+                           ignore_index=True)
+    history = StatusHistory(participant_data, events, answers_df, timetable_df, unavailable=['unavailable'])
+    as_of = history.status_as_of(NOW)
+
+    pd.testing.assert_frame_equal(as_of.loc[live.index, COMPARED_COLUMNS], live[COMPARED_COLUMNS],
+                                  check_dtype=False, check_index_type=False)
+    assert as_of.loc['unavailable', ['NaN ans last 36 hours (%)', 'NaN ans total (%)']].isna().all()
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytz
+
+# ----------------------------
+# TIMEZONES
+# ----------------------------
+israel_tz = pytz.timezone('Asia/Jerusalem')
+utc_tz = pytz.utc
+
+# How naive (offset-less) timestamps coming from each source are interpreted
+EVENT_NAIVE_TZ = israel_tz
+ANSWER_NAIVE_TZ = israel_tz
+EMPATICA_NAIVE_TZ = utc_tz
+TRIAL_START_NAIVE_TZ = israel_tz
+
+# DST edges in Asia/Jerusalem: a wall-clock time that happens twice (autumn) is taken as
+# the first, daylight-saving occurrence; one that never happens (spring) is moved forward
+AMBIGUOUS_AS_DST = True
+NONEXISTENT = 'shift_forward'
+
+# Trailing 'Z' or +HH:MM / -HHMM offset
+_OFFSET_PATTERN = r'(?:Z|[+-]\d{2}:?\d{2})$'
+
+
+def localize_naive(values, tz):
+    """
+    Localizes a naive datetime Series/DatetimeIndex to `tz` with the module's DST policies.
+    """
+    ambiguous = np.full(len(values), AMBIGUOUS_AS_DST)
+    if isinstance(values, pd.Series):
+        return values.dt.tz_localize(tz, ambiguous=ambiguous, nonexistent=NONEXISTENT)
+    return values.tz_localize(tz, ambiguous=ambiguous, nonexistent=NONEXISTENT)
+
+
+def to_utc(values, naive_tz=israel_tz):
+    """
+    Parses a column of timestamps (strings with or without offset, datetimes, None)
+    into a tz-aware UTC Series in one vectorized pass.
+    Naive values are taken as wall-clock time in `naive_tz`; unparsable values become NaT.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+
+    if pd.api.types.is_datetime64_any_dtype(series):
+        if series.dt.tz is None:
+            series = localize_naive(series, naive_tz)
+        return series.dt.tz_convert(utc_tz)
+
+    text = series.astype('string').str.strip()
+    has_offset = text.str.contains(_OFFSET_PATTERN, na=False).to_numpy(dtype=bool)
+    is_naive = ~has_offset & text.notna().to_numpy(dtype=bool)
+
+    result = pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns, UTC]')
+    if has_offset.any():
+        parsed = pd.to_datetime(text[has_offset], format='ISO8601', errors='coerce', utc=True)
+        result[has_offset] = parsed.dt.as_unit('ns')
+    if is_naive.any():
+        parsed = pd.to_datetime(text[is_naive], format='ISO8601', errors='coerce')
+        result[is_naive] = localize_naive(parsed, naive_tz).dt.tz_convert(utc_tz).dt.as_unit('ns')
+    return result
+
+
+def to_local(values, naive_tz=israel_tz, tz=israel_tz):
+    """Same as to_utc, converted to `tz` (Asia/Jerusalem by default) for display."""
+    return to_utc(values, naive_tz).dt.tz_convert(tz)
+
+
+def to_utc_ns(values, naive_tz=israel_tz):
+    """
+    int64 nanoseconds since the epoch (UTC), the representation used for comparisons and
+    bucketing. NaT becomes the minimum int64.
+    """
+    return pd.DatetimeIndex(to_utc(values, naive_tz)).as_unit('ns').asi8
+
+
+def from_utc_ns(ns_values, tz=israel_tz):
+    """Inverse of to_utc_ns: tz-aware DatetimeIndex in `tz`."""
+    ns_values = np.asarray(ns_values, dtype=np.int64)
+    return pd.DatetimeIndex(ns_values.view('datetime64[ns]')).tz_localize(utc_tz).tz_convert(tz)
+
+
+def to_timestamp(value, naive_tz=israel_tz):
+    """
+    Single-value version of to_utc, returned in `naive_tz`'s zone (NaT if unparsable).
+    Used for scalars such as a participant's trial start.
+    """
+    if value is None or (isinstance(value, str) and value.strip() in ('', 'None')):
+        return pd.NaT
+    timestamp = to_utc(pd.Series([value]), naive_tz).iloc[0]
+    if pd.isna(timestamp):
+        return pd.NaT
+    return timestamp.tz_convert(naive_tz)
+
+
+def now(tz=israel_tz):
+    return pd.Timestamp.now(tz=tz)
@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+
+from data_processing import expand_question_schedule, force_uniform_datetime
+from time_utils import israel_tz, ANSWER_NAIVE_TZ, TRIAL_START_NAIVE_TZ, localize_naive, to_utc
+
+# Granularities offered in the dashboard
+GRANULARITIES = ['Hour', 'Day', 'Week']
+
+
+# ----------------------------
+# BUCKETING ENGINE
+# ----------------------------
+def bucket_edges(start_date, end_date, granularity='Day'):
+    """
+    Returns the left edges of the hour/day/week buckets covering [start_date, end_date],
+    tz-aware in Asia/Jerusalem. Weeks start on Sunday, as in the questionnaire timetable.
+    """
+    start_date = pd.Timestamp(start_date)
+    end_date = pd.Timestamp(end_date)
+    if start_date.tzinfo is None:
+        start_date = start_date.tz_localize(israel_tz)
+    if end_date.tzinfo is None:
+        end_date = end_date.tz_localize(israel_tz)
+
+    # Build the edges on wall-clock time so days/weeks stay aligned to local midnight across DST
+    start_local = start_date.tz_convert(israel_tz).tz_localize(None)
+    end_local = end_date.tz_convert(israel_tz).tz_localize(None)
+
+    if granularity == 'Hour':
+        edges = pd.date_range(start_local.floor('h'), end_local, freq='h')
+    elif granularity == 'Day':
+        edges = pd.date_range(start_local.normalize(), end_local, freq='D')
+    elif granularity == 'Week':
+        # Monday=0 ... Sunday=6 -> days back to the previous Sunday
+        first_sunday = start_local.normalize() - pd.Timedelta(days=(start_local.dayofweek + 1) % 7)
+        edges = pd.date_range(first_sunday, end_local, freq='7D')
+    else:
+        raise ValueError(f"Unknown granularity: {granularity}")
+
+    return localize_naive(edges, israel_tz)
+
+
+def _as_ns(timestamps):
+    """int64 nanoseconds since epoch (UTC) for a tz-aware datetime array; NaT -> min int64."""
+    return pd.DatetimeIndex(timestamps).as_unit('ns').asi8
+
+
+def bucket_counts(timestamps, edges, group_codes=None, num_groups=1, weights=None, end_date=None):
+    """
+    Counts (or sums `weights`) of tz-aware `timestamps` per bucket, optionally split by group.
+    `group_codes` are integer codes in [0, num_groups). Returns an array of shape
+    (num_groups, len(edges)); timestamps before the first edge, after `end_date` or NaT are ignored.
+    """
+    num_buckets = len(edges)
+    if num_buckets == 0:
+        return np.zeros((num_groups, 0))
+
+    timestamps = pd.DatetimeIndex(timestamps)
+    edges_ns = _as_ns(edges)
+    ts_ns = _as_ns(timestamps)
+    bucket = np.searchsorted(edges_ns, ts_ns, side='right') - 1
+
+    valid = (bucket >= 0) & ~timestamps.isna()
+    if end_date is not None:
+        valid &= ts_ns <= pd.Timestamp(end_date).as_unit('ns').value
+    if group_codes is None:
+        group_codes = np.zeros(len(ts_ns), dtype=np.int64)
+    else:
+        group_codes = np.asarray(group_codes, dtype=np.int64)
+        valid &= group_codes >= 0
+
+    flat = group_codes[valid] * num_buckets + bucket[valid]
+    if weights is not None:
+        weights = np.asarray(weights, dtype=float)[valid]
+    counts = np.bincount(flat, weights=weights, minlength=num_groups * num_buckets)
+    return counts.reshape(num_groups, num_buckets)
+
+
+def _trial_windows(participant_df, end_date):
+    """
+    Per-participant [trial start, trial start + 30 days] as int64 ns arrays (UTC).
+    Participants without a valid trial start get an empty window.
+    """
+    trial_start = to_utc(participant_df['trial_starting_date'], TRIAL_START_NAIVE_TZ)
+    trial_end = (trial_start + pd.Timedelta(days=30)).where(trial_start.notna())
+    trial_end = trial_end.clip(upper=pd.Timestamp(end_date).tz_convert('UTC'))
+    start_ns = _as_ns(trial_start).copy()
+    end_ns = _as_ns(trial_end).copy()
+    missing = trial_start.isna().to_numpy()
+    start_ns[missing] = np.iinfo(np.int64).max
+    end_ns[missing] = np.iinfo(np.int64).min
+    return start_ns, end_ns
+
+
+def _to_frame(matrix, edges, labels):
+    frame = pd.DataFrame(matrix.T, index=edges, columns=labels)
+    frame.index.name = 'bucket'
+    return frame
+
+
+# ----------------------------
+# TREND SERIES
+# ----------------------------
+def event_frequency_trend(event_data, participant_df, start_date, end_date, granularity='Day'):
+    """
+    Number of events per bucket for each participant (columns = nickName).
+    Only events on or after the participant's trial start are counted.
+    """
+    edges = bucket_edges(start_date, end_date, granularity)
+    labels = participant_df['nickName'].tolist()
+    if isinstance(event_data, list):
+        event_data = pd.DataFrame(event_data)
+    if event_data is None or event_data.empty:
+        return _to_frame(np.zeros((len(labels), len(edges))), edges, labels)
+
+    events = force_uniform_datetime(event_data[['patientId', 'timestamp']].copy(), tz=israel_tz)
+    codes = pd.Categorical(events['patientId'], categories=participant_df['patientId']).codes
+
+    start_ns, _ = _trial_windows(participant_df, end_date)
+    ts_ns = _as_ns(events['timestamp'])
+    in_trial = np.zeros(len(codes), dtype=bool)
+    known = codes >= 0
+    in_trial[known] = ts_ns[known] >= start_ns[codes[known]]
+    codes = np.where(in_trial, codes, -1)
+
+    counts = bucket_counts(events['timestamp'], edges, codes, num_groups=len(labels), end_date=end_date)
+    return _to_frame(counts, edges, labels)
+
+
+def answer_compliance_trend(answers_df, participant_df, timetable_df, start_date, end_date, granularity='Day'):
+    """
+    Percentage of scheduled questions answered (valid answers 0-4) per bucket.
+    Returns (per-participant frame with nickName columns, cohort Series).
+    Buckets without scheduled questions are NaN.
+    """
+    edges = bucket_edges(start_date, end_date, granularity)
+    labels = participant_df['nickName'].tolist()
+    num_groups = len(labels)
+    start_ns, end_ns = _trial_windows(participant_df, end_date)
+
+    # Scheduled questions: one shared slot list, masked by each participant's trial window
+    slots = expand_question_schedule(timetable_df, edges[0] if len(edges) else start_date, end_date)
+    slot_ns = _as_ns(slots['slot_time'])
+    slot_bucket = np.searchsorted(_as_ns(edges), slot_ns, side='right') - 1
+    slot_to_bucket = np.zeros((len(slot_ns), len(edges)))
+    in_range = slot_bucket >= 0
+    slot_to_bucket[np.flatnonzero(in_range), slot_bucket[in_range]] = 1.0
+    in_window = (slot_ns[None, :] >= start_ns[:, None]) & (slot_ns[None, :] <= end_ns[:, None])
+    scheduled = (in_window * slots['num_questions'].to_numpy()[None, :]) @ slot_to_bucket
+
+    # Answered questions: valid answers inside the same window
+    answered = np.zeros((num_groups, len(edges)))
+    if answers_df is not None and not answers_df.empty:
+        answers = answers_df[['patientId', 'timestamp', 'answer']].copy()
+        answers['timestamp'] = to_utc(answers['timestamp'], ANSWER_NAIVE_TZ)
+        codes = pd.Categorical(answers['patientId'], categories=participant_df['patientId']).codes
+        ts_ns = _as_ns(answers['timestamp'])
+        valid = pd.to_numeric(answers['answer'], errors='coerce').between(0, 4).to_numpy() & (codes >= 0)
+        valid[valid] = (ts_ns[valid] >= start_ns[codes[valid]]) & (ts_ns[valid] <= end_ns[codes[valid]])
+        answered = bucket_counts(answers['timestamp'], edges, np.where(valid, codes, -1), num_groups, end_date=end_date)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        per_participant = np.where(scheduled > 0, 100.0 * np.minimum(answered / scheduled, 1.0), np.nan)
+        cohort_scheduled = scheduled.sum(axis=0)
+        cohort = np.where(
+            cohort_scheduled > 0,
+            100.0 * np.minimum(answered.sum(axis=0) / cohort_scheduled, 1.0),
+            np.nan,
+        )
+
+    cohort_series = pd.Series(cohort, index=edges, name='Cohort')
+    cohort_series.index.name = 'bucket'
+    return _to_frame(per_participant, edges, labels), cohort_series